@@ -12,6 +12,22 @@ def create_app():
     
     # Initialize CSRF protection
     csrf = CSRFProtect(app)
+
+    # Time request stages (reported in a Server-Timing header when SERVER_TIMING_ENABLED is set)
+    from app.utils.latency import init_app as init_latency
+    init_latency(app)
+
+    # Give every request an ID so captured API traces can be looked up
+    from app.utils.trace_store import init_app as init_trace_store
+    init_trace_store(app)
+
+    # Routes that call out to websites and API providers start their own time budget
+    from app.utils.deadline import init_app as init_deadline
+    init_deadline(app)
+
+    # Attribute API usage to the session and input method that caused it
+    from app.utils.usage_ledger import init_app as init_usage_ledger
+    init_usage_ledger(app)
     
     # Register blueprints
     from app.routes.home import home_bp
@@ -173,7 +173,7 @@ def analyze_interview_with_ai(responses):
 
     try:
         # Import the API client
-        from app.utils.api_client import APIClient
+        from app.utils.api_client import get_api_client
         import json
 
         # Format the interview responses for analysis
@@ -188,12 +188,12 @@ def analyze_interview_with_ai(responses):
         Please analyze these brand interview responses to extract deeper insights about the brand voice.
         """
 
-        # Create API client and analyze
+        # Get the shared API client and analyze
         api_provider = session['api_settings']['api_provider']
         api_key = session['api_settings']['api_key']
 
         print(f"Using {api_provider} API for brand interview analysis")
-        api_client = APIClient(api_provider, api_key)
+        api_client = get_api_client(api_provider, api_key)
         success, results = api_client.analyze_text(analysis_text)
 
         if success:
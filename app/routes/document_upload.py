@@ -4,6 +4,7 @@ import PyPDF2
 from werkzeug.utils import secure_filename
 from app.utils.session_manager import get_brand_parameters, get_input_methods, update_input_method
 from app.utils.text_analyzer import update_brand_parameters as update_params_from_analysis
+from app.utils.deadline import start_deadline
 
 document_upload_bp = Blueprint('document_upload', __name__)
 
@@ -26,6 +27,8 @@ def extract_text_from_txt(txt_path):
 
 @document_upload_bp.route('/document-upload', methods=['GET', 'POST'])
 def index():
+    # Outbound analysis calls take their timeouts from this request's time budget
+    start_deadline()
     if request.method == 'POST':
         # Check if the post request has the file part
         if 'document' not in request.files:
@@ -4,11 +4,15 @@ from app.utils.session_manager import get_brand_parameters, update_input_method,
 from app.utils.text_analyzer import update_brand_parameters as update_params_from_analysis
 from app.utils.simple_scraper import scrape_website
 from app.utils.link_extractor import get_internal_links
+from app.utils.deadline import start_deadline, use_deadline, SCRAPE_BUDGET_SHARE
 
 web_scraper_bp = Blueprint('web_scraper_bp', __name__)
 
 @web_scraper_bp.route('/web-scraper', methods=['GET', 'POST'])
 def index():
+    # Give the whole scrape -> analyze request one time budget
+    deadline = start_deadline()
+
     # Check if API integration is enabled and we have API settings
     from flask import session
     if not session.get('api_settings', {}).get('integration_enabled', False) or not session.get('api_settings', {}).get('api_key'):
@@ -72,10 +76,14 @@ def index():
         from app.utils.session_manager import initialize_brand_parameters
         initialize_brand_parameters(reset=True)
 
+        # Scraping may use only part of the time budget, leaving the rest for the analysis
+        scrape_deadline = deadline.portion(SCRAPE_BUDGET_SHARE)
+
         # Proceed with normal scraping
         print("Starting to scrape the main URL")
         try:
-            main_text = scrape_website(website_url)
+            with use_deadline(scrape_deadline):
+                main_text = scrape_website(website_url)
             print(f"Main text length: {len(main_text) if main_text else 0} characters")
         except Exception as e:
             import traceback
@@ -88,7 +96,8 @@ def index():
         if main_text and len(main_text.strip()) > 0:
             # Get internal links
             print("Getting internal links")
-            internal_links = get_internal_links(website_url)
+            with use_deadline(scrape_deadline):
+                internal_links = get_internal_links(website_url)
             print(f"Found {len(internal_links)} internal links")
 
             # Scrape internal pages
@@ -102,15 +111,23 @@ def index():
             # Set a maximum text length to avoid overwhelming the API
             max_text_length = 100000  # 100K characters should be enough for analysis
             current_text_length = len(main_text)
+            stopped_at_deadline = False
 
             for i, link in enumerate(internal_links):
+                # Analyze what we have rather than running out of time for the analysis
+                if scrape_deadline.expired:
+                    print(f"Scraping time budget used up after {successful_pages} pages. Stopping scraping.")
+                    stopped_at_deadline = True
+                    break
+
                 # Check if we've already collected enough text
                 if current_text_length >= max_text_length:
                     print(f"Reached maximum text length ({max_text_length} characters). Stopping scraping.")
                     break
 
                 print(f"Scraping internal link {i+1}/{len(internal_links)}: {link}")
-                page_text = scrape_website(link)
+                with use_deadline(scrape_deadline):
+                    page_text = scrape_website(link)
 
                 if page_text:
                     print(f"Internal link text length: {len(page_text)} characters")
@@ -137,7 +154,8 @@ def index():
                 "total_pages_attempted": total_pages,
                 "success_rate": round((successful_pages / total_pages) * 100),
                 "total_text_length": len(all_text),
-                "scraped_pages": scraped_pages
+                "scraped_pages": scraped_pages,
+                "stopped_at_deadline": stopped_at_deadline
             }
             print(f"Scraping statistics: {scraping_stats}")
 
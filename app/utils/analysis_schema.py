@@ -0,0 +1,393 @@
+"""
+Schema validation of brand voice analysis results.
+This module checks provider analysis output against the brand voice schema
+with a validator compiled once at import, producing a typed result in a
+single pass and reporting every problem as a structured error instead of
+silently substituting default scores.
+"""
+
+import math
+import logging
+from typing import Dict, Any, List, Optional, Callable, Union
+
+from app.utils.fast_json import loads
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Range of trait, tone and style scores
+MIN_SCORE = 0
+MAX_SCORE = 10
+
+# Top-level sections of an analysis result; output with none of them is rejected
+ANALYSIS_SECTIONS = ("personality_traits", "emotional_tone", "formality", "formality_score", "vocabulary",
+                     "common_vocabulary", "communication_style", "avg_sentence_length", "sentence_complexity")
+
+# A compiled validator takes (value, path, errors) and returns the normalised value (None if invalid)
+Validator = Callable[[Any, str, List['SchemaError']], Any]
+
+
+class SchemaError:
+    """A single schema violation in an analysis result."""
+
+    def __init__(self, path: str, message: str, value: Any = None):
+        """
+        Initialize the error.
+
+        Args:
+            path: Location of the offending value (e.g. $.personality_traits.bold)
+            message: What was expected
+            value: The offending value
+        """
+        self.path = path
+        self.message = message
+        self.value = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the error as a JSON-serializable dictionary."""
+        value = self.value if isinstance(self.value, (str, int, float, bool, type(None))) else type(self.value).__name__
+        return {"path": self.path, "message": self.message, "value": value}
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message} (got {self.value!r})"
+
+
+class AnalysisValidationError(ValueError):
+    """Raised when provider output can't be used as a brand voice analysis at all."""
+
+    def __init__(self, errors: List[SchemaError]):
+        """
+        Initialize the exception.
+
+        Args:
+            errors: The schema errors that made the output unusable
+        """
+        self.errors = errors
+        super().__init__("Invalid analysis result: " + "; ".join(str(error) for error in errors))
+
+
+def _score(value: Any, path: str, errors: List[SchemaError]) -> Optional[int]:
+    """
+    Validate a 0-10 score. Booleans count as 10 or 0, digit strings are accepted
+    and scores outside the range are clamped to it.
+    """
+    if isinstance(value, bool):
+        return MAX_SCORE if value else MIN_SCORE
+    if isinstance(value, int) or (isinstance(value, float) and math.isfinite(value)):
+        score = int(value)
+    elif isinstance(value, str) and value.strip().isdigit():
+        score = int(value)
+    else:
+        errors.append(SchemaError(path, f"expected a score from {MIN_SCORE} to {MAX_SCORE}", value))
+        return None
+    if not MIN_SCORE <= score <= MAX_SCORE:
+        # Providers occasionally use another scale; keep the trait at the nearest valid score
+        logger.warning(f"Clamping out-of-range score {value!r} at {path} to {MIN_SCORE}-{MAX_SCORE}")
+        score = min(MAX_SCORE, max(MIN_SCORE, score))
+    return score
+
+
+def _number(value: Any, path: str, errors: List[SchemaError]) -> Optional[Union[int, float]]:
+    """Validate a number (digit strings are accepted)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    errors.append(SchemaError(path, "expected a number", value))
+    return None
+
+
+def _string(value: Any, path: str, errors: List[SchemaError]) -> Optional[str]:
+    """Validate a non-empty string."""
+    if isinstance(value, str) and value.strip():
+        return value
+    errors.append(SchemaError(path, "expected a non-empty string", value))
+    return None
+
+
+def _string_list(value: Any, path: str, errors: List[SchemaError]) -> Optional[List[str]]:
+    """Validate a list of strings, dropping (and reporting) any other items."""
+    if not isinstance(value, list):
+        errors.append(SchemaError(path, "expected a list of strings", value))
+        return None
+    strings = []
+    for i, item in enumerate(value):
+        if isinstance(item, str):
+            strings.append(item)
+        else:
+            errors.append(SchemaError(f"{path}[{i}]", "expected a string", item))
+    return strings
+
+
+def _term_frequencies(value: Any, path: str, errors: List[SchemaError]) -> Optional[List[Any]]:
+    """Validate a common_vocabulary list of [term, frequency] pairs (or bare terms)."""
+    if not isinstance(value, list):
+        errors.append(SchemaError(path, "expected a list of [term, frequency] pairs", value))
+        return None
+    pairs = []
+    for i, item in enumerate(value):
+        if isinstance(item, str):
+            pairs.append((item, 1))
+        elif isinstance(item, (list, tuple)) and len(item) == 2 and isinstance(item[0], str) and \
+                isinstance(item[1], (int, float)) and not isinstance(item[1], bool):
+            pairs.append((item[0], item[1]))
+        else:
+            errors.append(SchemaError(f"{path}[{i}]", "expected a [term, frequency] pair", item))
+    return pairs
+
+
+def _score_map(key_name: str) -> Validator:
+    """
+    Compile a validator for a name-to-score mapping.
+
+    The mapping may also be given as a ranked list of names (scored 10, 9, ...)
+    or a list of {key_name: ..., "score": ...} objects.
+    """
+    def validate(value: Any, path: str, errors: List[SchemaError]) -> Optional[Dict[str, int]]:
+        scores = {}
+        if isinstance(value, dict):
+            for name, raw_score in value.items():
+                score = _score(raw_score, f"{path}.{name}", errors)
+                if score is not None:
+                    scores[name] = score
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, str):
+                    scores[item] = MAX_SCORE - i if i < MAX_SCORE else 1
+                elif isinstance(item, dict) and isinstance(item.get(key_name), str) and "score" in item:
+                    score = _score(item["score"], f"{path}[{i}].score", errors)
+                    if score is not None:
+                        scores[item[key_name]] = score
+                else:
+                    errors.append(SchemaError(f"{path}[{i}]", f"expected a {key_name} name or "
+                                                              f"{{\"{key_name}\", \"score\"}} object", item))
+        else:
+            errors.append(SchemaError(path, f"expected an object of {key_name} scores", value))
+            return None
+        return scores
+    return validate
+
+
+def _object(fields: Dict[str, Validator]) -> Validator:
+    """Compile a validator for an object with optional fields; unknown fields are ignored."""
+    items = tuple(fields.items())
+
+    def validate(value: Any, path: str, errors: List[SchemaError]) -> Optional[Dict[str, Any]]:
+        if not isinstance(value, dict):
+            errors.append(SchemaError(path, "expected an object", value))
+            return None
+        validated = {}
+        for name, field_validator in items:
+            if name in value:
+                field_value = field_validator(value[name], f"{path}.{name}", errors)
+                if field_value is not None:
+                    validated[name] = field_value
+        return validated
+    return validate
+
+
+def _object_or(fields: Dict[str, Validator], scalar_field: str, scalar: Validator) -> Validator:
+    """Compile a validator for an object that may also be given as just its main scalar field."""
+    validate_object = _object(fields)
+
+    def validate(value: Any, path: str, errors: List[SchemaError]) -> Optional[Dict[str, Any]]:
+        if isinstance(value, dict):
+            return validate_object(value, path, errors)
+        scalar_value = scalar(value, path, errors)
+        return {scalar_field: scalar_value} if scalar_value is not None else None
+    return validate
+
+
+# The brand voice analysis schema, compiled once
+ANALYSIS_VALIDATOR = _object({
+    "personality_traits": _score_map("trait"),
+    "emotional_tone": _score_map("emotion"),
+    "formality": _object_or({"level": _number}, "level", _number),
+    "formality_score": _number,
+    "vocabulary": _object({
+        "preferred_terms": _string_list,
+        "avoided_terms": _string_list
+    }),
+    "common_vocabulary": _term_frequencies,
+    "communication_style": _object({
+        "key_phrases": _string_list,
+        "sentence_structure": _object({
+            "length_preference": _number,
+            "complexity_preference": _number
+        }),
+        "rich_descriptions": _string_list
+    }),
+    "avg_sentence_length": _number,
+    "sentence_complexity": _number,
+    # Only present in fused analysis-plus-assets responses
+    "tone_of_voice_assets": _object({
+        "tone_of_voice_prompt": _string,
+        "campaign_taglines": _string_list
+    })
+})
+
+
+class BrandVoiceAnalysis:
+    """A validated brand voice analysis result."""
+
+    def __init__(self, fields: Dict[str, Any], raw: Dict[str, Any], errors: List[SchemaError]):
+        """
+        Initialize the result from the validated fields.
+
+        Args:
+            fields: The normalised fields produced by ANALYSIS_VALIDATOR
+            raw: The provider output the fields were validated from
+            errors: Schema errors for the values that were dropped
+        """
+        vocabulary = fields.get("vocabulary", {})
+        style = fields.get("communication_style", {})
+        structure = style.get("sentence_structure", {})
+
+        self.raw = raw
+        self.errors = errors
+        self.personality_traits: Dict[str, int] = fields.get("personality_traits", {})
+        self.emotional_tone: Dict[str, int] = fields.get("emotional_tone", {})
+        self.formality: Optional[Union[int, float]] = fields.get("formality", {}).get(
+            "level", fields.get("formality_score"))
+        self.preferred_terms: Optional[List[str]] = vocabulary.get("preferred_terms")
+        self.avoided_terms: Optional[List[str]] = vocabulary.get("avoided_terms")
+        self.common_vocabulary: Optional[List[Any]] = fields.get("common_vocabulary")
+        self.key_phrases: List[str] = style.get("key_phrases", [])
+        self.rich_descriptions: List[str] = style.get("rich_descriptions", [])
+        self.length_preference: Optional[Union[int, float]] = structure.get("length_preference")
+        self.complexity_preference: Optional[Union[int, float]] = structure.get("complexity_preference")
+        self.avg_sentence_length: Optional[Union[int, float]] = fields.get("avg_sentence_length")
+        self.sentence_complexity: Optional[Union[int, float]] = fields.get("sentence_complexity")
+        self.assets: Optional[Dict[str, Any]] = fields.get("tone_of_voice_assets") or None
+
+    def to_standardized(self) -> Dict[str, Any]:
+        """
+        Convert to the standardized analysis format used for brand parameters.
+
+        Returns:
+            Dictionary with personality_traits, emotional_tone, formality_score,
+            common_vocabulary, avoided_terms (if given), sentence metrics, the rich
+            descriptions, the original API response, the tone of voice assets of a
+            fused response (split out of the original response) and any validation errors
+        """
+        standardized = {
+            "personality_traits": dict(self.personality_traits),
+            "emotional_tone": dict(self.emotional_tone),
+            "formality_score": self.formality if self.formality is not None else 5,
+            "common_vocabulary": [],
+            "avg_sentence_length": 0,
+            "sentence_complexity": 5,
+            "original_api_response": {key: value for key, value in self.raw.items() if key != "tone_of_voice_assets"},
+            "rich_descriptions": list(self.rich_descriptions)
+        }
+
+        if self.preferred_terms is not None:
+            # Format [(term, frequency)] with frequencies from 10 down to 1 to emphasise the first terms
+            standardized["common_vocabulary"] = [(term, max(1, 10 - i)) for i, term in enumerate(self.preferred_terms)]
+        elif self.common_vocabulary is not None:
+            standardized["common_vocabulary"] = list(self.common_vocabulary)
+        if self.avoided_terms is not None:
+            standardized["avoided_terms"] = list(self.avoided_terms)
+
+        if self.length_preference is not None:
+            standardized["avg_sentence_length"] = self.length_preference * 3  # Scale to match basic analysis
+        elif self.avg_sentence_length is not None:
+            standardized["avg_sentence_length"] = self.avg_sentence_length
+        if self.complexity_preference is not None:
+            standardized["sentence_complexity"] = self.complexity_preference
+        if self.sentence_complexity is not None:
+            standardized["sentence_complexity"] = self.sentence_complexity
+
+        if self.assets is not None and "tone_of_voice_prompt" in self.assets:
+            standardized["tone_of_voice_assets"] = {
+                "tone_of_voice_prompt": self.assets["tone_of_voice_prompt"],
+                "campaign_taglines": self.assets.get("campaign_taglines", [])
+            }
+        if self.errors:
+            standardized["validation_errors"] = [error.as_dict() for error in self.errors]
+        return standardized
+
+
+class ValidatedResult(dict):
+    """
+    Provider output that has already been validated. It is the output itself
+    (so it can be cached and returned like any result) and keeps the typed
+    analysis it was validated into, so later stages don't validate it again.
+    """
+
+    __slots__ = ('analysis',)
+
+    def __init__(self, analysis: BrandVoiceAnalysis):
+        """
+        Initialize the result.
+
+        Args:
+            analysis: The validated analysis; its raw output becomes the result's items
+        """
+        super().__init__(analysis.raw)
+        self.analysis = analysis
+
+
+def validate_analysis(data: Any) -> BrandVoiceAnalysis:
+    """
+    Validate provider output against the brand voice analysis schema.
+
+    Values that don't fit the schema are dropped and reported in the result's
+    errors; output that isn't an analysis at all is rejected.
+
+    Args:
+        data: The decoded provider output
+
+    Returns:
+        The typed analysis result
+
+    Raises:
+        AnalysisValidationError: If the output is not an object or has none of the analysis sections
+    """
+    if not isinstance(data, dict):
+        raise AnalysisValidationError([SchemaError("$", "expected a JSON object", data)])
+    if not any(section in data for section in ANALYSIS_SECTIONS):
+        raise AnalysisValidationError([SchemaError("$", "expected at least one of: " + ", ".join(ANALYSIS_SECTIONS),
+                                                   sorted(data)[:10])])
+
+    errors: List[SchemaError] = []
+    fields = ANALYSIS_VALIDATOR(data, "$", errors)
+    if errors:
+        logger.warning(f"Analysis result has {len(errors)} schema error(s): "
+                       + "; ".join(str(error) for error in errors[:5]))
+    return BrandVoiceAnalysis(fields, data, errors)
+
+
+def get_analysis(data: Any) -> BrandVoiceAnalysis:
+    """
+    Get the typed analysis of a result, validating it only if it hasn't been yet.
+
+    Args:
+        data: A ValidatedResult returned by the API clients, or decoded provider output
+
+    Returns:
+        The typed analysis result
+
+    Raises:
+        AnalysisValidationError: If unvalidated output is not an analysis
+    """
+    if isinstance(data, ValidatedResult):
+        return data.analysis
+    return validate_analysis(data)
+
+
+def decode_analysis(content: Union[bytes, str]) -> BrandVoiceAnalysis:
+    """
+    Decode and validate an analysis result from JSON text.
+
+    Args:
+        content: The JSON text of the analysis
+
+    Returns:
+        The typed analysis result
+
+    Raises:
+        ValueError: If the text is not valid JSON or not an analysis (AnalysisValidationError)
+    """
+    return validate_analysis(loads(content))
@@ -0,0 +1,177 @@
+"""
+Tokenize-once document model.
+This module splits a text into sentences and words a single time and keeps
+the result in compact arrays (sentence spans, token offsets, lowercase tokens
+and stopword/content masks), so every local metric and the vocabulary
+counts read from the same tokenization instead of running the NLTK
+tokenizers again.
+"""
+
+import logging
+from array import array
+from functools import lru_cache
+from typing import FrozenSet, Iterator, List, Optional, Tuple
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.tokenize import NLTKWordTokenizer
+
+from app.utils.vocabulary_sketch import SpaceSavingSketch, VOCABULARY_SKETCH_SIZE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The word tokenizer word_tokenize uses, which can also report token offsets
+_word_tokenizer = NLTKWordTokenizer()
+
+
+@lru_cache(maxsize=None)
+def _sentence_tokenizer(language: str = 'english'):
+    """Load the Punkt sentence tokenizer sent_tokenize uses (once per language)."""
+    return nltk.data.load(f"tokenizers/punkt/{language}.pickle")
+
+
+@lru_cache(maxsize=None)
+def _stop_words(language: str = 'english') -> FrozenSet[str]:
+    """Load the NLTK stopword list (once per language)."""
+    return frozenset(stopwords.words(language))
+
+
+def _token_spans(sentence: str) -> List[Tuple[int, int]]:
+    """Offsets of a sentence's word tokens, relative to the sentence."""
+    try:
+        return list(_word_tokenizer.span_tokenize(sentence))
+    except ValueError:
+        # span_tokenize can't align a few rewritten tokens; locate them one by one instead
+        spans, position = [], 0
+        for token in _word_tokenizer.tokenize(sentence):
+            start = sentence.find(token, position)
+            if start < 0:
+                start = position
+            position = min(len(sentence), start + len(token))
+            spans.append((start, position))
+        return spans
+
+
+class AnalyzedDocument:
+    """An immutable, tokenized text shared by the local text metrics."""
+
+    __slots__ = ('_text', '_sentence_starts', '_sentence_ends', '_sentence_token_starts',
+                 '_token_starts', '_token_ends', '_tokens', '_stopword_mask', '_content_mask')
+
+    def __init__(self, text: str, language: str = 'english'):
+        """
+        Tokenize a text.
+
+        Args:
+            text: The text to analyze
+            language: The language of the NLTK sentence tokenizer and stopword list
+        """
+        stop_words = _stop_words(language)
+        sentence_starts, sentence_ends = array('l'), array('l')
+        sentence_token_starts = array('l', [0])
+        token_starts, token_ends = array('l'), array('l')
+        tokens = []
+        stopword_mask, content_mask = bytearray(), bytearray()
+
+        for sentence_start, sentence_end in _sentence_tokenizer(language).span_tokenize(text):
+            sentence = text[sentence_start:sentence_end]
+            for start, end in _token_spans(sentence):
+                token = sentence[start:end].lower()
+                is_stopword = token in stop_words
+                token_starts.append(sentence_start + start)
+                token_ends.append(sentence_start + end)
+                tokens.append(token)
+                stopword_mask.append(is_stopword)
+                content_mask.append(token.isalnum() and not is_stopword)
+            sentence_starts.append(sentence_start)
+            sentence_ends.append(sentence_end)
+            sentence_token_starts.append(len(tokens))
+
+        object.__setattr__(self, '_text', text)
+        object.__setattr__(self, '_sentence_starts', sentence_starts)
+        object.__setattr__(self, '_sentence_ends', sentence_ends)
+        object.__setattr__(self, '_sentence_token_starts', sentence_token_starts)
+        object.__setattr__(self, '_token_starts', token_starts)
+        object.__setattr__(self, '_token_ends', token_ends)
+        object.__setattr__(self, '_tokens', tuple(tokens))
+        object.__setattr__(self, '_stopword_mask', bytes(stopword_mask))
+        object.__setattr__(self, '_content_mask', bytes(content_mask))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AnalyzedDocument is immutable")
+
+    @property
+    def text(self) -> str:
+        """The original text."""
+        return self._text
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        """Lowercase word tokens of the whole text, in order."""
+        return self._tokens
+
+    @property
+    def stopword_mask(self) -> bytes:
+        """One byte per token: 1 if the token is a stopword."""
+        return self._stopword_mask
+
+    @property
+    def sentence_count(self) -> int:
+        """Number of sentences."""
+        return len(self._sentence_starts)
+
+    def sentences(self) -> Iterator[str]:
+        """Sentences of the original text (original case)."""
+        text = self._text
+        for start, end in zip(self._sentence_starts, self._sentence_ends):
+            yield text[start:end]
+
+    def sentence_spans(self) -> Iterator[Tuple[int, int]]:
+        """Character offsets (start, end) of each sentence."""
+        return zip(self._sentence_starts, self._sentence_ends)
+
+    def token_spans(self) -> Iterator[Tuple[int, int]]:
+        """Character offsets (start, end) of each token."""
+        return zip(self._token_starts, self._token_ends)
+
+    def sentence_lengths(self) -> List[int]:
+        """Number of tokens in each sentence."""
+        boundaries = self._sentence_token_starts
+        return [boundaries[i + 1] - boundaries[i] for i in range(len(boundaries) - 1)]
+
+    def avg_sentence_length(self) -> float:
+        """Mean number of tokens per sentence (0 for an empty text)."""
+        return len(self._tokens) / self.sentence_count if self.sentence_count else 0
+
+    def content_words(self, first_sentence: int = 0, last_sentence: Optional[int] = None) -> List[str]:
+        """
+        Alphanumeric tokens that aren't stopwords, in order.
+
+        Args:
+            first_sentence: Index of the first sentence to include
+            last_sentence: Index after the last sentence to include (default: all)
+
+        Returns:
+            The content words of those sentences
+        """
+        boundaries = self._sentence_token_starts
+        start = boundaries[min(first_sentence, len(boundaries) - 1)]
+        end = boundaries[len(boundaries) - 1 if last_sentence is None else min(last_sentence, len(boundaries) - 1)]
+        return [token for token, keep in zip(self._tokens[start:end], self._content_mask[start:end]) if keep]
+
+    def vocabulary(self, capacity: int = VOCABULARY_SKETCH_SIZE) -> SpaceSavingSketch:
+        """
+        Count the content words in fixed memory.
+
+        Args:
+            capacity: Number of words the sketch counts; with no more distinct
+                words than this, counts and order equal those of a FreqDist
+
+        Returns:
+            Heavy-hitter sketch of the content words
+        """
+        vocabulary = SpaceSavingSketch(capacity)
+        vocabulary.update(self.content_words())
+        return vocabulary
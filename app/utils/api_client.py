@@ -3,22 +3,172 @@ API Client for intelligent text analysis.
 This module handles communication with various AI APIs for text analysis.
 """
 
-import requests
-import json
 import os
-from typing import Dict, Any, Tuple, List, Optional
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Tuple, List, Optional, Iterator
 import logging
 
+import requests
+import urllib3
+
+from app.utils.http_transport import http_transport, HTTPTransport
+from app.utils.rate_limiter import rate_limiter, estimate_payload_tokens, parse_retry_after
+from app.utils.response_cache import response_cache
+from app.utils.singleflight import singleflight
+from app.utils.latency import LatencyBreakdown
+from app.utils.trace_store import trace_store
+from app.utils.fast_json import loads
+from app.utils.streaming import iter_sse_events, parse_partial_json
+from app.utils.deadline import deadline_timeout, check_deadline, get_deadline
+from app.utils.analysis_schema import validate_analysis, AnalysisValidationError, ValidatedResult
+from app.utils.chunked_analysis import analyze_in_chunks, CHUNK_TOKEN_BUDGET
+from app.utils.model_tiering import model_tiering
+from app.utils.usage_ledger import usage_ledger
+from app.utils.token_estimator import (estimate_tokens, estimate_request, estimate_payload, trim_to_budget,
+                                       extract_usage, usage_tracker, PROMPT_TOKEN_BUDGET, BUDGET_POLICY)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class APIClient:
-    """Client for making API calls to various AI services for text analysis."""
+# SSL verification is disabled for provider requests in development,
+# so suppress only the InsecureRequestWarning from urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# System prompt for detailed brand voice analysis
+ANALYSIS_SYSTEM_PROMPT = "You are a brand voice analysis expert. Your task is to analyze the provided document and extract ALL brand voice characteristics directly from the text. DO NOT generate generic descriptions - only use what's explicitly stated in the document. If the document contains sections like 'Words and phrases we use', 'Words and phrases we avoid', 'We are...', 'We aren't...', 'How we speak', 'Our language toolkit', or any other brand voice guidelines, INCLUDE THEM ALL COMPLETELY. Capture the FULL RICHNESS of the brand voice descriptions. If the document is rich with brand voice information, include ALL of it. If it's sparse, extract whatever brand voice information you can find."
+
+# Static analysis guidelines; the document header and text are appended after them
+ANALYSIS_GUIDELINES = """Analyze the following document and extract ALL brand voice characteristics directly from the text. INCLUDE COMPLETE SECTIONS from the document that describe the brand voice. If the document contains rich brand voice guidelines, preserve ALL of this content in your analysis.
+
+The response should follow this format:
+```json
+{
+  "personality_traits": {
+    "trait1": 9,
+    "trait2": 8,
+    "trait3": 7,
+    "trait4": 6,
+    "trait5": 5
+  },
+  "emotional_tone": {
+    "tone1": 9,
+    "tone2": 8,
+    "tone3": 7,
+    "tone4": 6
+  },
+  "formality": {
+    "level": 7
+  },
+  "vocabulary": {
+    "preferred_terms": ["exact term1", "exact term2", "exact term3", "exact term4", "exact term5", "exact term6", "exact term7", "exact term8", "exact term9", "exact term10", "exact term11", "exact term12", "exact term13", "exact term14", "exact term15"],
+    "avoided_terms": ["avoided term1", "avoided term2", "avoided term3", "avoided term4", "avoided term5", "avoided term6", "avoided term7", "avoided term8", "avoided term9", "avoided term10"]
+  },
+  "communication_style": {
+    "key_phrases": ["exact phrase1", "exact phrase2", "exact phrase3", "exact phrase4", "exact phrase5"],
+    "sentence_structure": {
+      "length_preference": 7,
+      "complexity_preference": 6
+    },
+    "rich_descriptions": [
+      "Full sentence or paragraph describing the brand voice exactly as stated in the document",
+      "Another rich description from the document that captures the brand's unique voice",
+      "Additional descriptive text that provides context and nuance to the brand voice"
+    ]
+  }
+}
+```
+
+CRITICAL INSTRUCTIONS:
+1. ONLY use traits, tones, terms, and phrases that are EXPLICITLY mentioned in the document.
+2. For personality_traits, use the EXACT traits mentioned in the "Words and phrases we use", "We are...", or similar sections.
+3. For emotional_tone, extract tones directly from sections describing the brand's tone or emotional qualities.
+4. For preferred_terms, use the EXACT words and phrases listed in the "Words and phrases we use", "Superlatives", "Adjectives", or similar sections. Include ALL terms mentioned, not just a few.
+5. For avoided_terms, use the EXACT words and phrases listed in the "Words and phrases we avoid", "Words and phrases we're not into", or similar sections. Include ALL terms mentioned, not just a few.
+6. For key_phrases, extract direct quotes or taglines that represent the brand's voice. Include the most distinctive and representative phrases.
+7. For rich_descriptions, extract COMPLETE sentences, paragraphs, or entire sections that describe the brand voice. Include ALL relevant content from the document verbatim.
+8. DO NOT invent or generalize - only use what's explicitly in the document.
+9. Assign numeric scores (1-10) based on the emphasis placed on each trait/tone in the document.
+10. If the document contains a section like "How we speak", "Our language toolkit", "We are/We aren't", or any other brand voice guidelines, INCLUDE THESE SECTIONS COMPLETELY in rich_descriptions.
+11. Include ALL sections that explicitly list words to use or avoid - these are critical to include in full.
+12. Capture the FULL RICHNESS of the brand voice - don't summarize or simplify the descriptions provided in the document.
+13. If the document is rich with brand voice information, include ALL of it. If it's sparse, extract whatever brand voice information you can find.
+14. PRESERVE THE EXACT WORDING from the document - don't paraphrase or rewrite.
+
+"""
+
+ANALYSIS_DOCUMENT_HEADER = "Here's the document to analyze:\n\n"
+
+# Static analysis instructions; the document text is appended after them
+ANALYSIS_INSTRUCTIONS = ANALYSIS_GUIDELINES + ANALYSIS_DOCUMENT_HEADER
+
+# Extra instructions of the fused mode, which asks for the tone of voice assets in the
+# same completion as the analysis instead of a second request after it
+FUSED_ASSETS_INSTRUCTIONS = """ALSO create tone of voice assets for this brand in the same JSON object, under an extra "tone_of_voice_assets" key:
+```json
+{
+  "tone_of_voice_assets": {
+    "tone_of_voice_prompt": "A comprehensive guide for copywriters (at least 300 words)",
+    "campaign_taglines": ["tagline 1", "tagline 2"]
+  }
+}
+```
+
+The tone of voice prompt should be thorough, specific, and actionable, providing clear guidance on the brand's personality and character, how to structure sentences and paragraphs, word choice and vocabulary preferences, the emotional tone to convey, specific dos and don'ts, and examples of good copy in this voice. Base it on the brand voice you extracted above. The two campaign taglines/headlines should be memorable, aligned with the brand voice, and showcase its distinctive style.
+
+"""
+
+FUSED_ANALYSIS_INSTRUCTIONS = ANALYSIS_GUIDELINES + FUSED_ASSETS_INSTRUCTIONS + ANALYSIS_DOCUMENT_HEADER
+
+# Providers that support the fused analysis-plus-assets mode
+FUSED_PROVIDERS = ('openai', 'anthropic')
+
+# Whether text analyses also generate the tone of voice assets in the same request
+FUSED_ANALYSIS_ENABLED = os.environ.get('FUSED_ANALYSIS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Providers whose tone of voice assets can be streamed as they are generated
+STREAMING_PROVIDERS = ('openai', 'anthropic')
+
+# Whether the results page streams the tone of voice assets instead of waiting for them
+ASSETS_STREAMING_ENABLED = os.environ.get('ASSETS_STREAMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Streamed completions are re-parsed after at least this many new characters
+STREAM_PARSE_INTERVAL = int(os.environ.get('STREAM_PARSE_INTERVAL', 40))
+
+# Number of API clients (one per provider and key) kept for reuse
+CLIENT_CACHE_SIZE = int(os.environ.get('CLIENT_CACHE_SIZE', 32))
+
+# Instructions for providers that use the shorter analysis request
+BASIC_ANALYSIS_INSTRUCTIONS = "Analyze the following text and provide a structured JSON response with brand voice parameters including personality traits, emotional tone, formality level, vocabulary characteristics, and communication style:\n\n"
+
+# Anthropic analysis prompt. The static system prompt and instructions come before the
+# document and end in a cache_control breakpoint, so Anthropic caches the shared prefix
+# and repeated analyses only pay full price for the document text
+ANTHROPIC_ANALYSIS_SYSTEM_PROMPT = f"{ANALYSIS_SYSTEM_PROMPT} Provide your analysis as a valid JSON object with no additional text."
+ANTHROPIC_ANALYSIS_SYSTEM_BLOCKS = [{"type": "text", "text": ANTHROPIC_ANALYSIS_SYSTEM_PROMPT}]
+ANTHROPIC_ANALYSIS_INSTRUCTIONS_BLOCK = {"type": "text", "text": ANALYSIS_INSTRUCTIONS,
+                                         "cache_control": {"type": "ephemeral"}}
+ANTHROPIC_FUSED_INSTRUCTIONS_BLOCK = {"type": "text", "text": FUSED_ANALYSIS_INSTRUCTIONS,
+                                      "cache_control": {"type": "ephemeral"}}
+
+# System prompt for tone of voice asset generation
+ASSETS_SYSTEM_PROMPT = "You are an expert copywriter and brand strategist who creates precise, actionable tone of voice guidelines and compelling campaign taglines."
+
+class BaseAPIClient:
+    """
+    Provider configuration, prompts, payloads and response parsing shared by
+    the sync and async API clients. It does no I/O, so each client defines its
+    own request methods and never inherits the other's.
+    """
 
     def __init__(self, api_provider: str, api_key: str):
         """
-        Initialize the API client.
+        Initialize the provider configuration.
 
         Args:
             api_provider: The API provider to use ('openai', 'anthropic', 'cohere', or 'custom')
@@ -30,7 +180,7 @@ class APIClient:
         # API endpoints and configurations
         self.endpoints = {
             'openai': {
-                'base_url': 'https://api.openai.com/v1',
+                'base_url': os.environ.get('OPENAI_API_BASE_URL', 'https://api.openai.com/v1'),
                 'analyze_endpoint': '/chat/completions',
                 'model': 'gpt-4o',
                 'headers': {
@@ -39,7 +189,7 @@ class APIClient:
                 }
             },
             'anthropic': {
-                'base_url': 'https://api.anthropic.com/v1',
+                'base_url': os.environ.get('ANTHROPIC_API_BASE_URL', 'https://api.anthropic.com/v1'),
                 'analyze_endpoint': '/messages',
                 'model': 'claude-3-opus-20240229',
                 'headers': {
@@ -49,7 +199,7 @@ class APIClient:
                 }
             },
             'cohere': {
-                'base_url': 'https://api.cohere.ai/v1',
+                'base_url': os.environ.get('COHERE_API_BASE_URL', 'https://api.cohere.ai/v1'),
                 'analyze_endpoint': '/generate',
                 'model': 'command-r-plus',
                 'headers': {
@@ -68,12 +218,269 @@ class APIClient:
             }
         }
 
-    def analyze_text(self, text: str) -> Tuple[bool, Dict[str, Any]]:
+    @staticmethod
+    def _with_latency(results: Dict[str, Any], breakdown: LatencyBreakdown, label: str) -> Dict[str, Any]:
+        """Log the latency breakdown and return a copy of the results with it attached."""
+        breakdown.log(label)
+        # A shallow copy keeps a ValidatedResult's analysis
+        results = copy.copy(results)
+        results["latency"] = breakdown.as_dict()
+        return results
+
+    def _text_token_budget(self) -> int:
+        """Tokens left for the document text once the analysis prompts are counted against the budget."""
+        system_prompt, user_prompt = self._analysis_prompts()
+        return PROMPT_TOKEN_BUDGET - estimate_request(system_prompt, user_prompt, 0)["prompt_tokens"]
+
+    def _fit_prompt_budget(self, text: str) -> Tuple[str, bool]:
+        """
+        Check the analysis prompt for a text against the prompt token budget.
+
+        Args:
+            text: The text to analyze
+
+        Returns:
+            Tuple containing:
+                - The text, trimmed of low-value content if it had to be
+                - True if the text should be analyzed in chunks instead
+        """
+        text_budget = self._text_token_budget()
+        if estimate_tokens(text) <= text_budget:
+            return text, False
+
+        if BUDGET_POLICY == 'chunk' and text_budget >= CHUNK_TOKEN_BUDGET:
+            logger.info(f"Text exceeds the {PROMPT_TOKEN_BUDGET} token prompt budget; analyzing in chunks")
+            usage_tracker.record_budget_action('chunked')
+            return text, True
+
+        logger.info(f"Text exceeds the {PROMPT_TOKEN_BUDGET} token prompt budget; trimming low-value text")
+        usage_tracker.record_budget_action('trimmed')
+        return trim_to_budget(text, max(text_budget, 0)), False
+
+    def _analysis_prompts(self, include_assets: bool = False) -> Tuple[str, str]:
+        """Get the (system prompt, user instructions) pair used for analysis by the current provider."""
+        instructions = FUSED_ANALYSIS_INSTRUCTIONS if include_assets else ANALYSIS_INSTRUCTIONS
+        if self.api_provider == 'openai':
+            return ANALYSIS_SYSTEM_PROMPT, instructions
+        elif self.api_provider == 'anthropic':
+            return ANTHROPIC_ANALYSIS_SYSTEM_PROMPT, instructions
+        elif self.api_provider == 'cohere':
+            return '', BASIC_ANALYSIS_INSTRUCTIONS
+        return '', 'brand_voice'
+
+    def _record_usage(self, kind: str, model: str, start_time: float, response: Optional[requests.Response] = None,
+                      usage: Optional[Dict[str, int]] = None, success: bool = True, cache_hit: bool = False):
+        """Append a provider call (or response cache hit) to the usage ledger."""
+        usage_ledger.record(kind, self.api_provider, model, self.api_key, usage, latency=time.time() - start_time,
+                            retries=getattr(response, 'retries', 0), cache_hit=cache_hit, success=success)
+
+    def _build_analysis_payload(self, text: str, config: Dict[str, Any],
+                                include_assets: bool = False) -> Dict[str, Any]:
+        """
+        Build the analysis request payload for the configured API provider.
+
+        The static system prompt and instructions always come first and the
+        document text last, so OpenAI's automatic prefix caching and Anthropic's
+        cache_control breakpoint can reuse the shared prefix across documents.
+        With include_assets the instructions also ask for the tone of voice assets.
+        """
+        if self.api_provider == 'openai':
+            instructions = FUSED_ANALYSIS_INSTRUCTIONS if include_assets else ANALYSIS_INSTRUCTIONS
+            return {
+                "model": config['model'],
+                "messages": [
+                    {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                    {"role": "user", "content": instructions + text}
+                ],
+                "response_format": {"type": "json_object"}
+            }
+        elif self.api_provider == 'anthropic':
+            return {
+                "model": config['model'],
+                "max_tokens": 4000,
+                "messages": [
+                    {"role": "user", "content": [
+                        ANTHROPIC_FUSED_INSTRUCTIONS_BLOCK if include_assets else ANTHROPIC_ANALYSIS_INSTRUCTIONS_BLOCK,
+                        {"type": "text", "text": text}
+                    ]}
+                ],
+                "system": ANTHROPIC_ANALYSIS_SYSTEM_BLOCKS,
+            }
+        elif self.api_provider == 'cohere':
+            return {
+                "model": config['model'],
+                "max_tokens": 4000,
+                "prompt": f"{BASIC_ANALYSIS_INSTRUCTIONS}{text}\n\nProvide your analysis as a valid JSON object with no additional text."
+            }
+        return {
+            "text": text,
+            "model": config['model'],
+            "analysis_type": "brand_voice"
+        }
+
+    def _build_assets_payload(self, prompt: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the tone of voice assets request payload for the configured API provider."""
+        if self.api_provider == 'openai':
+            return {
+                "model": config['model'],
+                "messages": [
+                    {"role": "system", "content": ASSETS_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                "response_format": {"type": "json_object"}
+            }
+        elif self.api_provider == 'anthropic':
+            return {
+                "model": config['model'],
+                "max_tokens": 4000,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ],
+                "system": f"{ASSETS_SYSTEM_PROMPT} Provide your response as a valid JSON object with no additional text.",
+            }
+        elif self.api_provider == 'cohere':
+            return {
+                "model": config['model'],
+                "max_tokens": 4000,
+                "prompt": f"{ASSETS_SYSTEM_PROMPT}\n\n{prompt}\n\nProvide your response as a valid JSON object with no additional text."
+            }
+        return {
+            "text": prompt,
+            "model": config['model'],
+            "analysis_type": "tone_of_voice_assets"
+        }
+
+    def _parse_response(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract the JSON content from a provider response.
+
+        Args:
+            result: The decoded response body
+
+        Returns:
+            The parsed JSON content
+
+        Raises:
+            KeyError, IndexError, ValueError: If the response does not contain valid JSON content
+        """
+        if self.api_provider == 'openai':
+            return loads(result['choices'][0]['message']['content'])
+        elif self.api_provider == 'anthropic':
+            return loads(result['content'][0]['text'])
+        elif self.api_provider == 'cohere':
+            content = result['generations'][0]['text']
+            # Find the JSON part in the response
+            json_start = content.find('{')
+            json_end = content.rfind('}') + 1
+            if json_start < 0 or json_end <= json_start:
+                raise ValueError("Could not find valid JSON in the response")
+            return loads(content[json_start:json_end])
+        return result
+
+    def _build_assets_prompt(self, brand_voice_summary: Dict[str, Any]) -> str:
+        """Create the tone of voice assets prompt from a brand voice summary."""
+        # Format the brand voice summary for the prompt
+        tone_description = brand_voice_summary.get('tone_description', '')
+        example_phrases = brand_voice_summary.get('example_phrases', [])
+        frequently_used_words = brand_voice_summary.get('frequently_used_words', [])
+        words_to_avoid = brand_voice_summary.get('words_to_avoid', [])
+
+        # Create a comprehensive prompt with all brand voice elements
+        return f"""Based on the following brand voice summary, create:
+1. A comprehensive tone of voice prompt that copywriters can use to write in this brand's voice
+2. Two compelling campaign taglines/headlines that exemplify this brand voice
+
+BRAND VOICE SUMMARY:
+-------------------
+TONE DESCRIPTION:
+{tone_description}
+
+KEY BRAND PHRASES:
+{', '.join(example_phrases)}
+
+WORDS & PHRASES WE USE:
+{', '.join(frequently_used_words)}
+
+WORDS & PHRASES WE AVOID:
+{', '.join(words_to_avoid)}
+-------------------
+
+The tone of voice prompt should be thorough, specific, and actionable, providing clear guidance on:
+- The brand's personality and character
+- How to structure sentences and paragraphs
+- Word choice and vocabulary preferences
+- Emotional tone to convey
+- Specific dos and don'ts
+- Examples of good copy in this voice
+
+The campaign taglines should be memorable, aligned with the brand voice, and showcase the distinctive style described above.
+
+Format your response as a JSON object with these keys:
+- tone_of_voice_prompt: A comprehensive guide for copywriters (at least 300 words)
+- campaign_taglines: An array of two compelling taglines/headlines
+"""
+
+    def _stream_text(self, chunk: Dict[str, Any], usage: Dict[str, Any]) -> str:
+        """
+        Get the completion text from one streamed event, collecting any token usage it reports.
+
+        Args:
+            chunk: The decoded event data
+            usage: Token usage collected so far; updated in place
+
+        Returns:
+            The text the event adds to the completion (empty if none)
+        """
+        if self.api_provider == 'openai':
+            usage.update(chunk.get('usage') or {})
+            choices = chunk.get('choices') or [{}]
+            return (choices[0].get('delta') or {}).get('content') or ''
+        # Anthropic: the prompt usage arrives with message_start, the completion usage with message_delta
+        usage.update((chunk.get('message') or {}).get('usage') or {})
+        usage.update(chunk.get('usage') or {})
+        if chunk.get('type') == 'content_block_delta':
+            return (chunk.get('delta') or {}).get('text') or ''
+        return ''
+
+    @staticmethod
+    def _streamed_prompt(content: str) -> str:
+        """Get the part of the tone of voice prompt contained in a partially streamed completion."""
+        try:
+            assets = parse_partial_json(content)
+        except ValueError:
+            return ''
+        prompt = assets.get("tone_of_voice_prompt") if isinstance(assets, dict) else None
+        return prompt if isinstance(prompt, str) else ''
+
+
+class APIClient(BaseAPIClient):
+    """Client for making API calls to various AI services for text analysis."""
+
+    def __init__(self, api_provider: str, api_key: str, transport: Optional[HTTPTransport] = None):
+        """
+        Initialize the API client.
+
+        Args:
+            api_provider: The API provider to use ('openai', 'anthropic', 'cohere', or 'custom')
+            api_key: The API key for authentication
+            transport: Optional HTTP transport; defaults to the shared pooled transport
+        """
+        super().__init__(api_provider, api_key)
+        self.transport = transport or http_transport
+
+    def analyze_text(self, text: str, bypass_cache: bool = False,
+                     include_assets: bool = False, hedged: bool = False) -> Tuple[bool, Dict[str, Any]]:
         """
         Analyze text using the configured API provider.
 
         Args:
             text: The text to analyze
+            bypass_cache: If True, always call the provider instead of using a cached response
+            include_assets: If True, also generate the tone of voice assets in the same
+                request (fused mode) and return them under "tone_of_voice_assets".
+                Ignored by providers without fused support and for chunked analyses.
+            hedged: If True, hedge the request to the large model to (and fail over to)
+                the secondary providers of the hedging policy (for each chunk of a chunked analysis)
 
         Returns:
             Tuple containing:
@@ -84,18 +491,6 @@ class APIClient:
         logger.info(f"Starting API analysis with provider: {self.api_provider}")
         logger.info(f"Text length: {len(text)} characters")
 
-        # Save the text to a debug file before sending to API
-        try:
-            with open('debug_api_input.txt', 'w', encoding='utf-8') as f:
-                f.write(text)
-            logger.info("Saved API input text to debug_api_input.txt for inspection")
-        except Exception as e:
-            logger.error(f"Error saving API input debug file: {str(e)}")
-
-        # For debugging purposes, let's add a deliberate delay to simulate API call time
-        import time
-        time.sleep(3)  # Add a 3-second delay to make it obvious when API is being used
-
         if not self.api_provider or not self.api_key:
             logger.error("API provider or API key is missing")
             return False, {"error": "API provider or API key is missing"}
@@ -104,221 +499,239 @@ class APIClient:
             logger.error(f"Unsupported API provider: {self.api_provider}")
             return False, {"error": f"Unsupported API provider: {self.api_provider}"}
 
+        # Keep the prompt within the token budget before anything is sent
+        text, needs_chunking = self._fit_prompt_budget(text)
+        if needs_chunking:
+            return analyze_in_chunks(self, text, bypass_cache=bypass_cache, hedged=hedged)
+
+        breakdown = LatencyBreakdown()
+        include_assets = include_assets and self.api_provider in FUSED_PROVIDERS
+
+        # With model tiering the text goes to a fast model first, so tiered results are cached separately
+        fast_model = model_tiering.fast_model(self.api_provider, text)
+        model = self.endpoints[self.api_provider]['model']
+        if fast_model:
+            model = f"{fast_model}>{model}"
+
+        # Return a cached response for identical requests
+        system_prompt, user_prompt = self._analysis_prompts(include_assets)
+        cache_key = response_cache.make_key(self.api_provider, model, system_prompt, user_prompt, text)
+        if bypass_cache:
+            response_cache.record_bypass()
+            success, results = self._fetch_analysis(text, cache_key, breakdown, include_assets, fast_model, hedged)
+            return success, self._with_latency(results, breakdown, "API analysis") if success else results
+
+        lookup_start = time.time()
+        with breakdown.stage('cache_lookup'):
+            cached_results = response_cache.get(cache_key)
+        if cached_results is not None:
+            logger.info("Returning cached API analysis")
+            self._record_usage('analysis', model, lookup_start, cache_hit=True)
+            return True, self._with_latency(cached_results, breakdown, "Cached API analysis")
+
+        # Concurrent identical requests wait on one upstream call and share its result
+        deadline = get_deadline()
         try:
-            endpoint_config = self.endpoints[self.api_provider]
-            url = f"{endpoint_config['base_url']}{endpoint_config['analyze_endpoint']}"
-            logger.info(f"Making API request to: {url}")
-
-            # Prepare the request based on the API provider
-            if self.api_provider == 'openai':
-                logger.info("Using OpenAI API for analysis")
-                return self._analyze_with_openai(url, text, endpoint_config)
-            elif self.api_provider == 'anthropic':
-                logger.info("Using Anthropic API for analysis")
-                return self._analyze_with_anthropic(url, text, endpoint_config)
-            elif self.api_provider == 'cohere':
-                logger.info("Using Cohere API for analysis")
-                return self._analyze_with_cohere(url, text, endpoint_config)
-            elif self.api_provider == 'custom':
-                logger.info("Using Custom API for analysis")
-                return self._analyze_with_custom(url, text, endpoint_config)
-
-        except Exception as e:
-            logger.error(f"API request failed: {str(e)}")
-            return False, {"error": f"API request failed: {str(e)}"}
+            (success, results), coalesced = singleflight.do(
+                cache_key, lambda: self._fetch_analysis(text, cache_key, breakdown, include_assets, fast_model, hedged),
+                timeout=deadline.remaining() if deadline else None)
+        except FutureTimeoutError:
+            logger.error("Request deadline exceeded waiting for an identical in-flight API analysis")
+            return False, {"error": f"Request deadline exceeded ({deadline.budget:g}s budget)"}
+        if coalesced:
+            logger.info("Shared the result of an identical in-flight API analysis")
+        return success, self._with_latency(results, breakdown, "API analysis") if success else results
+
+    def analyze_batch(self, documents: List[str], local: bool = False,
+                      bypass_cache: bool = False) -> List[Tuple[bool, Dict[str, Any]]]:
+        """
+        Analyze many documents through the provider's batch API instead of
+        one interactive request per document.
 
-    def _analyze_with_openai(self, url: str, text: str, config: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
-        """Make an API call to OpenAI for text analysis."""
-        logger.info("Preparing OpenAI API request payload")
-        payload = {
-            "model": config['model'],
-            "messages": [
-                {"role": "system", "content": "You are a brand voice analysis expert. Your task is to analyze the provided document and extract ALL brand voice characteristics directly from the text. DO NOT generate generic descriptions - only use what's explicitly stated in the document. If the document contains sections like 'Words and phrases we use', 'Words and phrases we avoid', 'We are...', 'We aren't...', 'How we speak', 'Our language toolkit', or any other brand voice guidelines, INCLUDE THEM ALL COMPLETELY. Capture the FULL RICHNESS of the brand voice descriptions. If the document is rich with brand voice information, include ALL of it. If it's sparse, extract whatever brand voice information you can find."},
-                {"role": "user", "content": f"""Analyze the following document and extract ALL brand voice characteristics directly from the text. INCLUDE COMPLETE SECTIONS from the document that describe the brand voice. If the document contains rich brand voice guidelines, preserve ALL of this content in your analysis.
+        Args:
+            documents: The document texts to analyze
+            local: If True, process the batch with the local stand-in instead of the provider's batch API
+            bypass_cache: If True, submit every document even if a cached analysis exists
 
-The response should follow this format:
-```json
-{{
-  "personality_traits": {{
-    "trait1": 9,
-    "trait2": 8,
-    "trait3": 7,
-    "trait4": 6,
-    "trait5": 5
-  }},
-  "emotional_tone": {{
-    "tone1": 9,
-    "tone2": 8,
-    "tone3": 7,
-    "tone4": 6
-  }},
-  "formality": {{
-    "level": 7
-  }},
-  "vocabulary": {{
-    "preferred_terms": ["exact term1", "exact term2", "exact term3", "exact term4", "exact term5", "exact term6", "exact term7", "exact term8", "exact term9", "exact term10", "exact term11", "exact term12", "exact term13", "exact term14", "exact term15"],
-    "avoided_terms": ["avoided term1", "avoided term2", "avoided term3", "avoided term4", "avoided term5", "avoided term6", "avoided term7", "avoided term8", "avoided term9", "avoided term10"]
-  }},
-  "communication_style": {{
-    "key_phrases": ["exact phrase1", "exact phrase2", "exact phrase3", "exact phrase4", "exact phrase5"],
-    "sentence_structure": {{
-      "length_preference": 7,
-      "complexity_preference": 6
-    }},
-    "rich_descriptions": [
-      "Full sentence or paragraph describing the brand voice exactly as stated in the document",
-      "Another rich description from the document that captures the brand's unique voice",
-      "Additional descriptive text that provides context and nuance to the brand voice"
-    ]
-  }}
-}}
-```
+        Returns:
+            List of (success, results) tuples in the same order as the documents
+        """
+        from app.utils.batch_analysis import run_batch, get_batch_runner
 
-CRITICAL INSTRUCTIONS:
-1. ONLY use traits, tones, terms, and phrases that are EXPLICITLY mentioned in the document.
-2. For personality_traits, use the EXACT traits mentioned in the "Words and phrases we use", "We are...", or similar sections.
-3. For emotional_tone, extract tones directly from sections describing the brand's tone or emotional qualities.
-4. For preferred_terms, use the EXACT words and phrases listed in the "Words and phrases we use", "Superlatives", "Adjectives", or similar sections. Include ALL terms mentioned, not just a few.
-5. For avoided_terms, use the EXACT words and phrases listed in the "Words and phrases we avoid", "Words and phrases we're not into", or similar sections. Include ALL terms mentioned, not just a few.
-6. For key_phrases, extract direct quotes or taglines that represent the brand's voice. Include the most distinctive and representative phrases.
-7. For rich_descriptions, extract COMPLETE sentences, paragraphs, or entire sections that describe the brand voice. Include ALL relevant content from the document verbatim.
-8. DO NOT invent or generalize - only use what's explicitly in the document.
-9. Assign numeric scores (1-10) based on the emphasis placed on each trait/tone in the document.
-10. If the document contains a section like "How we speak", "Our language toolkit", "We are/We aren't", or any other brand voice guidelines, INCLUDE THESE SECTIONS COMPLETELY in rich_descriptions.
-11. Include ALL sections that explicitly list words to use or avoid - these are critical to include in full.
-12. Capture the FULL RICHNESS of the brand voice - don't summarize or simplify the descriptions provided in the document.
-13. If the document is rich with brand voice information, include ALL of it. If it's sparse, extract whatever brand voice information you can find.
-14. PRESERVE THE EXACT WORDING from the document - don't paraphrase or rewrite.
+        logger.info(f"Starting batch analysis of {len(documents)} documents with provider: {self.api_provider}")
+        if not self.api_provider or not self.api_key:
+            logger.error("API provider or API key is missing")
+            return [(False, {"error": "API provider or API key is missing"}) for _ in documents]
 
-Here's the document to analyze:
+        if self.api_provider not in self.endpoints:
+            logger.error(f"Unsupported API provider: {self.api_provider}")
+            return [(False, {"error": f"Unsupported API provider: {self.api_provider}"}) for _ in documents]
 
-{text}"""}
-            ],
-            "response_format": {"type": "json_object"}
-        }
+        return run_batch(self, documents, runner=get_batch_runner(self, local=local), bypass_cache=bypass_cache)
 
-        logger.info(f"Sending POST request to OpenAI API: {url}")
-        try:
-            # Disable SSL verification for development purposes
-            # In production, this should be set to True for security
-            response = requests.post(url, json=payload, headers=config['headers'], verify=False)
-
-            # Suppress only the InsecureRequestWarning from urllib3
-            import urllib3
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-            logger.info(f"OpenAI API response status code: {response.status_code}")
-
-            if response.status_code == 200:
-                logger.info("OpenAI API request successful")
-                result = response.json()
-                try:
-                    # Extract the JSON content from the response
-                    content = result['choices'][0]['message']['content']
-                    analysis_results = json.loads(content)
-                    logger.info("Successfully parsed OpenAI API response")
-
-                    # Save the API response to a debug file
-                    try:
-                        with open('debug_api_response.json', 'w', encoding='utf-8') as f:
-                            f.write(json.dumps(analysis_results, indent=2))
-                        logger.info("Saved API response to debug_api_response.json for inspection")
-                    except Exception as e:
-                        logger.error(f"Error saving API response debug file: {str(e)}")
-
-                    return True, analysis_results
-                except (KeyError, json.JSONDecodeError) as e:
-                    logger.error(f"Failed to parse OpenAI API response: {str(e)}")
-                    return False, {"error": f"Failed to parse API response: {str(e)}"}
+    def _fetch_analysis(self, text: str, cache_key: str, breakdown: LatencyBreakdown,
+                        include_assets: bool = False, fast_model: Optional[str] = None,
+                        hedged: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Call the provider for an analysis and cache a successful result. With a
+        fast model, the analysis is only repeated with the large model if the
+        fast model's result fails the tiering confidence checks. Hedged analyses
+        race the large model request across providers.
+        """
+        start_time = time.time()
+        if fast_model:
+            success, results = self._request_analysis(text, breakdown, include_assets, model=fast_model)
+            if success:
+                reasons = model_tiering.assess(results, text, include_assets)
             else:
-                logger.error(f"OpenAI API request failed with status code {response.status_code}: {response.text}")
-                return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
-        except Exception as e:
-            logger.error(f"Exception during OpenAI API request: {str(e)}")
-            return False, {"error": f"API request failed: {str(e)}"}
+                reasons = {"request_failed": results.get("error", "")}
+            model_tiering.record('fast', time.time() - start_time, reasons)
+            if not reasons:
+                logger.info(f"Accepted the {fast_model} analysis")
+                response_cache.set(cache_key, results, upstream_seconds=time.time() - start_time)
+                return success, results
+            logger.info(f"Escalating the analysis from {fast_model} to {self.endpoints[self.api_provider]['model']}: "
+                        + "; ".join(reasons.values()))
+
+        large_start = time.time()
+        if hedged:
+            from app.utils.hedging import hedging_policy
+
+            success, results = hedging_policy.request_analysis(self.api_provider, self.api_key, text, breakdown,
+                                                               include_assets)
+        else:
+            success, results = self._request_analysis(text, breakdown, include_assets)
+        if model_tiering.enabled:
+            model_tiering.record('large', time.time() - large_start)
+        if success:
+            response_cache.set(cache_key, results, upstream_seconds=time.time() - start_time)
+        return success, results
+
+    def _request_analysis(self, text: str, breakdown: LatencyBreakdown, include_assets: bool = False,
+                          model: Optional[str] = None) -> Tuple[bool, Dict[str, Any]]:
+        """Send the analysis request to the configured API provider (optionally to another model), timing each stage."""
+        start_time = time.time()
+        endpoint_config = self.endpoints[self.api_provider]
+        if model:
+            endpoint_config = dict(endpoint_config, model=model)
+        response = None
+        try:
+            url = f"{endpoint_config['base_url']}{endpoint_config['analyze_endpoint']}"
+            logger.info(f"Making API request to: {url}")
 
-    def _analyze_with_anthropic(self, url: str, text: str, config: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
-        """Make an API call to Anthropic for text analysis."""
-        payload = {
-            "model": config['model'],
-            "max_tokens": 4000,
-            "messages": [
-                {"role": "user", "content": f"Analyze the following text and provide a structured JSON response with brand voice parameters including personality traits, emotional tone, formality level, vocabulary characteristics, and communication style:\n\n{text}"}
-            ],
-            "system": "You are a brand voice analysis expert. Provide your analysis as a valid JSON object with no additional text.",
-        }
+            with breakdown.stage('prompt_build'):
+                payload = self._build_analysis_payload(text, endpoint_config, include_assets)
+            response = self._post(url, payload, endpoint_config, breakdown)
+            logger.info(f"{self.api_provider} API response status code: {response.status_code}")
 
-        # Disable SSL verification for development purposes
-        response = requests.post(url, json=payload, headers=config['headers'], verify=False)
+            if response.status_code != 200:
+                trace_store.record('analysis', self.api_provider, payload, response.text, response.status_code)
+                self._record_usage('analysis', endpoint_config['model'], start_time, response, success=False)
+                logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+                return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
 
-        if response.status_code == 200:
-            result = response.json()
+            usage = None
             try:
-                # Extract the JSON content from the response
-                content = result['content'][0]['text']
-                analysis_results = json.loads(content)
-                return True, analysis_results
-            except (KeyError, json.JSONDecodeError) as e:
+                with breakdown.stage('json_decode'):
+                    body = loads(response.content)
+                    usage = extract_usage(self.api_provider, body)
+                    analysis_results = ValidatedResult(validate_analysis(self._parse_response(body)))
+            except AnalysisValidationError as e:
+                trace_store.record('analysis', self.api_provider, payload, body, response.status_code)
+                self._record_usage('analysis', endpoint_config['model'], start_time, response, usage, success=False)
+                logger.error(f"{self.api_provider} API returned an invalid analysis: {str(e)}")
+                return False, {"error": str(e), "validation_errors": [error.as_dict() for error in e.errors]}
+            except (KeyError, IndexError, ValueError) as e:
+                trace_store.record('analysis', self.api_provider, payload, response.text, response.status_code)
+                self._record_usage('analysis', endpoint_config['model'], start_time, response, usage, success=False)
+                logger.error(f"Failed to parse {self.api_provider} API response: {str(e)}")
                 return False, {"error": f"Failed to parse API response: {str(e)}"}
-        else:
-            return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
+            usage_tracker.record(estimate_payload(payload), usage)
+            trace_store.record('analysis', self.api_provider, payload, body, response.status_code,
+                               breakdown.as_dict())
+            self._record_usage('analysis', endpoint_config['model'], start_time, response, usage)
+            logger.info(f"Successfully parsed {self.api_provider} API response")
 
-    def _analyze_with_cohere(self, url: str, text: str, config: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
-        """Make an API call to Cohere for text analysis."""
-        payload = {
-            "model": config['model'],
-            "max_tokens": 4000,
-            "prompt": f"Analyze the following text and provide a structured JSON response with brand voice parameters including personality traits, emotional tone, formality level, vocabulary characteristics, and communication style:\n\n{text}\n\nProvide your analysis as a valid JSON object with no additional text."
-        }
+            return True, analysis_results
 
-        # Disable SSL verification for development purposes
-        response = requests.post(url, json=payload, headers=config['headers'], verify=False)
+        except Exception as e:
+            logger.error(f"API request failed: {str(e)}")
+            self._record_usage('analysis', endpoint_config['model'], start_time, response, success=False)
+            return False, {"error": f"API request failed: {str(e)}"}
 
-        if response.status_code == 200:
-            result = response.json()
-            try:
-                # Extract the JSON content from the response
-                content = result['generations'][0]['text']
-                # Find the JSON part in the response
-                json_start = content.find('{')
-                json_end = content.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_content = content[json_start:json_end]
-                    analysis_results = json.loads(json_content)
-                    return True, analysis_results
-                else:
-                    return False, {"error": "Could not find valid JSON in the response"}
-            except (KeyError, json.JSONDecodeError) as e:
-                return False, {"error": f"Failed to parse API response: {str(e)}"}
-        else:
-            return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
+    def _post(self, url: str, payload: Dict[str, Any], config: Dict[str, Any],
+              breakdown: Optional[LatencyBreakdown] = None, stream: bool = False) -> requests.Response:
+        """
+        Send a request through the rate limit scheduler, retrying rate limited
+        and server error responses with jittered exponential backoff. The
+        timeout, waits and retries are limited by the current request's deadline.
 
-    def _analyze_with_custom(self, url: str, text: str, config: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
-        """Make an API call to a custom API for text analysis."""
-        payload = {
-            "text": text,
-            "model": config['model'],
-            "analysis_type": "brand_voice"
-        }
+        Args:
+            url: The full request URL
+            payload: The JSON request payload
+            config: The endpoint configuration for the provider
+            breakdown: Optional latency breakdown; time on the wire is recorded as
+                "network" and time spent queued or backing off as "rate_limit_wait"
+            stream: If True, return as soon as the headers arrive and leave the body to be read
 
-        # Disable SSL verification for development purposes
-        response = requests.post(url, json=payload, headers=config['headers'], verify=False)
+        Returns:
+            The final requests.Response (which may still be an error after all retries),
+            with the number of retried attempts in its "retries" attribute
 
-        if response.status_code == 200:
-            try:
-                analysis_results = response.json()
-                return True, analysis_results
-            except json.JSONDecodeError as e:
-                return False, {"error": f"Failed to parse API response: {str(e)}"}
-        else:
-            return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
+        Raises:
+            DeadlineExceeded: If the request's deadline leaves no time for the (next) attempt
+        """
+        tokens = estimate_payload_tokens(payload)
+        breakdown = breakdown or LatencyBreakdown()
+        attempt = 0
+        while True:
+            delay = rate_limiter.reserve(self.api_key, tokens)
+            if delay > 0:
+                check_deadline(delay)
+                with breakdown.stage('rate_limit_wait'):
+                    time.sleep(delay)
 
-    def generate_tone_of_voice_assets(self, brand_voice_summary: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+            try:
+                # Disable SSL verification for development purposes
+                # In production, this should be set to True for security
+                with breakdown.stage('network'):
+                    response = self.transport.post(config['base_url'], url, json=payload, headers=config['headers'],
+                                                   timeout=deadline_timeout(self.transport.timeout), verify=False,
+                                                   stream=stream)
+            except requests.ConnectionError as e:
+                if attempt >= rate_limiter.max_retries:
+                    raise
+                backoff = rate_limiter.backoff_delay(attempt)
+                logger.warning(f"Connection error ({str(e)}); retrying in {backoff:.2f}s")
+                check_deadline(backoff)
+                with breakdown.stage('rate_limit_wait'):
+                    time.sleep(backoff)
+                attempt += 1
+                continue
+
+            rate_limiter.update_from_headers(self.api_key, response.headers)
+            if not rate_limiter.should_retry(response.status_code, attempt):
+                response.retries = attempt
+                return response
+            # Release the connection of a streamed response that won't be read
+            response.close()
+
+            backoff = rate_limiter.backoff_delay(attempt, parse_retry_after(response.headers.get('Retry-After', '')))
+            logger.warning(f"{self.api_provider} API returned {response.status_code}; retrying in {backoff:.2f}s "
+                           f"(attempt {attempt + 1} of {rate_limiter.max_retries})")
+            check_deadline(backoff)
+            with breakdown.stage('rate_limit_wait'):
+                time.sleep(backoff)
+            attempt += 1
+
+    def generate_tone_of_voice_assets(self, brand_voice_summary: Dict[str, Any],
+                                      bypass_cache: bool = False) -> Tuple[bool, Dict[str, Any]]:
         """
         Generate tone of voice prompt and campaign taglines based on brand voice summary.
 
         Args:
             brand_voice_summary: The brand voice summary containing tone description, example phrases, etc.
+            bypass_cache: If True, always call the provider instead of using a cached response
 
         Returns:
             Tuple containing:
@@ -340,81 +753,209 @@ Here's the document to analyze:
             url = f"{endpoint_config['base_url']}{endpoint_config['analyze_endpoint']}"
             logger.info(f"Making API request to: {url}")
 
-            # Format the brand voice summary for the prompt
-            tone_description = brand_voice_summary.get('tone_description', '')
-            example_phrases = brand_voice_summary.get('example_phrases', [])
-            frequently_used_words = brand_voice_summary.get('frequently_used_words', [])
-            words_to_avoid = brand_voice_summary.get('words_to_avoid', [])
+            breakdown = LatencyBreakdown()
+            with breakdown.stage('prompt_build'):
+                prompt = self._build_assets_prompt(brand_voice_summary)
 
-            # Create a comprehensive prompt with all brand voice elements
-            prompt = f"""Based on the following brand voice summary, create:
-1. A comprehensive tone of voice prompt that copywriters can use to write in this brand's voice
-2. Two compelling campaign taglines/headlines that exemplify this brand voice
+            # Return cached assets for an identical summary
+            cache_key = response_cache.make_key(self.api_provider, endpoint_config['model'],
+                                                ASSETS_SYSTEM_PROMPT, prompt, '')
+            if bypass_cache:
+                response_cache.record_bypass()
+            else:
+                lookup_start = time.time()
+                with breakdown.stage('cache_lookup'):
+                    cached_assets = response_cache.get(cache_key)
+                if cached_assets is not None:
+                    logger.info("Returning cached tone of voice assets")
+                    self._record_usage('assets', endpoint_config['model'], lookup_start, cache_hit=True)
+                    return True, self._with_latency(cached_assets, breakdown, "Cached tone of voice assets")
+
+            logger.info(f"Using {self.api_provider} API for generating tone of voice assets")
+            start_time = time.time()
+            with breakdown.stage('prompt_build'):
+                payload = self._build_assets_payload(prompt, endpoint_config)
+            response = self._post(url, payload, endpoint_config, breakdown)
+
+            if response.status_code != 200:
+                trace_store.record('assets', self.api_provider, payload, response.text, response.status_code)
+                self._record_usage('assets', endpoint_config['model'], start_time, response, success=False)
+                logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+                return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
 
-BRAND VOICE SUMMARY:
--------------------
-TONE DESCRIPTION:
-{tone_description}
+            try:
+                with breakdown.stage('json_decode'):
+                    body = loads(response.content)
+                    assets = self._parse_response(body)
+            except (KeyError, IndexError, ValueError) as e:
+                trace_store.record('assets', self.api_provider, payload, response.text, response.status_code)
+                self._record_usage('assets', endpoint_config['model'], start_time, response, success=False)
+                logger.error(f"Failed to parse API response: {str(e)}")
+                return False, {"error": f"Failed to parse API response: {str(e)}"}
+            usage = extract_usage(self.api_provider, body)
+            usage_tracker.record(estimate_payload(payload), usage)
+            trace_store.record('assets', self.api_provider, payload, body, response.status_code, breakdown.as_dict())
+            self._record_usage('assets', endpoint_config['model'], start_time, response, usage)
 
-KEY BRAND PHRASES:
-{', '.join(example_phrases)}
+            logger.info("Successfully generated tone of voice assets")
+            response_cache.set(cache_key, assets, upstream_seconds=time.time() - start_time)
+            return True, self._with_latency(assets, breakdown, "Tone of voice assets")
 
-WORDS & PHRASES WE USE:
-{', '.join(frequently_used_words)}
+        except Exception as e:
+            logger.error(f"Failed to generate tone of voice assets: {str(e)}")
+            return False, {"error": f"Failed to generate tone of voice assets: {str(e)}"}
 
-WORDS & PHRASES WE AVOID:
-{', '.join(words_to_avoid)}
--------------------
+    def stream_tone_of_voice_assets(self, brand_voice_summary: Dict[str, Any],
+                                    bypass_cache: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate tone of voice assets, yielding the tone of voice prompt as the
+        provider streams it. Cached assets and providers that can't stream are
+        returned in one piece. The finished assets are cached like those from
+        generate_tone_of_voice_assets, so a later call for the same summary is served from the cache.
 
-The tone of voice prompt should be thorough, specific, and actionable, providing clear guidance on:
-- The brand's personality and character
-- How to structure sentences and paragraphs
-- Word choice and vocabulary preferences
-- Emotional tone to convey
-- Specific dos and don'ts
-- Examples of good copy in this voice
+        Args:
+            brand_voice_summary: The brand voice summary containing tone description, example phrases, etc.
+            bypass_cache: If True, always call the provider instead of using a cached response
 
-The campaign taglines should be memorable, aligned with the brand voice, and showcase the distinctive style described above.
+        Yields:
+            Tuples of an event name and its data:
+                - ("delta", {"text": ...}): The next part of the tone of voice prompt
+                - ("assets", {...}): The finished assets (always the last event on success)
+                - ("error", {"error": ...}): The generation failed (always the last event on failure)
+        """
+        if self.api_provider not in STREAMING_PROVIDERS:
+            success, assets = self.generate_tone_of_voice_assets(brand_voice_summary, bypass_cache=bypass_cache)
+            yield ("assets" if success else "error"), assets
+            return
 
-Format your response as a JSON object with these keys:
-- tone_of_voice_prompt: A comprehensive guide for copywriters (at least 300 words)
-- campaign_taglines: An array of two compelling taglines/headlines
-"""
+        if not self.api_key:
+            logger.error("API provider or API key is missing")
+            yield "error", {"error": "API provider or API key is missing"}
+            return
 
-            # Make the API call based on the provider
-            if self.api_provider == 'openai':
-                logger.info("Using OpenAI API for generating tone of voice assets")
-
-                payload = {
-                    "model": endpoint_config['model'],
-                    "messages": [
-                        {"role": "system", "content": "You are an expert copywriter and brand strategist who creates precise, actionable tone of voice guidelines and compelling campaign taglines."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "response_format": {"type": "json_object"}
-                }
+        response = None
+        try:
+            endpoint_config = self.endpoints[self.api_provider]
+            url = f"{endpoint_config['base_url']}{endpoint_config['analyze_endpoint']}"
 
-                response = requests.post(url, json=payload, headers=endpoint_config['headers'], verify=False)
-
-                if response.status_code == 200:
-                    result = response.json()
-                    try:
-                        content = result['choices'][0]['message']['content']
-                        assets = json.loads(content)
-                        logger.info("Successfully generated tone of voice assets")
-                        return True, assets
-                    except (KeyError, json.JSONDecodeError) as e:
-                        logger.error(f"Failed to parse API response: {str(e)}")
-                        return False, {"error": f"Failed to parse API response: {str(e)}"}
-                else:
-                    logger.error(f"API request failed with status code {response.status_code}: {response.text}")
-                    return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
-
-            # Add support for other API providers as needed
+            breakdown = LatencyBreakdown()
+            with breakdown.stage('prompt_build'):
+                prompt = self._build_assets_prompt(brand_voice_summary)
+
+            # Return cached assets for an identical summary
+            cache_key = response_cache.make_key(self.api_provider, endpoint_config['model'],
+                                                ASSETS_SYSTEM_PROMPT, prompt, '')
+            if bypass_cache:
+                response_cache.record_bypass()
             else:
-                logger.error(f"Tone of voice asset generation not implemented for {self.api_provider}")
-                return False, {"error": f"Tone of voice asset generation not implemented for {self.api_provider}"}
+                lookup_start = time.time()
+                with breakdown.stage('cache_lookup'):
+                    cached_assets = response_cache.get(cache_key)
+                if cached_assets is not None:
+                    logger.info("Returning cached tone of voice assets")
+                    self._record_usage('assets', endpoint_config['model'], lookup_start, cache_hit=True)
+                    yield "assets", cached_assets
+                    return
+
+            logger.info(f"Streaming tone of voice assets from the {self.api_provider} API")
+            start_time = time.time()
+            with breakdown.stage('prompt_build'):
+                payload = self._build_assets_payload(prompt, endpoint_config)
+                payload["stream"] = True
+                if self.api_provider == 'openai':
+                    payload["stream_options"] = {"include_usage": True}
+            response = self._post(url, payload, endpoint_config, breakdown, stream=True)
+
+            if response.status_code != 200:
+                trace_store.record('assets', self.api_provider, payload, response.text, response.status_code)
+                self._record_usage('assets', endpoint_config['model'], start_time, response, success=False)
+                logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+                yield "error", {"error": f"API request failed with status code {response.status_code}: {response.text}"}
+                return
+
+            parts: List[str] = []
+            usage: Dict[str, Any] = {}
+            length = parsed_length = sent = 0
+            first_token_ms = None
+            for event, data in iter_sse_events(response.iter_content(chunk_size=None)):
+                if data == '[DONE]':
+                    break
+                chunk = loads(data)
+                text = self._stream_text(chunk, usage)
+                if not text:
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = (time.time() - start_time) * 1000
+                parts.append(text)
+                length += len(text)
+                # Re-parse only every few characters; the whole completion is parsed again each time
+                if length - parsed_length < STREAM_PARSE_INTERVAL:
+                    continue
+                parsed_length = length
+                prompt_so_far = self._streamed_prompt(''.join(parts))
+                if len(prompt_so_far) > sent:
+                    yield "delta", {"text": prompt_so_far[sent:]}
+                    sent = len(prompt_so_far)
+
+            content = ''.join(parts)
+            try:
+                assets = loads(content)
+                if not isinstance(assets, dict):
+                    raise ValueError("The response is not a JSON object")
+            except ValueError as e:
+                trace_store.record('assets', self.api_provider, payload, content, response.status_code)
+                self._record_usage('assets', endpoint_config['model'], start_time, response, success=False)
+                logger.error(f"Failed to parse streamed API response: {str(e)}")
+                yield "error", {"error": f"Failed to parse API response: {str(e)}"}
+                return
+
+            prompt_text = assets.get("tone_of_voice_prompt")
+            if isinstance(prompt_text, str) and len(prompt_text) > sent:
+                yield "delta", {"text": prompt_text[sent:]}
+
+            usage = extract_usage(self.api_provider, {"usage": usage})
+            usage_tracker.record(estimate_payload(payload), usage)
+            trace_store.record('assets', self.api_provider, payload, content, response.status_code, breakdown.as_dict())
+            self._record_usage('assets', endpoint_config['model'], start_time, response, usage)
+            logger.info(f"Streamed tone of voice assets (first token after {first_token_ms or 0:.0f}ms, "
+                        f"{(time.time() - start_time) * 1000:.0f}ms in total)")
+            response_cache.set(cache_key, assets, upstream_seconds=time.time() - start_time)
+            yield "assets", assets
 
         except Exception as e:
-            logger.error(f"Failed to generate tone of voice assets: {str(e)}")
-            return False, {"error": f"Failed to generate tone of voice assets: {str(e)}"}
+            logger.error(f"Failed to stream tone of voice assets: {str(e)}")
+            yield "error", {"error": f"Failed to generate tone of voice assets: {str(e)}"}
+        finally:
+            if response is not None:
+                response.close()
+
+
+# Cache of API clients keyed by provider and API key hash, so routes reuse one client
+# instead of building a new one on every request. Bounded, least recently used first out,
+# so submitted keys don't stay in memory for the worker's lifetime.
+_client_cache: "OrderedDict[Tuple[str, str], APIClient]" = OrderedDict()
+_client_cache_lock = threading.Lock()
+
+
+def get_api_client(api_provider: str, api_key: str) -> APIClient:
+    """
+    Get a shared API client for a provider and API key.
+
+    Args:
+        api_provider: The API provider to use ('openai', 'anthropic', 'cohere', or 'custom')
+        api_key: The API key for authentication
+
+    Returns:
+        An APIClient that uses the process-wide pooled HTTP transport
+    """
+    cache_key = (api_provider, hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+    with _client_cache_lock:
+        client = _client_cache.get(cache_key)
+        if client is not None:
+            _client_cache.move_to_end(cache_key)
+            return client
+        client = APIClient(api_provider, api_key)
+        _client_cache[cache_key] = client
+        while len(_client_cache) > CLIENT_CACHE_SIZE:
+            _client_cache.popitem(last=False)
+    return client
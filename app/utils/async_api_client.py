@@ -0,0 +1,372 @@
+"""
+Asyncio API client for intelligent text analysis.
+This module provides an async counterpart of APIClient that shares one
+event-loop-friendly connection pool and caps in-flight requests per API key.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import weakref
+from typing import Dict, Any, Tuple, List, Optional
+
+import httpx
+
+from app.utils.api_client import BaseAPIClient, ASSETS_SYSTEM_PROMPT, FUSED_PROVIDERS
+from app.utils.http_transport import http_transport
+from app.utils.response_cache import response_cache
+from app.utils.rate_limiter import rate_limiter, estimate_payload_tokens, parse_retry_after
+from app.utils.chunked_analysis import split_into_chunks, merge_analysis_results
+from app.utils.token_estimator import estimate_tokens, estimate_payload, extract_usage, usage_tracker
+from app.utils.latency import LatencyBreakdown
+from app.utils.trace_store import trace_store
+from app.utils.fast_json import loads
+from app.utils.deadline import deadline_timeout, check_deadline, DeadlineExceeded
+from app.utils.analysis_schema import validate_analysis, AnalysisValidationError, ValidatedResult
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent requests per API key (overridable via environment variable)
+MAX_IN_FLIGHT_PER_KEY = int(os.environ.get('ASYNC_MAX_IN_FLIGHT_PER_KEY', 8))
+
+
+class AsyncTransport:
+    """Shared async connection pool and per-key concurrency limits, one set per event loop."""
+
+    def __init__(self, max_in_flight_per_key: int = MAX_IN_FLIGHT_PER_KEY):
+        """
+        Initialize the async transport.
+
+        Args:
+            max_in_flight_per_key: Maximum number of concurrent requests per API key
+        """
+        self.max_in_flight_per_key = max_in_flight_per_key
+        # Keyed weakly by event loop so pools of finished loops are released
+        self._clients = weakref.WeakKeyDictionary()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Get the pooled httpx client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # Reuse the pool size and timeouts configured for the sync transport
+            client = httpx.AsyncClient(
+                verify=False,
+                limits=httpx.Limits(max_connections=http_transport.pool_size * 4,
+                                    max_keepalive_connections=http_transport.pool_size),
+                timeout=httpx.Timeout(http_transport.read_timeout, connect=http_transport.connect_timeout)
+            )
+            self._clients[loop] = client
+        return client
+
+    def get_semaphore(self, api_key: str) -> asyncio.Semaphore:
+        """Get the semaphore limiting in-flight requests for an API key on the running event loop."""
+        loop = asyncio.get_running_loop()
+        key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+        semaphores = self._semaphores.setdefault(loop, {})
+        semaphore = semaphores.get(key_hash)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight_per_key)
+            semaphores[key_hash] = semaphore
+        return semaphore
+
+    async def post(self, api_key: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a POST request, waiting for a free slot for the API key first.
+
+        Args:
+            api_key: The API key the request is made with
+            url: The full request URL
+            **kwargs: Extra arguments passed to httpx (json, headers, timeout, ...)
+
+        Returns:
+            The httpx.Response object
+        """
+        async with self.get_semaphore(api_key):
+            return await self.get_client().post(url, **kwargs)
+
+    async def aclose(self):
+        """Close the pooled client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+        self._semaphores.pop(loop, None)
+
+
+# Create a process-wide instance for use throughout the application
+async_transport = AsyncTransport()
+
+
+class AsyncAPIClient(BaseAPIClient):
+    """Asyncio client for making API calls to various AI services for text analysis."""
+
+    def __init__(self, api_provider: str, api_key: str, transport: Optional[AsyncTransport] = None):
+        """
+        Initialize the async API client.
+
+        Args:
+            api_provider: The API provider to use ('openai', 'anthropic', 'cohere', or 'custom')
+            api_key: The API key for authentication
+            transport: Optional async transport; defaults to the shared async transport
+        """
+        super().__init__(api_provider, api_key)
+        self.async_transport = transport or async_transport
+
+    def _validate(self) -> Optional[Dict[str, Any]]:
+        """Return an error result if the provider or key is not usable, otherwise None."""
+        if not self.api_provider or not self.api_key:
+            logger.error("API provider or API key is missing")
+            return {"error": "API provider or API key is missing"}
+
+        if self.api_provider not in self.endpoints:
+            logger.error(f"Unsupported API provider: {self.api_provider}")
+            return {"error": f"Unsupported API provider: {self.api_provider}"}
+        return None
+
+    async def _post(self, url: str, payload: Dict[str, Any], config: Dict[str, Any]) -> httpx.Response:
+        """
+        Send a request through the rate limit scheduler, retrying rate limited
+        and server error responses with jittered exponential backoff. The
+        timeout, waits and retries are limited by the current request's deadline.
+        The number of retried attempts is set as the response's "retries" attribute.
+        """
+        tokens = estimate_payload_tokens(payload)
+        attempt = 0
+        while True:
+            delay = rate_limiter.reserve(self.api_key, tokens)
+            if delay > 0:
+                check_deadline(delay)
+                await asyncio.sleep(delay)
+
+            connect_timeout, read_timeout = deadline_timeout(http_transport.timeout)
+            try:
+                response = await self.async_transport.post(self.api_key, url, json=payload, headers=config['headers'],
+                                                           timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+            except httpx.TransportError as e:
+                if attempt >= rate_limiter.max_retries or isinstance(e, httpx.TimeoutException):
+                    raise
+                backoff = rate_limiter.backoff_delay(attempt)
+                logger.warning(f"Connection error ({str(e)}); retrying in {backoff:.2f}s")
+                check_deadline(backoff)
+                await asyncio.sleep(backoff)
+                attempt += 1
+                continue
+
+            rate_limiter.update_from_headers(self.api_key, response.headers)
+            if not rate_limiter.should_retry(response.status_code, attempt):
+                response.retries = attempt
+                return response
+
+            backoff = rate_limiter.backoff_delay(attempt, parse_retry_after(response.headers.get('Retry-After', '')))
+            logger.warning(f"{self.api_provider} API returned {response.status_code}; retrying in {backoff:.2f}s "
+                           f"(attempt {attempt + 1} of {rate_limiter.max_retries})")
+            check_deadline(backoff)
+            await asyncio.sleep(backoff)
+            attempt += 1
+
+    async def _send(self, payload: Dict[str, Any], breakdown: LatencyBreakdown,
+                    kind: str) -> Tuple[bool, Dict[str, Any]]:
+        """Send a payload to the configured provider and parse the JSON content of the response."""
+        endpoint_config = self.endpoints[self.api_provider]
+        url = f"{endpoint_config['base_url']}{endpoint_config['analyze_endpoint']}"
+        logger.info(f"Making async API request to: {url}")
+
+        start_time = time.time()
+        model = endpoint_config['model']
+        try:
+            with breakdown.stage('network'):
+                response = await self._post(url, payload, endpoint_config)
+        except (httpx.HTTPError, DeadlineExceeded) as e:
+            logger.error(f"Async API request failed: {str(e)}")
+            await asyncio.to_thread(self._record_usage, kind, model, start_time, None, None, False)
+            return False, {"error": f"API request failed: {str(e)}"}
+
+        if response.status_code != 200:
+            trace_store.record(kind, self.api_provider, payload, response.text, response.status_code)
+            await asyncio.to_thread(self._record_usage, kind, model, start_time, response, None, False)
+            logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+            return False, {"error": f"API request failed with status code {response.status_code}: {response.text}"}
+
+        usage = None
+        try:
+            with breakdown.stage('json_decode'):
+                body = loads(response.content)
+                usage = extract_usage(self.api_provider, body)
+                results = self._parse_response(body)
+                if kind == 'analysis':
+                    results = ValidatedResult(validate_analysis(results))
+        except AnalysisValidationError as e:
+            trace_store.record(kind, self.api_provider, payload, body, response.status_code)
+            await asyncio.to_thread(self._record_usage, kind, model, start_time, response, usage, False)
+            logger.error(f"{self.api_provider} API returned an invalid analysis: {str(e)}")
+            return False, {"error": str(e), "validation_errors": [error.as_dict() for error in e.errors]}
+        except (KeyError, IndexError, ValueError) as e:
+            trace_store.record(kind, self.api_provider, payload, response.text, response.status_code)
+            await asyncio.to_thread(self._record_usage, kind, model, start_time, response, usage, False)
+            logger.error(f"Failed to parse {self.api_provider} API response: {str(e)}")
+            return False, {"error": f"Failed to parse API response: {str(e)}"}
+        usage_tracker.record(estimate_payload(payload), usage)
+        trace_store.record(kind, self.api_provider, payload, body, response.status_code, breakdown.as_dict())
+        await asyncio.to_thread(self._record_usage, kind, model, start_time, response, usage)
+        return True, results
+
+    async def analyze_text(self, text: str, bypass_cache: bool = False,
+                           include_assets: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Analyze text using the configured API provider.
+
+        Args:
+            text: The text to analyze
+            bypass_cache: If True, always call the provider instead of using a cached response
+            include_assets: If True, also generate the tone of voice assets in the same request (fused mode)
+
+        Returns:
+            Tuple containing:
+                - Success flag (True/False)
+                - Analysis results or error message
+        """
+        logger.info(f"Starting async API analysis with provider: {self.api_provider}")
+        logger.info(f"Text length: {len(text)} characters")
+
+        error = self._validate()
+        if error:
+            return False, error
+
+        # Keep the prompt within the token budget before anything is sent
+        text, needs_chunking = self._fit_prompt_budget(text)
+        if needs_chunking:
+            return await self._analyze_chunks(text, bypass_cache)
+
+        breakdown = LatencyBreakdown()
+        endpoint_config = self.endpoints[self.api_provider]
+        include_assets = include_assets and self.api_provider in FUSED_PROVIDERS
+        system_prompt, user_prompt = self._analysis_prompts(include_assets)
+        cache_key = response_cache.make_key(self.api_provider, endpoint_config['model'],
+                                            system_prompt, user_prompt, text)
+        if bypass_cache:
+            response_cache.record_bypass()
+        else:
+            lookup_start = time.time()
+            with breakdown.stage('cache_lookup'):
+                cached_results = await asyncio.to_thread(response_cache.get, cache_key)
+            if cached_results is not None:
+                logger.info("Returning cached API analysis")
+                await asyncio.to_thread(self._record_usage, 'analysis', endpoint_config['model'], lookup_start,
+                                        cache_hit=True)
+                return True, self._with_latency(cached_results, breakdown, "Cached async API analysis")
+
+        start_time = time.time()
+        success, results = await self.request_analysis(text, breakdown, include_assets)
+        if not success:
+            return success, results
+        await asyncio.to_thread(response_cache.set, cache_key, results, time.time() - start_time)
+        return True, self._with_latency(results, breakdown, "Async API analysis")
+
+    async def request_analysis(self, text: str, breakdown: LatencyBreakdown,
+                               include_assets: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Send the analysis request for a text to the configured provider, without
+        the response cache.
+
+        Args:
+            text: The text to analyze, already within the prompt token budget
+            breakdown: Latency breakdown the request's stages are timed into
+            include_assets: If True, also generate the tone of voice assets in the same request (fused mode)
+
+        Returns:
+            Tuple containing:
+                - Success flag (True/False)
+                - Analysis results or error message
+        """
+        endpoint_config = self.endpoints[self.api_provider]
+        include_assets = include_assets and self.api_provider in FUSED_PROVIDERS
+        with breakdown.stage('prompt_build'):
+            payload = self._build_analysis_payload(text, endpoint_config, include_assets)
+        return await self._send(payload, breakdown, 'analysis')
+
+    async def _analyze_chunks(self, text: str, bypass_cache: bool) -> Tuple[bool, Dict[str, Any]]:
+        """Analyze an over-budget text as concurrent chunks and merge the results."""
+        chunks = split_into_chunks(text)
+        outcomes = await asyncio.gather(*(self.analyze_text(chunk, bypass_cache) for chunk in chunks))
+        results = [result for success, result in outcomes if success]
+        for result in results:
+            result.pop("latency", None)
+        weights = [estimate_tokens(chunk) for chunk, (success, _) in zip(chunks, outcomes) if success]
+        errors = [result.get('error', 'Unknown error') for success, result in outcomes if not success]
+        if not results:
+            return False, {"error": errors[0] if errors else "Chunked analysis failed"}
+
+        merged = merge_analysis_results(results, weights)
+        merged["chunking"] = {
+            "chunks": len(chunks),
+            "chunks_analyzed": len(results),
+            "chunk_errors": errors
+        }
+        return True, merged
+
+    async def generate_tone_of_voice_assets(self, brand_voice_summary: Dict[str, Any],
+                                            bypass_cache: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Generate tone of voice prompt and campaign taglines based on brand voice summary.
+
+        Args:
+            brand_voice_summary: The brand voice summary containing tone description, example phrases, etc.
+            bypass_cache: If True, always call the provider instead of using a cached response
+
+        Returns:
+            Tuple containing:
+                - Success flag (True/False)
+                - Generated assets or error message
+        """
+        logger.info("Generating tone of voice assets using async API")
+
+        error = self._validate()
+        if error:
+            return False, error
+
+        breakdown = LatencyBreakdown()
+        endpoint_config = self.endpoints[self.api_provider]
+        with breakdown.stage('prompt_build'):
+            prompt = self._build_assets_prompt(brand_voice_summary)
+        cache_key = response_cache.make_key(self.api_provider, endpoint_config['model'],
+                                            ASSETS_SYSTEM_PROMPT, prompt, '')
+        if bypass_cache:
+            response_cache.record_bypass()
+        else:
+            lookup_start = time.time()
+            with breakdown.stage('cache_lookup'):
+                cached_assets = await asyncio.to_thread(response_cache.get, cache_key)
+            if cached_assets is not None:
+                logger.info("Returning cached tone of voice assets")
+                await asyncio.to_thread(self._record_usage, 'assets', endpoint_config['model'], lookup_start,
+                                        cache_hit=True)
+                return True, self._with_latency(cached_assets, breakdown, "Cached async tone of voice assets")
+
+        start_time = time.time()
+        with breakdown.stage('prompt_build'):
+            payload = self._build_assets_payload(prompt, endpoint_config)
+        success, assets = await self._send(payload, breakdown, 'assets')
+        if not success:
+            return success, assets
+        await asyncio.to_thread(response_cache.set, cache_key, assets, time.time() - start_time)
+        return True, self._with_latency(assets, breakdown, "Async tone of voice assets")
+
+    async def analyze_many(self, texts: List[str], bypass_cache: bool = False) -> List[Tuple[bool, Dict[str, Any]]]:
+        """
+        Analyze several texts concurrently. The number of requests in flight is
+        capped by the per-key semaphore of the shared async transport.
+
+        Args:
+            texts: The texts to analyze
+            bypass_cache: If True, always call the provider instead of using cached responses
+
+        Returns:
+            List of (success, results) tuples in the same order as the texts
+        """
+        return list(await asyncio.gather(*(self.analyze_text(text, bypass_cache) for text in texts)))
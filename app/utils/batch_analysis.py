@@ -0,0 +1,460 @@
+"""
+Offline batch analysis for bulk brand onboarding.
+This module writes many analysis requests to a JSONL file in the provider's
+batch format, submits it to the provider's batch API (or a local stand-in that
+processes the file without any network), polls until the batch finishes and
+maps the results back to the submitted documents.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Dict, Any, List, Tuple, Optional, Callable
+
+from app.utils.response_cache import response_cache
+from app.utils.token_estimator import estimate_payload, extract_usage, usage_tracker, trim_to_budget, estimate_tokens
+from app.utils.analysis_schema import validate_analysis, AnalysisValidationError, ValidatedResult
+from app.utils.usage_ledger import usage_ledger
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Batch settings (overridable via environment variables)
+BATCH_DIR = os.environ.get('BATCH_DIR', os.path.join('cache', 'batches'))
+BATCH_POLL_INTERVAL = float(os.environ.get('BATCH_POLL_INTERVAL', 30))
+BATCH_TIMEOUT = float(os.environ.get('BATCH_TIMEOUT', 24 * 60 * 60))
+
+
+def fit_batch_documents(api_client, documents: List[str]) -> List[str]:
+    """
+    Trim documents that exceed the prompt token budget. Batch requests are
+    independent, so over-budget documents are trimmed instead of chunked.
+
+    Args:
+        api_client: The APIClient whose prompts are counted against the budget
+        documents: The document texts to analyze
+
+    Returns:
+        The documents, each within the budget
+    """
+    text_budget = api_client._text_token_budget()
+    fitted = []
+    for text in documents:
+        if estimate_tokens(text) > text_budget:
+            usage_tracker.record_budget_action('trimmed')
+            text = trim_to_budget(text, max(text_budget, 0))
+        fitted.append(text)
+    return fitted
+
+
+def build_batch_lines(api_client, documents: List[str]) -> List[Dict[str, Any]]:
+    """
+    Build one batch request line per document in the provider's batch format.
+
+    OpenAI lines carry the chat completions body under "body"; Anthropic lines
+    carry the messages request under "params". Other providers use the OpenAI
+    layout, which the local runner understands.
+
+    Args:
+        api_client: The APIClient whose provider, model and prompts are used
+        documents: The document texts to analyze, already fitted to the budget
+            with fit_batch_documents()
+
+    Returns:
+        List of batch request lines, with custom_id "doc-<index>"
+    """
+    endpoint_config = api_client.endpoints[api_client.api_provider]
+    lines = []
+    for index, text in enumerate(documents):
+        payload = api_client._build_analysis_payload(text, endpoint_config)
+        custom_id = f"doc-{index}"
+        if api_client.api_provider == 'anthropic':
+            lines.append({"custom_id": custom_id, "params": payload})
+        else:
+            lines.append({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": f"/v1{endpoint_config['analyze_endpoint']}",
+                "body": payload
+            })
+    return lines
+
+
+def write_batch_file(lines: List[Dict[str, Any]], path: Optional[str] = None) -> str:
+    """
+    Write batch request lines to a JSONL file.
+
+    Args:
+        lines: The batch request lines
+        path: Optional file path; defaults to a new file in BATCH_DIR
+
+    Returns:
+        The path of the written file
+    """
+    if path is None:
+        os.makedirs(BATCH_DIR, exist_ok=True)
+        path = os.path.join(BATCH_DIR, f"batch_{uuid.uuid4().hex}.jsonl")
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(json.dumps(line) + '\n')
+    logger.info(f"Wrote {len(lines)} batch requests to {path}")
+    return path
+
+
+def read_jsonl(content: str) -> List[Dict[str, Any]]:
+    """Parse JSONL content, skipping blank lines."""
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+class OpenAIBatchRunner:
+    """Submits a JSONL file to the OpenAI Files and Batches APIs."""
+
+    def __init__(self, api_client):
+        """
+        Initialize the runner.
+
+        Args:
+            api_client: The APIClient whose key and transport are used
+        """
+        self.api_client = api_client
+        self.base_url = api_client.endpoints['openai']['base_url']
+        self.headers = {'Authorization': f'Bearer {api_client.api_key}'}
+
+    def submit(self, path: str) -> str:
+        """Upload the JSONL file and create a batch. Returns the batch ID."""
+        transport = self.api_client.transport
+        with open(path, 'rb') as f:
+            response = transport.post(self.base_url, f"{self.base_url}/files", headers=self.headers,
+                                      data={'purpose': 'batch'}, files={'file': (os.path.basename(path), f)})
+        response.raise_for_status()
+        file_id = response.json()['id']
+
+        response = transport.post(self.base_url, f"{self.base_url}/batches", headers=self.headers, json={
+            "input_file_id": file_id,
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h"
+        })
+        response.raise_for_status()
+        return response.json()['id']
+
+    def poll(self, batch_id: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a batch's status.
+
+        Returns:
+            Tuple containing:
+                - True once the batch is no longer running
+                - An error message if the batch did not complete, otherwise None
+        """
+        response = self.api_client.transport.get(self.base_url, f"{self.base_url}/batches/{batch_id}",
+                                                 headers=self.headers)
+        response.raise_for_status()
+        status = response.json().get('status')
+        if status == 'completed':
+            return True, None
+        if status in ('failed', 'expired', 'cancelled'):
+            return True, f"Batch {batch_id} {status}"
+        return False, None
+
+    def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Download the batch output lines."""
+        transport = self.api_client.transport
+        response = transport.get(self.base_url, f"{self.base_url}/batches/{batch_id}", headers=self.headers)
+        response.raise_for_status()
+        batch = response.json()
+
+        lines = []
+        for file_key in ('output_file_id', 'error_file_id'):
+            file_id = batch.get(file_key)
+            if file_id:
+                response = transport.get(self.base_url, f"{self.base_url}/files/{file_id}/content",
+                                         headers=self.headers)
+                response.raise_for_status()
+                lines.extend(read_jsonl(response.text))
+        return lines
+
+
+class AnthropicBatchRunner:
+    """Submits batch requests to the Anthropic Message Batches API."""
+
+    def __init__(self, api_client):
+        """
+        Initialize the runner.
+
+        Args:
+            api_client: The APIClient whose key and transport are used
+        """
+        self.api_client = api_client
+        self.base_url = api_client.endpoints['anthropic']['base_url']
+        self.headers = api_client.endpoints['anthropic']['headers']
+
+    def submit(self, path: str) -> str:
+        """Create a message batch from the JSONL file. Returns the batch ID."""
+        with open(path, 'r', encoding='utf-8') as f:
+            batch_requests = read_jsonl(f.read())
+        response = self.api_client.transport.post(self.base_url, f"{self.base_url}/messages/batches",
+                                                  headers=self.headers, json={"requests": batch_requests})
+        response.raise_for_status()
+        return response.json()['id']
+
+    def poll(self, batch_id: str) -> Tuple[bool, Optional[str]]:
+        """Check a batch's processing status. Returns (finished, error message or None)."""
+        response = self.api_client.transport.get(self.base_url, f"{self.base_url}/messages/batches/{batch_id}",
+                                                 headers=self.headers)
+        response.raise_for_status()
+        return response.json().get('processing_status') == 'ended', None
+
+    def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Download the batch result lines."""
+        transport = self.api_client.transport
+        response = transport.get(self.base_url, f"{self.base_url}/messages/batches/{batch_id}",
+                                 headers=self.headers)
+        response.raise_for_status()
+        results_url = response.json().get('results_url')
+        if not results_url:
+            return []
+        response = transport.get(self.base_url, results_url, headers=self.headers)
+        response.raise_for_status()
+        return read_jsonl(response.text)
+
+
+class LocalBatchRunner:
+    """
+    Local stand-in for a provider batch API.
+
+    Processes the JSONL file in-process and writes an output file in the
+    OpenAI batch output format, so the whole batch flow can run offline.
+    Each request body is passed to a responder; by default the body is sent
+    to the client's endpoint one request at a time (e.g. a local mock server).
+    """
+
+    def __init__(self, api_client, responder: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        """
+        Initialize the runner.
+
+        Args:
+            api_client: The APIClient used by the default responder
+            responder: Optional callable mapping a request body to a response body
+        """
+        self.api_client = api_client
+        self.responder = responder or self._send
+        self._outputs: Dict[str, str] = {}
+
+    def _send(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request body to the client's endpoint and return the decoded response."""
+        endpoint_config = self.api_client.endpoints[self.api_client.api_provider]
+        url = f"{endpoint_config['base_url']}{endpoint_config['analyze_endpoint']}"
+        response = self.api_client._post(url, body, endpoint_config)
+        if response.status_code != 200:
+            raise ValueError(f"API request failed with status code {response.status_code}: {response.text}")
+        return response.json()
+
+    def submit(self, path: str) -> str:
+        """Process every line of the JSONL file and write the output file. Returns the batch ID."""
+        batch_id = f"local_batch_{uuid.uuid4().hex}"
+        output_path = f"{os.path.splitext(path)[0]}_output.jsonl"
+
+        with open(path, 'r', encoding='utf-8') as f:
+            request_lines = read_jsonl(f.read())
+
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for line in request_lines:
+                body = line.get('body', line.get('params'))
+                try:
+                    output = {"custom_id": line['custom_id'],
+                              "response": {"status_code": 200, "body": self.responder(body)}, "error": None}
+                except Exception as e:
+                    output = {"custom_id": line['custom_id'], "response": None,
+                              "error": {"message": str(e)}}
+                out.write(json.dumps(output) + '\n')
+
+        self._outputs[batch_id] = output_path
+        logger.info(f"Processed {len(request_lines)} batch requests locally into {output_path}")
+        return batch_id
+
+    def poll(self, batch_id: str) -> Tuple[bool, Optional[str]]:
+        """Local batches finish during submit."""
+        return True, None
+
+    def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Read the output lines written by submit."""
+        with open(self._outputs.pop(batch_id), 'r', encoding='utf-8') as f:
+            return read_jsonl(f.read())
+
+
+def get_batch_runner(api_client, local: bool = False):
+    """
+    Get the batch runner for a client's provider.
+
+    Args:
+        api_client: The APIClient to run batches for
+        local: If True, use the local stand-in instead of the provider's batch API
+
+    Returns:
+        A batch runner, or None if the provider has no batch API
+    """
+    if local:
+        return LocalBatchRunner(api_client)
+    if api_client.api_provider == 'openai':
+        return OpenAIBatchRunner(api_client)
+    if api_client.api_provider == 'anthropic':
+        return AnthropicBatchRunner(api_client)
+    return None
+
+
+def _result_body(line: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Get the response body (or an error message) from an OpenAI, Anthropic or local result line."""
+    if 'result' in line:
+        result = line['result'] or {}
+        if result.get('type') == 'succeeded':
+            return result.get('message'), None
+        error = result.get('error') or {}
+        return None, error.get('message') or f"Batch request {result.get('type', 'failed')}"
+
+    if line.get('error'):
+        return None, line['error'].get('message', 'Batch request failed')
+    response = line.get('response') or {}
+    if response.get('status_code') != 200:
+        return None, f"Batch request failed with status code {response.get('status_code')}"
+    return response.get('body'), None
+
+
+def run_batch(api_client, documents: List[str], runner=None, poll_interval: float = BATCH_POLL_INTERVAL,
+              timeout: float = BATCH_TIMEOUT, bypass_cache: bool = False) -> List[Tuple[bool, Dict[str, Any]]]:
+    """
+    Analyze documents through a batch: build the JSONL file, submit it, poll
+    until it finishes and parse each result. Documents with a cached analysis
+    are not resubmitted, and new results are cached.
+
+    Args:
+        api_client: The APIClient to analyze with
+        documents: The document texts to analyze
+        runner: Optional batch runner; defaults to the provider's batch API
+        poll_interval: Seconds between status checks
+        timeout: Seconds to wait for the batch before giving up
+        bypass_cache: If True, submit every document even if a cached analysis exists
+
+    Returns:
+        List of (success, results) tuples in the same order as the documents
+    """
+    runner = runner or get_batch_runner(api_client)
+    if runner is None:
+        error = {"error": f"Batch analysis is not available for provider: {api_client.api_provider}"}
+        return [(False, dict(error)) for _ in documents]
+
+    endpoint_config = api_client.endpoints[api_client.api_provider]
+    system_prompt, user_prompt = api_client._analysis_prompts()
+    # Key the cache on the text actually sent, as APIClient.analyze_text does
+    documents = fit_batch_documents(api_client, documents)
+    cache_keys = [response_cache.make_key(api_client.api_provider, endpoint_config['model'],
+                                          system_prompt, user_prompt, text) for text in documents]
+
+    outcomes: List[Optional[Tuple[bool, Dict[str, Any]]]] = [None] * len(documents)
+    pending = []
+    for index, cache_key in enumerate(cache_keys):
+        cached = None if bypass_cache else response_cache.get(cache_key)
+        if cached is not None:
+            usage_ledger.record('batch', api_client.api_provider, endpoint_config['model'], api_client.api_key,
+                                cache_hit=True)
+            outcomes[index] = (True, cached)
+        else:
+            pending.append(index)
+
+    if not pending:
+        logger.info("All batch documents were cached")
+        return outcomes
+
+    lines = build_batch_lines(api_client, [documents[i] for i in pending])
+    payloads = {line['custom_id']: line.get('body', line.get('params')) for line in lines}
+    path = write_batch_file(lines)
+
+    start_time = time.time()
+    try:
+        batch_id = runner.submit(path)
+        logger.info(f"Submitted batch {batch_id} with {len(lines)} requests")
+        while True:
+            finished, error = runner.poll(batch_id)
+            if finished:
+                break
+            if time.time() - start_time > timeout:
+                error = f"Batch {batch_id} did not finish within {timeout:.0f} seconds"
+                break
+            time.sleep(poll_interval)
+        result_lines = [] if error else runner.results(batch_id)
+    except Exception as e:
+        logger.error(f"Batch analysis failed: {str(e)}")
+        error = f"Batch analysis failed: {str(e)}"
+        result_lines = []
+
+    by_id = {line.get('custom_id'): line for line in result_lines}
+    for position, index in enumerate(pending):
+        custom_id = f"doc-{position}"
+        line = by_id.get(custom_id)
+        if line is None:
+            outcomes[index] = (False, {"error": error or f"No batch result for {custom_id}"})
+            continue
+
+        body, line_error = _result_body(line)
+        if line_error:
+            outcomes[index] = (False, {"error": line_error})
+            continue
+        # Batch requests have no latency of their own; the ledger gets the batch's turnaround
+        turnaround = time.time() - start_time
+        usage = None
+        try:
+            usage = extract_usage(api_client.api_provider, body)
+            usage_tracker.record(estimate_payload(payloads[custom_id]), usage)
+            results = ValidatedResult(validate_analysis(api_client._parse_response(body)))
+        except AnalysisValidationError as e:
+            usage_ledger.record('batch', api_client.api_provider, endpoint_config['model'], api_client.api_key,
+                                usage, latency=turnaround, success=False)
+            outcomes[index] = (False, {"error": str(e), "validation_errors": [error.as_dict() for error in e.errors]})
+            continue
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            usage_ledger.record('batch', api_client.api_provider, endpoint_config['model'], api_client.api_key,
+                                usage, latency=turnaround, success=False)
+            outcomes[index] = (False, {"error": f"Failed to parse API response: {str(e)}"})
+            continue
+        usage_ledger.record('batch', api_client.api_provider, endpoint_config['model'], api_client.api_key,
+                            usage, latency=turnaround)
+        response_cache.set(cache_keys[index], results)
+        outcomes[index] = (True, results)
+
+    succeeded = sum(1 for success, _ in outcomes if success)
+    logger.info(f"Batch analysis finished: {succeeded} of {len(documents)} documents analyzed "
+                f"in {time.time() - start_time:.1f}s")
+    return outcomes
+
+
+def analyze_documents_in_batch(api_provider: str, api_key: str, documents: List[str],
+                               local: bool = False) -> List[Dict[str, Any]]:
+    """
+    Analyze documents through a batch and standardize each result into brand parameters.
+
+    Args:
+        api_provider: The API provider to use
+        api_key: The API key for authentication
+        documents: The document texts to analyze
+        local: If True, process the batch with the local stand-in
+
+    Returns:
+        List of standardized brand parameters (or {"error": ...} dictionaries), in document order
+    """
+    from app.utils.api_client import get_api_client
+    from app.utils.text_analyzer import standardize_api_results
+
+    api_client = get_api_client(api_provider, api_key)
+    standardized = []
+    for success, results in api_client.analyze_batch(documents, local=local):
+        if not success:
+            standardized.append(results)
+            continue
+        try:
+            standardized.append(standardize_api_results(results))
+        except Exception as e:
+            logger.error(f"Error standardizing batch result: {str(e)}")
+            standardized.append({"error": f"Error processing API results: {str(e)}"})
+    return standardized
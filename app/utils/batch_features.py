@@ -0,0 +1,190 @@
+"""
+Vectorized local feature extraction for many documents.
+This module is the batch counterpart of text_analyzer.basic_analyze_text: it
+tokenizes each document once and then computes lexicon scores, formality,
+sentence-length histograms and top vocabulary for the whole corpus with
+sparse matrix operations (documents x sentences, sentences x keywords,
+documents x terms) instead of per-document Python loops. Each result is
+identical to what basic_analyze_text returns for the same text, including
+the top vocabulary of documents with more distinct words than the
+vocabulary sketch counts.
+"""
+
+import logging
+from array import array
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from app.utils.analyzed_document import AnalyzedDocument
+from app.utils.text_analyzer import PERSONALITY_TRAITS, EMOTIONAL_TONES, FORMALITY_INDICATORS, LEXICON_MATCHER
+from app.utils.vocabulary_sketch import VOCABULARY_SKETCH_SIZE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Number of vocabulary terms kept per document, as in basic_analyze_text
+TOP_VOCABULARY = 50
+
+# Sentence length histogram bins (in tokens): short (< 10), medium (10-19) and long (20+)
+SENTENCE_LENGTH_BINS = np.array([10, 20])
+
+
+def _csr(rows: np.ndarray, columns: np.ndarray, data: np.ndarray, shape: Tuple[int, int]) -> csr_matrix:
+    """Build a CSR matrix from coordinates; repeated coordinates are summed."""
+    return csr_matrix((data, (rows, columns)), shape=shape)
+
+
+def _scores(numerator: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """Scale numerator/total to 1-10 the way basic_analyze_text does (5 when total is 0)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = np.floor(10 * numerator / total)
+    return np.where(total > 0, np.clip(scaled, 1, 10), 5).astype(np.int64)
+
+
+def build_document_term_matrix(documents: List[AnalyzedDocument]) -> Tuple[csr_matrix, csr_matrix, List[str]]:
+    """
+    Count the content words of each document.
+
+    Args:
+        documents: The tokenized documents
+
+    Returns:
+        Tuple containing:
+            - Documents x terms matrix of word counts
+            - Matrix of the same shape and sparsity holding each term's first position
+              in the corpus plus one (used to order equally frequent terms)
+            - The vocabulary, indexed by term column
+    """
+    vocabulary: Dict[str, int] = {}
+    document_ids, term_ids = array('q'), array('q')
+    for index, document in enumerate(documents):
+        for word in document.content_words():
+            term_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+            document_ids.append(index)
+
+    shape = (len(documents), max(len(vocabulary), 1))
+    keys = np.frombuffer(document_ids, dtype=np.int64) * shape[1] + np.frombuffer(term_ids, dtype=np.int64)
+    # Sorted unique (document, term) keys give the CSR layout directly
+    keys, first_positions, counts = np.unique(keys, return_index=True, return_counts=True)
+    rows, columns = np.divmod(keys, shape[1])
+    indptr = np.searchsorted(rows, np.arange(shape[0] + 1))
+    counts_matrix = csr_matrix((counts, columns, indptr), shape=shape)
+    first_matrix = csr_matrix((first_positions + 1, columns, indptr), shape=shape)
+    return counts_matrix, first_matrix, list(vocabulary)
+
+
+def top_terms(counts: csr_matrix, first_positions: csr_matrix, vocabulary: List[str],
+              top_k: int = TOP_VOCABULARY) -> List[List[Tuple[str, int]]]:
+    """
+    Get each document's most frequent terms, ordered like FreqDist.most_common
+    (by count, then by first occurrence).
+
+    Args:
+        counts: Documents x terms count matrix from build_document_term_matrix()
+        first_positions: The matching first position matrix
+        vocabulary: The vocabulary, indexed by term column
+        top_k: Number of terms per document
+
+    Returns:
+        One list of (term, count) tuples per document
+    """
+    rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+    order = np.lexsort((first_positions.data, -counts.data, rows))
+    rank = np.arange(len(order)) - counts.indptr[rows[order]]
+    kept = order[rank < top_k]
+    bounds = np.searchsorted(rows[kept], np.arange(counts.shape[0] + 1))
+
+    terms = counts.indices[kept].tolist()
+    values = counts.data[kept].tolist()
+    return [[(vocabulary[terms[i]], values[i]) for i in range(bounds[row], bounds[row + 1])]
+            for row in range(counts.shape[0])]
+
+
+def basic_analyze_texts(texts: List[str], top_k: int = TOP_VOCABULARY,
+                        sketch_size: int = VOCABULARY_SKETCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Run the local (non-API) analysis on many texts at once.
+
+    Args:
+        texts: The texts to analyze
+        top_k: Number of vocabulary terms per document
+        sketch_size: Number of words the vocabulary sketch of basic_analyze_text counts
+
+    Returns:
+        One result per text, identical to basic_analyze_text(text)
+    """
+    documents = [AnalyzedDocument(text) for text in texts]
+
+    # Columns of the lexicon score matrices: one per (lexicon, category)
+    lexicons = {"personality_traits": PERSONALITY_TRAITS, "emotional_tone": EMOTIONAL_TONES,
+                "formality": FORMALITY_INDICATORS}
+    category_columns = {(lexicon, category): index for index, (lexicon, category) in enumerate(
+        (lexicon, category) for lexicon, categories in lexicons.items() for category in categories)}
+    entry_columns: Dict[Tuple[str, str, str], int] = {}
+
+    # Documents x sentences membership, sentences x keyword matches, and sentence lengths
+    sentence_documents, sentence_lengths = array('q'), array('q')
+    match_sentences, match_entries = array('q'), array('q')
+    sentence = 0
+    for index, document in enumerate(documents):
+        sentence_lengths.extend(document.sentence_lengths())
+        for text in document.sentences():
+            for entry in LEXICON_MATCHER.scan(text):
+                match_sentences.append(sentence)
+                match_entries.append(entry_columns.setdefault(entry, len(entry_columns)))
+            sentence_documents.append(index)
+            sentence += 1
+
+    n_documents, n_sentences, n_entries = len(documents), sentence, max(len(entry_columns), 1)
+    document_sentences = _csr(np.frombuffer(sentence_documents, dtype=np.int64), np.arange(n_sentences),
+                              np.ones(n_sentences, dtype=np.int64), (n_documents, n_sentences))
+    keyword_matches = _csr(np.frombuffer(match_sentences, dtype=np.int64),
+                           np.frombuffer(match_entries, dtype=np.int64),
+                           np.ones(len(match_sentences), dtype=np.int64), (n_sentences, n_entries))
+    entry_categories = _csr(np.arange(len(entry_columns)),
+                            np.array([category_columns[entry[:2]] for entry in entry_columns], dtype=np.int64),
+                            np.ones(len(entry_columns), dtype=np.int64), (n_entries, len(category_columns)))
+
+    # Occurrences, and sentences containing each keyword, per document and category
+    occurrences = (document_sentences @ keyword_matches @ entry_categories).toarray()
+    sentence_hits = (document_sentences @ keyword_matches.sign() @ entry_categories).toarray()
+    lexicon_scores = (occurrences + sentence_hits).tolist()
+
+    formal = occurrences[:, category_columns[("formality", "formal")]]
+    informal = occurrences[:, category_columns[("formality", "informal")]]
+    formality_scores = _scores(formal, formal + informal).tolist()
+
+    # Sentence length histogram per document: short, medium and long sentences
+    lengths = np.frombuffer(sentence_lengths, dtype=np.int64)
+    length_bins = _csr(np.arange(n_sentences), np.digitize(lengths, SENTENCE_LENGTH_BINS),
+                       np.ones(n_sentences, dtype=np.int64), (n_sentences, 3))
+    histogram = (document_sentences @ length_bins).toarray()
+    complexity_scores = _scores(histogram[:, 1] + 2 * histogram[:, 2], histogram.sum(axis=1)).tolist()
+    token_totals = (document_sentences @ lengths).tolist()
+    sentence_counts = histogram.sum(axis=1).tolist()
+
+    counts, first_positions, vocabulary = build_document_term_matrix(documents)
+    common_vocabulary = top_terms(counts, first_positions, vocabulary, top_k)
+    # Exact counts equal the sketch's only while a document fits in it; larger ones use the sketch too
+    for index in np.flatnonzero(np.diff(counts.indptr) > sketch_size).tolist():
+        common_vocabulary[index] = documents[index].vocabulary(sketch_size).most_common(top_k)
+
+    results = []
+    for index in range(n_documents):
+        scores = lexicon_scores[index]
+        results.append({
+            "personality_traits": {trait: scores[category_columns[("personality_traits", trait)]]
+                                   for trait in PERSONALITY_TRAITS},
+            "emotional_tone": {emotion: scores[category_columns[("emotional_tone", emotion)]]
+                               for emotion in EMOTIONAL_TONES},
+            "formality_score": formality_scores[index],
+            "common_vocabulary": common_vocabulary[index],
+            "avg_sentence_length": (token_totals[index] / sentence_counts[index]
+                                    if sentence_counts[index] else 0),
+            "sentence_complexity": complexity_scores[index]
+        })
+    logger.info(f"Analyzed {n_documents} documents locally ({n_sentences} sentences, {len(vocabulary)} terms)")
+    return results
@@ -0,0 +1,274 @@
+"""
+Chunked (map-reduce) analysis for long documents.
+This module splits long text into token-budgeted chunks on sentence boundaries,
+analyzes the chunks concurrently and merges the per-chunk results into a single
+response in the same format the API returns for a whole document.
+"""
+
+import os
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+from nltk.tokenize import sent_tokenize
+
+from app.utils.token_estimator import estimate_tokens
+from app.utils.latency import LatencyBreakdown
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Chunking settings (overridable via environment variables)
+CHUNK_TOKEN_BUDGET = int(os.environ.get('CHUNK_TOKEN_BUDGET', 6000))
+CHUNKED_ANALYSIS_THRESHOLD = int(os.environ.get('CHUNKED_ANALYSIS_THRESHOLD', 12000))
+CHUNK_MAX_WORKERS = int(os.environ.get('CHUNK_MAX_WORKERS', 8))
+
+# Maximum number of traits/tones kept in the merged result
+MAX_MERGED_SCORES = 10
+
+
+def split_into_chunks(text: str, max_tokens: int = CHUNK_TOKEN_BUDGET) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens, breaking on sentence boundaries.
+
+    Args:
+        text: The text to split
+        max_tokens: The token budget for each chunk
+
+    Returns:
+        List of text chunks
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for sentence in sent_tokenize(text):
+        sentence_tokens = estimate_tokens(sentence)
+
+        # A single sentence larger than the budget is split on word boundaries
+        if sentence_tokens > max_tokens:
+            if current:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            piece = []
+            piece_tokens = 0
+            for word in sentence.split():
+                word_tokens = estimate_tokens(word) + 1
+                if piece and piece_tokens + word_tokens > max_tokens:
+                    chunks.append(" ".join(piece))
+                    piece, piece_tokens = [], 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            if piece:
+                current, current_tokens = [" ".join(piece)], piece_tokens
+            continue
+
+        if current and current_tokens + sentence_tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+
+        current.append(sentence)
+        current_tokens += sentence_tokens + 1
+
+    if current:
+        chunks.append(" ".join(current))
+
+    return chunks
+
+
+def analyze_in_chunks(api_client, text: str, max_tokens: int = CHUNK_TOKEN_BUDGET,
+                      max_workers: int = CHUNK_MAX_WORKERS, bypass_cache: bool = False,
+                      hedged: bool = False) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Analyze long text by analyzing its chunks concurrently and merging the results.
+
+    Args:
+        api_client: The APIClient used to analyze each chunk
+        text: The text to analyze
+        max_tokens: The token budget for each chunk
+        max_workers: Maximum number of chunks analyzed at the same time
+        bypass_cache: If True, analyze every chunk with the provider instead of using cached responses
+        hedged: If True, hedge each chunk's request across providers (see APIClient.analyze_text)
+
+    Returns:
+        Tuple containing:
+            - Success flag (True/False)
+            - Merged analysis results or error message
+    """
+    chunks = split_into_chunks(text, max_tokens)
+    if not chunks:
+        return False, {"error": "No text to analyze"}
+
+    logger.info(f"Analyzing {len(chunks)} chunks with up to {max_workers} concurrent requests")
+
+    # Run each chunk in a copy of the caller's context so stage timings reach the request's breakdown
+    breakdown = LatencyBreakdown()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, api_client.analyze_text, chunk,
+                                   bypass_cache=bypass_cache, hedged=hedged)
+                   for chunk in chunks]
+        outcomes = [future.result() for future in futures]
+
+    results = []
+    weights = []
+    errors = []
+    for chunk, (success, result) in zip(chunks, outcomes):
+        if success:
+            for name, value in result.pop("latency", {}).items():
+                if name != "total_ms":
+                    breakdown.add(name[:-len("_ms")], value / 1000.0)
+            results.append(result)
+            weights.append(estimate_tokens(chunk))
+        else:
+            errors.append(result.get('error', 'Unknown error'))
+
+    if not results:
+        logger.error(f"All {len(chunks)} chunk analyses failed")
+        return False, {"error": errors[0] if errors else "Chunked analysis failed"}
+
+    if errors:
+        logger.warning(f"{len(errors)} of {len(chunks)} chunk analyses failed; merging the rest")
+
+    merged = merge_analysis_results(results, weights)
+    merged["chunking"] = {
+        "chunks": len(chunks),
+        "chunks_analyzed": len(results),
+        "chunk_errors": errors
+    }
+    # Stage times are summed across chunks; total_ms is the wall-clock time of the whole analysis
+    merged["latency"] = breakdown.as_dict()
+    return True, merged
+
+
+def _scores(value) -> Dict[str, float]:
+    """Convert a traits/tones value (dict or list) to a {name: score} dictionary."""
+    scores = {}
+    if isinstance(value, dict):
+        for name, score in value.items():
+            if isinstance(score, bool):
+                scores[name] = 10 if score else 0
+            elif isinstance(score, (int, float)):
+                scores[name] = score
+            elif isinstance(score, str) and score.isdigit():
+                scores[name] = int(score)
+            else:
+                scores[name] = 8
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            if isinstance(item, str):
+                scores[item] = 10 - i if i < 10 else 1
+            elif isinstance(item, dict) and "score" in item:
+                name = item.get("trait") or item.get("emotion") or item.get("tone")
+                if name and isinstance(item["score"], (int, float)):
+                    scores[name] = item["score"]
+    return scores
+
+
+def _merge_scores(values: List[Any], weights: List[float]) -> Dict[str, int]:
+    """
+    Score-weight traits or tones across chunks.
+
+    Each name's score is its chunk scores weighted by chunk size, summed over the
+    chunks that mention it and divided by the total weight, so names that are
+    emphasized throughout the document outrank names mentioned once. The result
+    is rescaled so the top name keeps the highest score seen in any chunk.
+    """
+    total_weight = sum(weights) or 1
+    weighted = {}
+    display_names = {}
+    max_score = 0
+
+    for value, weight in zip(values, weights):
+        for name, score in _scores(value).items():
+            key = name.strip().lower()
+            display_names.setdefault(key, name)
+            weighted[key] = weighted.get(key, 0) + score * weight
+            max_score = max(max_score, score)
+
+    if not weighted:
+        return {}
+
+    averaged = {key: total / total_weight for key, total in weighted.items()}
+    top = max(averaged.values()) or 1
+    ranked = sorted(averaged.items(), key=lambda item: item[1], reverse=True)[:MAX_MERGED_SCORES]
+    return {display_names[key]: max(1, int(round(score / top * max_score))) for key, score in ranked}
+
+
+def _union(lists: List[Any]) -> List[Any]:
+    """Union lists in order, dropping case-insensitive duplicates."""
+    seen = set()
+    merged = []
+    for items in lists:
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            key = item.strip().lower() if isinstance(item, str) else repr(item)
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
+
+
+def _weighted_mean(values: List[Any], weights: List[float]):
+    """Weighted mean of the numeric values, ignoring missing ones."""
+    pairs = [(v, w) for v, w in zip(values, weights) if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    if not pairs:
+        return None
+    total_weight = sum(w for _, w in pairs) or 1
+    return int(round(sum(v * w for v, w in pairs) / total_weight))
+
+
+def merge_analysis_results(results: List[Dict[str, Any]], weights: List[float] = None) -> Dict[str, Any]:
+    """
+    Merge per-chunk API analysis results into a single result.
+
+    Terms and phrases are unioned, traits and tones are score-weighted by chunk
+    size, and numeric levels are averaged. The output follows the API response
+    format, so it can be passed to standardize_api_results unchanged.
+
+    Args:
+        results: The per-chunk analysis results
+        weights: Relative size of each chunk (defaults to equal weights)
+
+    Returns:
+        The merged analysis results
+    """
+    if weights is None:
+        weights = [1] * len(results)
+
+    def section(result, name):
+        value = result.get(name, {})
+        return value if isinstance(value, dict) else {}
+
+    formality_levels = []
+    for result in results:
+        formality = result.get("formality")
+        if isinstance(formality, dict):
+            formality_levels.append(formality.get("level"))
+        else:
+            formality_levels.append(formality if formality is not None else result.get("formality_score"))
+
+    vocabularies = [section(r, "vocabulary") for r in results]
+    styles = [section(r, "communication_style") for r in results]
+    structures = [s.get("sentence_structure") if isinstance(s.get("sentence_structure"), dict) else {} for s in styles]
+
+    merged = {
+        "personality_traits": _merge_scores([r.get("personality_traits") for r in results], weights),
+        "emotional_tone": _merge_scores([r.get("emotional_tone") for r in results], weights),
+        "formality": {"level": _weighted_mean(formality_levels, weights) or 5},
+        "vocabulary": {
+            "preferred_terms": _union([v.get("preferred_terms") for v in vocabularies]),
+            "avoided_terms": _union([v.get("avoided_terms") for v in vocabularies])
+        },
+        "communication_style": {
+            "key_phrases": _union([s.get("key_phrases") for s in styles]),
+            "sentence_structure": {
+                "length_preference": _weighted_mean([s.get("length_preference") for s in structures], weights) or 5,
+                "complexity_preference": _weighted_mean([s.get("complexity_preference") for s in structures], weights) or 5
+            },
+            "rich_descriptions": _union([s.get("rich_descriptions") for s in styles])
+        }
+    }
+    return merged
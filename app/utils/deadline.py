@@ -0,0 +1,158 @@
+"""
+Per-request deadlines for outbound calls.
+This module gives a request a time budget at route entry and lets every
+outbound call (scraping, provider APIs) take its timeout from whatever is
+left, so one stuck call can't hold a worker past the budget and work that
+can't finish in time is abandoned with partial results.
+"""
+
+import os
+import time
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Optional, Tuple, Union
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Deadline settings (overridable via environment variables). The default request budget
+# stays under gunicorn's default 30 second worker timeout; raise both together.
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', 25))
+# Share of the budget the web scraper may spend before analysing what it has collected
+SCRAPE_BUDGET_SHARE = float(os.environ.get('SCRAPE_BUDGET_SHARE', 0.4))
+# Calls aren't started with less than this many seconds left
+DEADLINE_MIN_CALL_SECONDS = float(os.environ.get('DEADLINE_MIN_CALL_SECONDS', 1))
+
+# Deadline of the request currently being handled (shared with worker threads via copied contexts)
+_current_deadline: contextvars.ContextVar[Optional['Deadline']] = contextvars.ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when there isn't enough of the request's time budget left to start a call."""
+
+
+class Deadline:
+    """A point in time by which a request's work has to be finished."""
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE_SECONDS):
+        """
+        Initialize the deadline.
+
+        Args:
+            seconds: The time budget from now
+        """
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether there is too little time left to start another call."""
+        return self.remaining() < DEADLINE_MIN_CALL_SECONDS
+
+    def portion(self, share: float) -> 'Deadline':
+        """
+        Get a deadline for a stage that may use only part of the remaining budget.
+
+        Args:
+            share: Fraction of the remaining budget the stage may use
+
+        Returns:
+            A new deadline that expires no later than this one
+        """
+        return Deadline(self.remaining() * share)
+
+    def timeout(self, default: Union[float, Tuple[float, float]]) -> Union[float, Tuple[float, float]]:
+        """
+        Clamp a call's timeout to the remaining budget.
+
+        Args:
+            default: The call's usual timeout, in seconds or as a (connect, read) tuple
+
+        Returns:
+            The timeout to use, in the same form as the default
+
+        Raises:
+            DeadlineExceeded: If too little of the budget is left to start the call
+        """
+        remaining = self.remaining()
+        if remaining < DEADLINE_MIN_CALL_SECONDS:
+            raise DeadlineExceeded(f"Request deadline exceeded ({self.budget:g}s budget)")
+        if isinstance(default, tuple):
+            return tuple(min(value, remaining) for value in default)
+        return min(default, remaining)
+
+    def check(self, seconds: float = 0.0):
+        """
+        Make sure the budget allows waiting the given time and then starting a call.
+
+        Raises:
+            DeadlineExceeded: If it doesn't
+        """
+        if self.remaining() - seconds < DEADLINE_MIN_CALL_SECONDS:
+            raise DeadlineExceeded(f"Request deadline exceeded ({self.budget:g}s budget)")
+
+
+def start_deadline(seconds: float = REQUEST_DEADLINE_SECONDS) -> Deadline:
+    """Start the deadline for the current request and return it."""
+    deadline = Deadline(seconds)
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def get_deadline() -> Optional[Deadline]:
+    """Get the deadline of the current request, if one was started."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def use_deadline(deadline: Deadline):
+    """Make a deadline (usually a portion of the request's) current for the enclosed block."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def deadline_timeout(default: Union[float, Tuple[float, float]]) -> Union[float, Tuple[float, float]]:
+    """
+    Get the timeout for an outbound call: the default, clamped to the current
+    request's remaining budget if a deadline was started.
+
+    Raises:
+        DeadlineExceeded: If too little of the budget is left to start the call
+    """
+    deadline = _current_deadline.get()
+    return deadline.timeout(default) if deadline is not None else default
+
+
+def check_deadline(seconds: float = 0.0):
+    """
+    Make sure the current request's budget allows waiting the given time (for
+    a rate limit or backoff) and then starting a call. Does nothing without a deadline.
+
+    Raises:
+        DeadlineExceeded: If it doesn't
+    """
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(seconds)
+
+
+def init_app(app):
+    """
+    Clear any deadline left over from an earlier request handled by the same
+    thread, so only routes that start a deadline are limited by one.
+
+    Args:
+        app: The Flask application
+    """
+    @app.before_request
+    def _clear_deadline():
+        _current_deadline.set(None)
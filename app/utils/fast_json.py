@@ -0,0 +1,59 @@
+"""
+Fast JSON encoding and decoding.
+This module uses orjson when it is installed and falls back to the standard
+library json module otherwise, so provider responses can be decoded straight
+from the response bytes.
+"""
+
+import json
+import logging
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Name of the JSON backend in use, reported by the benchmarks
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    Decode a JSON document.
+
+    Args:
+        data: The JSON document as bytes or text
+
+    Returns:
+        The decoded value
+
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> str:
+    """
+    Encode a value as compact JSON text.
+
+    Args:
+        value: The value to encode
+
+    Returns:
+        The JSON text
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode('utf-8')
+        except TypeError:
+            # orjson rejects non-string keys and integers beyond 64 bits; the json module doesn't
+            pass
+    return json.dumps(value, separators=(',', ':'))
@@ -0,0 +1,391 @@
+"""
+Hedged and failover analysis requests across providers.
+This module sends an analysis to the primary provider and, if it hasn't
+answered within a latency percentile deadline, fires the same analysis at the
+next configured provider, keeping whichever valid result arrives first and
+cancelling the rest. A circuit breaker per provider routes around providers
+that keep failing. The race replaces only the provider request of
+APIClient.analyze_text, so hedged analyses still go through the response
+cache, singleflight and model tiering.
+"""
+
+import os
+import math
+import hashlib
+import time
+import asyncio
+import threading
+import contextvars
+import logging
+from collections import deque, OrderedDict
+from typing import Dict, Any, List, Tuple, Optional
+
+from app.utils.api_client import get_api_client, CLIENT_CACHE_SIZE
+from app.utils.async_api_client import AsyncAPIClient
+from app.utils.deadline import get_deadline, DeadlineExceeded
+from app.utils.latency import LatencyBreakdown
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hedging settings (overridable via environment variables)
+HEDGING_ENABLED = os.environ.get('HEDGING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Providers tried after the primary, in order; keys come from <PROVIDER>_API_KEY
+HEDGE_PROVIDERS = [p.strip() for p in os.environ.get('HEDGE_PROVIDERS', 'anthropic').split(',') if p.strip()]
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', 95))
+HEDGE_DEFAULT_DELAY = float(os.environ.get('HEDGE_DEFAULT_DELAY', 10))
+HEDGE_MIN_DELAY = float(os.environ.get('HEDGE_MIN_DELAY', 1))
+HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES', 20))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30))
+
+# Number of recent latencies kept per provider
+LATENCY_WINDOW = 200
+
+
+class ProviderHealth:
+    """Recent latencies and circuit breaker state for one provider."""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        """
+        Initialize with a closed circuit and no latency samples.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """The circuit state: 'closed', 'open' or 'half_open'."""
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Whether a request may be sent (an open circuit lets one trial through after the reset timeout)."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def hedge_delay(self, percentile: float = HEDGE_PERCENTILE) -> float:
+        """
+        Seconds to wait for this provider before hedging: the given percentile
+        of its recent latencies, or the default delay until there are enough samples.
+        """
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        index = min(len(samples) - 1, max(0, math.ceil(percentile / 100.0 * len(samples)) - 1))
+        return max(HEDGE_MIN_DELAY, samples[index])
+
+    def record_success(self, latency: float):
+        """Record a successful request and close the circuit."""
+        with self._lock:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        """Record a failed request, opening the circuit after too many in a row."""
+        with self._lock:
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.consecutive_failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    logger.warning(f"Opening circuit after {self.consecutive_failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Let another trial through if a half-open trial was cancelled without an outcome."""
+        with self._lock:
+            self.trial_in_flight = False
+
+
+class HedgingPolicy:
+    """Races an analysis across providers with percentile-deadline hedging and failover."""
+
+    def __init__(self, secondary_providers: Optional[List[str]] = None, percentile: float = HEDGE_PERCENTILE):
+        """
+        Initialize the policy.
+
+        Args:
+            secondary_providers: Providers tried after the primary, in order
+            percentile: Latency percentile of a provider used as its hedge deadline
+        """
+        self.secondary_providers = HEDGE_PROVIDERS if secondary_providers is None else secondary_providers
+        self.percentile = percentile
+        self._health: Dict[str, ProviderHealth] = {}
+        self._clients: "OrderedDict[Tuple[str, str], AsyncAPIClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {
+            "requests": 0,
+            "hedges": 0,
+            "failovers": 0,
+            "wins_by_provider": {},
+            "cancelled": 0,
+            "skipped_open_circuit": 0,
+            "failed": 0
+        }
+
+    def health(self, provider: str) -> ProviderHealth:
+        """Get the health tracker for a provider."""
+        with self._lock:
+            health = self._health.get(provider)
+            if health is None:
+                health = ProviderHealth()
+                self._health[provider] = health
+            return health
+
+    def _client(self, provider: str, api_key: str) -> AsyncAPIClient:
+        """Get the async client for a provider and key, keeping the most recently used CLIENT_CACHE_SIZE."""
+        cache_key = (provider, hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+        with self._lock:
+            client = self._clients.get(cache_key)
+            if client is not None:
+                self._clients.move_to_end(cache_key)
+                return client
+            client = AsyncAPIClient(provider, api_key)
+            self._clients[cache_key] = client
+            # Evicted clients share the process-wide transport, so there is nothing to close
+            while len(self._clients) > CLIENT_CACHE_SIZE:
+                self._clients.popitem(last=False)
+            return client
+
+    def _candidates(self, primary_provider: str, primary_key: str) -> List[AsyncAPIClient]:
+        """The primary client followed by each configured secondary provider that has an API key."""
+        candidates = [self._client(primary_provider, primary_key)]
+        for provider in self.secondary_providers:
+            api_key = os.environ.get(f"{provider.upper()}_API_KEY", '')
+            if provider != primary_provider and api_key:
+                candidates.append(self._client(provider, api_key))
+        return candidates
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the background event loop the races run on, starting it on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='hedging-loop', daemon=True).start()
+            return self._loop
+
+    def analyze_text(self, api_provider: str, api_key: str, text: str,
+                     include_assets: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Analyze text like APIClient.analyze_text (response cache, singleflight,
+        model tiering and chunking), hedging and failing over the provider request.
+
+        Args:
+            api_provider: The primary provider
+            api_key: The primary provider's API key
+            text: The text to analyze
+            include_assets: If True, also generate the tone of voice assets in the same request (fused mode)
+
+        Returns:
+            Tuple containing:
+                - Success flag (True/False)
+                - Analysis results or error message
+        """
+        return get_api_client(api_provider, api_key).analyze_text(text, include_assets=include_assets, hedged=True)
+
+    def request_analysis(self, api_provider: str, api_key: str, text: str, breakdown: LatencyBreakdown,
+                         include_assets: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Send an analysis request with hedging and failover across providers,
+        without the response cache. The race is abandoned (and its requests
+        cancelled) when the request's deadline passes.
+
+        Args:
+            api_provider: The primary provider
+            api_key: The primary provider's API key
+            text: The text to analyze, already within the prompt token budget
+            breakdown: Latency breakdown the winning request's stages are added to
+            include_assets: If True, also generate the tone of voice assets in the same request (fused mode)
+
+        Returns:
+            Tuple containing:
+                - Success flag (True/False)
+                - Analysis results from the first provider with a valid result, or an error message
+        """
+        candidates = self._candidates(api_provider, api_key)
+        race = self._race(candidates, text, breakdown, include_assets)
+        deadline = get_deadline()
+        if deadline is not None:
+            try:
+                deadline.check()
+            except DeadlineExceeded as e:
+                race.close()
+                return False, {"error": str(e)}
+            race = asyncio.wait_for(race, deadline.remaining())
+
+        # The race runs on the background loop; run it in a copy of this request's context so the
+        # deadline, request ID, latency breakdown and usage attribution reach the provider calls
+        context = contextvars.copy_context()
+        future = context.run(asyncio.run_coroutine_threadsafe, race, self._get_loop())
+        try:
+            return future.result()
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats["failed"] += 1
+            logger.warning("Hedged analysis abandoned: request deadline exceeded")
+            return False, {"error": f"Request deadline exceeded ({deadline.budget:g}s budget)"}
+
+    async def _race(self, candidates: List[AsyncAPIClient], text: str, breakdown: LatencyBreakdown,
+                    include_assets: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """Run the hedged race on the background loop."""
+        with self._lock:
+            self._stats["requests"] += 1
+
+        remaining = []
+        for client in candidates:
+            if self.health(client.api_provider).allow():
+                remaining.append(client)
+            else:
+                with self._lock:
+                    self._stats["skipped_open_circuit"] += 1
+                logger.info(f"Skipping {client.api_provider}: circuit is open")
+        if not remaining:
+            # Every circuit is open; try the primary anyway rather than failing outright
+            remaining = candidates[:1]
+
+        loop = asyncio.get_running_loop()
+        pending: Dict[asyncio.Task, Tuple[AsyncAPIClient, float]] = {}
+        breakdowns: Dict[AsyncAPIClient, LatencyBreakdown] = {}
+        errors = []
+
+        def launch():
+            client = remaining.pop(0)
+            # Each request is timed on its own; only the winner's stages are reported
+            breakdowns[client] = LatencyBreakdown()
+            task = loop.create_task(client.request_analysis(text, breakdowns[client], include_assets))
+            pending[task] = (client, loop.time())
+            return client
+
+        launch()
+        try:
+            success, results, winner = await self._run_race(loop, pending, remaining, launch, errors)
+            if winner is not None:
+                breakdown.merge(breakdowns[winner])
+            return success, results
+        except asyncio.CancelledError:
+            # Abandoned (deadline passed): don't leave the provider requests running
+            await self._cancel(pending)
+            raise
+        finally:
+            # Providers that were allowed a half-open trial but never launched give it back
+            for client in remaining:
+                self.health(client.api_provider).release_trial()
+
+    async def _run_race(self, loop: asyncio.AbstractEventLoop,
+                        pending: Dict[asyncio.Task, Tuple[AsyncAPIClient, float]],
+                        remaining: List[AsyncAPIClient], launch,
+                        errors: List[str]) -> Tuple[bool, Dict[str, Any], Optional[AsyncAPIClient]]:
+        """
+        Wait for the launched requests, hedging and failing over until one
+        returns a valid result. Returns (success, results, winning client or None).
+        """
+        while pending:
+            timeout = None
+            if remaining:
+                # Hedge once the most recently launched provider passes its latency percentile
+                last_client, last_started = max(pending.values(), key=lambda item: item[1])
+                deadline = self.health(last_client.api_provider).hedge_delay(self.percentile)
+                timeout = max(0.0, last_started + deadline - loop.time())
+
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                client = launch()
+                with self._lock:
+                    self._stats["hedges"] += 1
+                logger.info(f"Primary is slow; hedging with {client.api_provider}")
+                continue
+
+            for task in done:
+                client, started = pending.pop(task)
+                health = self.health(client.api_provider)
+                try:
+                    success, results = task.result()
+                except Exception as e:
+                    success, results = False, {"error": f"API request failed: {str(e)}"}
+
+                if success and isinstance(results, dict) and "error" not in results:
+                    health.record_success(loop.time() - started)
+                    await self._cancel(pending)
+                    with self._lock:
+                        wins = self._stats["wins_by_provider"]
+                        wins[client.api_provider] = wins.get(client.api_provider, 0) + 1
+                    logger.info(f"Hedged analysis answered by {client.api_provider}")
+                    return True, results, client
+
+                health.record_failure()
+                errors.append(f"{client.api_provider}: {results.get('error', 'Invalid response')}")
+                logger.warning(f"{client.api_provider} analysis failed: {results.get('error', 'Invalid response')}")
+
+            # Fail over straight away if nothing else is still running
+            if not pending and remaining:
+                client = launch()
+                with self._lock:
+                    self._stats["failovers"] += 1
+                logger.info(f"Failing over to {client.api_provider}")
+
+        with self._lock:
+            self._stats["failed"] += 1
+        return False, {"error": "; ".join(errors) or "All providers failed"}, None
+
+    async def _cancel(self, pending: Dict[asyncio.Task, Tuple[AsyncAPIClient, float]]):
+        """Cancel the requests that lost the race."""
+        for task, (client, _) in pending.items():
+            task.cancel()
+            # A cancelled trial says nothing about the provider's health
+            self.health(client.api_provider).release_trial()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            with self._lock:
+                self._stats["cancelled"] += len(pending)
+        pending.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hedging counters and per-provider health.
+
+        Returns:
+            Dictionary with request, hedge, failover and cancellation counts, wins per
+            provider, and each provider's circuit state and current hedge deadline
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["wins_by_provider"] = dict(stats["wins_by_provider"])
+            providers = dict(self._health)
+        stats["providers"] = {
+            provider: {
+                "circuit": health.state,
+                "consecutive_failures": health.consecutive_failures,
+                "hedge_delay": round(health.hedge_delay(self.percentile), 3),
+                "samples": len(health.latencies)
+            }
+            for provider, health in providers.items()
+        }
+        return stats
+
+
+# Create a process-wide instance for use throughout the application
+hedging_policy = HedgingPolicy()
@@ -0,0 +1,120 @@
+"""
+Shared HTTP transport for outbound API calls.
+This module keeps one pooled keep-alive session per provider base URL so that
+repeated analyses reuse TCP/TLS connections instead of reconnecting every time.
+"""
+
+import os
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default pool and timeout settings (overridable via environment variables)
+DEFAULT_POOL_SIZE = int(os.environ.get('API_POOL_SIZE', 10))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', 10))
+DEFAULT_READ_TIMEOUT = float(os.environ.get('API_READ_TIMEOUT', 120))
+
+
+class HTTPTransport:
+    """Process-wide pool of keep-alive sessions, one per provider base URL."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT):
+        """
+        Initialize the transport.
+
+        Args:
+            pool_size: Maximum number of pooled connections kept per base URL
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the server to send a response
+        """
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """The default (connect, read) timeout tuple for requests."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def get_session(self, base_url: str) -> requests.Session:
+        """
+        Get the pooled session for a base URL, creating it on first use.
+
+        Args:
+            base_url: The provider base URL (e.g. 'https://api.openai.com/v1')
+
+        Returns:
+            A requests.Session with a keep-alive connection pool mounted
+        """
+        session = self._sessions.get(base_url)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(base_url)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[base_url] = session
+                logger.info(f"Created pooled HTTP session for {base_url} (pool size: {self.pool_size})")
+        return session
+
+    def post(self, base_url: str, url: str, timeout: Optional[Tuple[float, float]] = None, **kwargs) -> requests.Response:
+        """
+        Send a POST request through the pooled session for a base URL.
+
+        Args:
+            base_url: The provider base URL used to select the pool
+            url: The full request URL
+            timeout: Optional (connect, read) timeout; defaults to the transport timeout
+            **kwargs: Extra arguments passed to requests (json, headers, verify, ...)
+
+        Returns:
+            The requests.Response object
+        """
+        return self.get_session(base_url).post(url, timeout=timeout or self.timeout, **kwargs)
+
+    def get(self, base_url: str, url: str, timeout: Optional[Tuple[float, float]] = None, **kwargs) -> requests.Response:
+        """Send a GET request through the pooled session for a base URL."""
+        return self.get_session(base_url).get(url, timeout=timeout or self.timeout, **kwargs)
+
+    def configure(self, pool_size: Optional[int] = None, connect_timeout: Optional[float] = None,
+                  read_timeout: Optional[float] = None):
+        """
+        Update pool size and timeouts. Existing sessions are closed so the new
+        pool size takes effect on the next request.
+        """
+        with self._lock:
+            if pool_size is not None:
+                self.pool_size = pool_size
+            if connect_timeout is not None:
+                self.connect_timeout = connect_timeout
+            if read_timeout is not None:
+                self.read_timeout = read_timeout
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def close(self):
+        """Close all pooled sessions."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+
+# Create a process-wide instance for use throughout the application
+http_transport = HTTPTransport()
@@ -0,0 +1,155 @@
+"""
+Incremental local text analysis.
+This module analyzes text as it arrives (e.g. one scraped page at a time)
+instead of after the whole corpus has been collected. It keeps running,
+mergeable statistics (lexicon counts, formality counts, a sentence-length
+histogram and a heavy-hitter vocabulary sketch) and can report a
+basic_analyze_text-compatible snapshot at any point. Analyzers fed by
+parallel workers can be merged into one.
+
+This is a library API: the routes analyze through the provider API, which
+has no local fallback to replace, so nothing in the app feeds an analyzer.
+A snapshot equals basic_analyze_text on the fed chunks joined by their
+separators, and a merge equals it on the two texts joined by a space.
+"""
+
+import copy
+import logging
+from collections import Counter
+from itertools import islice
+from typing import Dict, Any
+
+from app.utils.analyzed_document import AnalyzedDocument
+from app.utils.text_analyzer import PERSONALITY_TRAITS, EMOTIONAL_TONES, LEXICON_MATCHER
+from app.utils.vocabulary_sketch import SpaceSavingSketch, VOCABULARY_SKETCH_SIZE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class IncrementalAnalyzer:
+    """Running local analysis of a text fed in chunks."""
+
+    def __init__(self, sketch_size: int = VOCABULARY_SKETCH_SIZE):
+        """
+        Initialize an empty analyzer.
+
+        Args:
+            sketch_size: Number of words the vocabulary sketch counts
+        """
+        self.occurrences = {lexicon: {category: 0 for category in categories}
+                            for lexicon, categories in LEXICON_MATCHER.lexicons.items()}
+        self.sentence_hits = copy.deepcopy(self.occurrences)
+        # Sentence length (in tokens) -> number of sentences
+        self.sentence_lengths = Counter()
+        self.vocabulary = SpaceSavingSketch(sketch_size)
+        self.chunks = 0
+        self.characters = 0
+        # The last sentence fed so far may continue in the next chunk, so it is held back
+        self._pending = ''
+
+    def feed(self, text: str, separator: str = ' '):
+        """
+        Add a chunk of text (e.g. a scraped page).
+
+        Args:
+            text: The chunk
+            separator: Text joining the chunk to the previous one
+        """
+        if not text:
+            return
+        self.chunks += 1
+        self.characters += len(text)
+        combined = self._pending + separator + text if self._pending else text
+        document = AnalyzedDocument(combined)
+        spans = list(document.sentence_spans())
+        if not spans:
+            self._pending = combined
+            return
+        # Everything but the last sentence is final
+        self._add(document, len(spans) - 1)
+        self._pending = combined[spans[-1][0]:]
+
+    def _add(self, document: AnalyzedDocument, sentences: int):
+        """Count the first given number of sentences of a document."""
+        occurrences, sentence_hits = LEXICON_MATCHER.count(islice(document.sentences(), sentences))
+        for lexicon, categories in occurrences.items():
+            for category, count in categories.items():
+                self.occurrences[lexicon][category] += count
+                self.sentence_hits[lexicon][category] += sentence_hits[lexicon][category]
+        self.sentence_lengths.update(document.sentence_lengths()[:sentences])
+        self.vocabulary.update(document.content_words(0, sentences))
+
+    def _flush(self):
+        """Count the held back sentence as final."""
+        if self._pending:
+            document = AnalyzedDocument(self._pending)
+            self._add(document, document.sentence_count)
+            self._pending = ''
+
+    def merge(self, other: 'IncrementalAnalyzer') -> 'IncrementalAnalyzer':
+        """
+        Add the statistics of another analyzer (e.g. fed by a parallel worker).
+        The texts of both are treated as separate documents.
+
+        Args:
+            other: The analyzer to merge in (left unchanged)
+
+        Returns:
+            This analyzer
+        """
+        self._flush()
+        other = copy.deepcopy(other)
+        other._flush()
+        for lexicon, categories in other.occurrences.items():
+            for category, count in categories.items():
+                self.occurrences[lexicon][category] += count
+                self.sentence_hits[lexicon][category] += other.sentence_hits[lexicon][category]
+        self.sentence_lengths.update(other.sentence_lengths)
+        self.vocabulary.merge(other.vocabulary)
+        self.chunks += other.chunks
+        self.characters += other.characters
+        return self
+
+    def snapshot(self, top_k: int = 50) -> Dict[str, Any]:
+        """
+        Get the analysis of all text fed so far.
+
+        Args:
+            top_k: Number of vocabulary terms to report
+
+        Returns:
+            Dictionary with the same keys and scales as basic_analyze_text
+        """
+        state = copy.deepcopy(self) if self._pending else self
+        state._flush()
+
+        personality_matches = {trait: state.occurrences["personality_traits"][trait] +
+                               state.sentence_hits["personality_traits"][trait] for trait in PERSONALITY_TRAITS}
+        emotion_matches = {emotion: state.occurrences["emotional_tone"][emotion] +
+                           state.sentence_hits["emotional_tone"][emotion] for emotion in EMOTIONAL_TONES}
+
+        formal_count = state.occurrences["formality"]["formal"]
+        informal_count = state.occurrences["formality"]["informal"]
+        formality_score = 5  # Default middle value
+        if formal_count + informal_count > 0:
+            formality_score = min(10, max(1, int(10 * formal_count / (formal_count + informal_count))))
+
+        sentences = sum(state.sentence_lengths.values())
+        tokens = sum(length * count for length, count in state.sentence_lengths.items())
+        short_sentences = sum(count for length, count in state.sentence_lengths.items() if length < 10)
+        medium_sentences = sum(count for length, count in state.sentence_lengths.items() if 10 <= length < 20)
+        long_sentences = sentences - short_sentences - medium_sentences
+        sentence_complexity = 5  # Default middle value
+        if sentences > 0:
+            sentence_complexity = min(10, max(1, int(10 * (medium_sentences + 2 * long_sentences) / sentences)))
+
+        return {
+            "personality_traits": personality_matches,
+            "emotional_tone": emotion_matches,
+            "formality_score": formality_score,
+            "common_vocabulary": state.vocabulary.most_common(top_k),
+            "avg_sentence_length": tokens / sentences if sentences else 0,
+            "sentence_complexity": sentence_complexity
+        }
@@ -0,0 +1,173 @@
+"""
+API key health probe.
+This module checks that a provider accepts an API key with a cheap request
+(the provider's model list) instead of a full analysis, and remembers the
+answer per key hash for a while so settings saves and API syncs don't repeat it.
+"""
+
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+import requests
+
+from app.utils.api_client import get_api_client
+from app.utils.deadline import deadline_timeout, DeadlineExceeded
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Probe settings (overridable via environment variables)
+KEY_PROBE_TTL = float(os.environ.get('KEY_PROBE_TTL', 600))
+KEY_PROBE_FAILURE_TTL = float(os.environ.get('KEY_PROBE_FAILURE_TTL', 60))
+KEY_PROBE_TIMEOUT = float(os.environ.get('KEY_PROBE_TIMEOUT', 5))
+KEY_PROBE_MAX_KEYS = int(os.environ.get('KEY_PROBE_MAX_KEYS', 1000))
+
+# Cheap authenticated endpoint of each provider, relative to its base URL
+PROBE_ENDPOINTS = {
+    'openai': '/models',
+    'anthropic': '/models',
+    'cohere': '/models',
+    'custom': os.environ.get('CUSTOM_API_PROBE_ENDPOINT', '/models')
+}
+
+# Status codes that mean the provider rejected the key itself
+REJECTED_STATUS_CODES = (401, 403)
+
+
+class KeyProbe:
+    """Checks API keys against their provider and caches the verdicts."""
+
+    def __init__(self, ttl: float = KEY_PROBE_TTL, failure_ttl: float = KEY_PROBE_FAILURE_TTL,
+                 timeout: float = KEY_PROBE_TIMEOUT, max_keys: int = KEY_PROBE_MAX_KEYS):
+        """
+        Initialize the probe.
+
+        Args:
+            ttl: Seconds an accepted key is remembered
+            failure_ttl: Seconds a rejected key is remembered
+            timeout: Connect and read timeout of a probe request in seconds
+            max_keys: Maximum verdicts kept; the least recently used are dropped beyond it
+        """
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.timeout = timeout
+        self.max_keys = max_keys
+        self._results: "OrderedDict[Tuple[str, str], Tuple[float, bool, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.probes = 0
+
+    @staticmethod
+    def _key_id(api_key: str) -> str:
+        """Hash an API key so keys are never kept in memory as cache keys."""
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+    def check(self, api_provider: str, api_key: str, refresh: bool = False) -> Tuple[bool, str]:
+        """
+        Check whether a provider accepts an API key.
+
+        Args:
+            api_provider: The API provider ('openai', 'anthropic', 'cohere', or 'custom')
+            api_key: The API key to check
+            refresh: Probe the provider even if a cached verdict exists
+
+        Returns:
+            Tuple containing:
+                - Boolean indicating whether the key was accepted
+                - A message describing the result
+        """
+        if api_provider not in PROBE_ENDPOINTS:
+            return False, f"Unsupported API provider: {api_provider}"
+
+        cache_key = (api_provider, self._key_id(api_key))
+        if not refresh:
+            with self._lock:
+                cached = self._results.get(cache_key)
+                if cached is not None and cached[0] > time.monotonic():
+                    self._results.move_to_end(cache_key)
+                    self.hits += 1
+                    return cached[1], cached[2]
+
+        success, message, cacheable = self._probe(api_provider, api_key)
+        if cacheable:
+            ttl = self.ttl if success else self.failure_ttl
+            now = time.monotonic()
+            with self._lock:
+                # Verdicts have different TTLs, so expired ones can be anywhere in the map
+                for expired_key in [key for key, cached in self._results.items() if cached[0] <= now]:
+                    del self._results[expired_key]
+                self._results[cache_key] = (now + ttl, success, message)
+                self._results.move_to_end(cache_key)
+                while len(self._results) > self.max_keys:
+                    self._results.popitem(last=False)
+        return success, message
+
+    def _probe(self, api_provider: str, api_key: str) -> Tuple[bool, str, bool]:
+        """
+        Send the probe request.
+
+        Returns:
+            Tuple containing:
+                - Boolean indicating whether the key was accepted
+                - A message describing the result
+                - Boolean indicating whether the verdict may be cached (not for outages or timeouts)
+        """
+        client = get_api_client(api_provider, api_key)
+        config = client.endpoints[api_provider]
+        url = f"{config['base_url']}{PROBE_ENDPOINTS[api_provider]}"
+        headers = {name: value for name, value in config['headers'].items() if name != 'Content-Type'}
+
+        with self._lock:
+            self.probes += 1
+        start = time.perf_counter()
+        try:
+            # Disable SSL verification for development purposes, as for the analysis requests
+            response = client.transport.get(config['base_url'], url, headers=headers, verify=False,
+                                            timeout=deadline_timeout((self.timeout, self.timeout)))
+        except DeadlineExceeded as e:
+            return False, str(e), False
+        except requests.RequestException as e:
+            logger.warning(f"{api_provider} key probe failed: {str(e)}")
+            return False, f"Could not reach the {api_provider} API: {str(e)}", False
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"{api_provider} key probe returned {response.status_code} in {elapsed_ms:.0f}ms")
+        if response.status_code == 200:
+            return True, "API key accepted.", True
+        if response.status_code == 429:
+            # Rate limited requests are still authenticated, so the key itself is fine
+            return True, "API key accepted (the provider is currently rate limiting it).", True
+        if response.status_code in REJECTED_STATUS_CODES:
+            return False, f"The {api_provider} API rejected the key ({response.status_code}).", True
+        return False, f"The {api_provider} API returned {response.status_code}.", False
+
+    def clear(self):
+        """Forget all cached verdicts."""
+        with self._lock:
+            self._results.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get probe statistics.
+
+        Returns:
+            Dictionary with the number of cached verdicts, cache hits and probe requests sent
+        """
+        with self._lock:
+            return {
+                "cached_keys": len(self._results),
+                "hits": self.hits,
+                "probes": self.probes,
+                "ttl_seconds": self.ttl,
+                "failure_ttl_seconds": self.failure_ttl
+            }
+
+
+# Create a process-wide instance for use throughout the application
+key_probe = KeyProbe()
@@ -0,0 +1,129 @@
+"""
+Per-stage latency accounting for analysis requests.
+This module times the stages of an analysis (prompt build, network, JSON
+decode, standardisation) so results, logs and an optional Server-Timing
+response header show where the time goes.
+"""
+
+import os
+import time
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Whether to add a Server-Timing header to responses (overridable via environment variable)
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Stage timings of the request currently being handled (shared with worker threads via copied contexts)
+_current_breakdown: contextvars.ContextVar[Optional['LatencyBreakdown']] = contextvars.ContextVar(
+    'latency_breakdown', default=None
+)
+
+
+class LatencyBreakdown:
+    """Accumulates time spent in named stages."""
+
+    def __init__(self):
+        """Initialize an empty breakdown."""
+        self._stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+
+    def add(self, stage: str, seconds: float):
+        """
+        Add time to a stage.
+
+        Args:
+            stage: The stage name
+            seconds: The time spent
+        """
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def merge(self, other: 'LatencyBreakdown'):
+        """
+        Add another breakdown's stage timings to this one.
+
+        Args:
+            other: The breakdown to add
+        """
+        with other._lock:
+            stages = list(other._stages.items())
+        for name, seconds in stages:
+            self.add(name, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as a stage, also adding it to the current request's breakdown."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed)
+            request_breakdown = _current_breakdown.get()
+            if request_breakdown is not None and request_breakdown is not self:
+                request_breakdown.add(name, elapsed)
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Get the stage timings.
+
+        Returns:
+            Dictionary of stage name to milliseconds, plus total_ms since the breakdown started
+        """
+        with self._lock:
+            timings = {f"{name}_ms": round(seconds * 1000, 2) for name, seconds in self._stages.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started_at) * 1000, 2)
+        return timings
+
+    def server_timing(self) -> str:
+        """Format the stage timings as a Server-Timing header value."""
+        with self._lock:
+            stages = list(self._stages.items())
+        metrics = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages]
+        metrics.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def log(self, label: str):
+        """Log the stage timings."""
+        timings = ", ".join(f"{name}={value}ms" for name, value in self.as_dict().items())
+        logger.info(f"{label} latency: {timings}")
+
+
+def start_request_breakdown() -> LatencyBreakdown:
+    """Start the breakdown for the current request and return it."""
+    breakdown = LatencyBreakdown()
+    _current_breakdown.set(breakdown)
+    return breakdown
+
+
+def get_request_breakdown() -> Optional[LatencyBreakdown]:
+    """Get the breakdown of the current request, if one was started."""
+    return _current_breakdown.get()
+
+
+def init_app(app):
+    """
+    Time every request of a Flask app and, if SERVER_TIMING_ENABLED is set,
+    report the stage timings in a Server-Timing response header.
+
+    Args:
+        app: The Flask application
+    """
+    @app.before_request
+    def _start_latency_breakdown():
+        start_request_breakdown()
+
+    @app.after_request
+    def _add_server_timing(response):
+        breakdown = get_request_breakdown()
+        if breakdown is not None and SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = breakdown.server_timing()
+        return response
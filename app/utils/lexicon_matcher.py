@@ -0,0 +1,150 @@
+"""
+Multi-pattern lexicon matching.
+This module compiles keyword lexicons (personality traits, emotional tones,
+formality indicators) into a single Aho-Corasick automaton over words, so one
+linear pass over a text counts every keyword of every lexicon. Keywords only
+match whole words, and may span several words ("kind of") or be hyphenated
+("cutting-edge").
+"""
+
+import re
+import logging
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A word: letters and digits, optionally joined by apostrophes or hyphens
+WORD_PATTERN = re.compile(r"[^\W_]+(?:['-][^\W_]+)*")
+
+# Counts per lexicon and category, e.g. {"personality_traits": {"bold": 3, ...}, ...}
+LexiconCounts = Dict[str, Dict[str, int]]
+
+
+def tokenize_words(text: str) -> List[str]:
+    """
+    Split a text into lowercase words the way the matcher does.
+
+    Args:
+        text: The text to split
+
+    Returns:
+        The words in order
+    """
+    return WORD_PATTERN.findall(text.lower())
+
+
+class LexiconMatcher:
+    """Aho-Corasick automaton counting the keywords of several lexicons at once."""
+
+    def __init__(self, lexicons: Dict[str, Dict[str, List[str]]]):
+        """
+        Compile the lexicons.
+
+        Args:
+            lexicons: Keyword lists per category, per lexicon, e.g.
+                {"emotional_tone": {"calm": ["calm", "peaceful", ...], ...}, ...}
+        """
+        self.lexicons = lexicons
+        # State 0 is the root; each state has word transitions, a failure link and
+        # the (lexicon, category, keyword) entries that end there (including via failure links)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, str, str]]] = [[]]
+
+        for lexicon, categories in lexicons.items():
+            for category, keywords in categories.items():
+                for keyword in keywords:
+                    self._add(tokenize_words(keyword), (lexicon, category, keyword))
+        self._link()
+
+    def _add(self, words: List[str], entry: Tuple[str, str, str]):
+        """Add a keyword's words to the trie."""
+        if not words:
+            return
+        state = 0
+        for word in words:
+            following = self._goto[state].get(word)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][word] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = following
+        if entry not in self._outputs[state]:
+            self._outputs[state].append(entry)
+
+    def _link(self):
+        """Compute failure links breadth first and merge the outputs they lead to."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[following] = target if target != following else 0
+                self._outputs[following] = self._outputs[following] + [
+                    entry for entry in self._outputs[self._fail[following]] if entry not in self._outputs[following]]
+
+    def scan(self, sentence: str) -> Iterator[Tuple[str, str, str]]:
+        """
+        Find the keyword matches in a sentence.
+
+        Args:
+            sentence: The sentence (or any text) to scan
+
+        Yields:
+            A (lexicon, category, keyword) tuple for every match, in text order
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for word in WORD_PATTERN.findall(sentence.lower()):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            yield from outputs[state]
+
+    def _empty_counts(self) -> LexiconCounts:
+        return {lexicon: {category: 0 for category in categories} for lexicon, categories in self.lexicons.items()}
+
+    def count(self, sentences: Iterable[str]) -> Tuple[LexiconCounts, LexiconCounts]:
+        """
+        Count keyword matches in one pass over the sentences of a text.
+
+        Args:
+            sentences: The text's sentences (or the whole text as a single item)
+
+        Returns:
+            Tuple containing:
+                - Keyword occurrences per lexicon and category
+                - Sentences containing each keyword, summed per lexicon and category
+                  (a sentence with two different keywords of a category counts twice)
+        """
+        occurrences = self._empty_counts()
+        sentence_hits = self._empty_counts()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+
+        for sentence in sentences:
+            seen = set()
+            state = 0
+            for word in WORD_PATTERN.findall(sentence.lower()):
+                while state and word not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(word, 0)
+                for entry in outputs[state]:
+                    lexicon, category, _ = entry
+                    occurrences[lexicon][category] += 1
+                    if entry not in seen:
+                        seen.add(entry)
+                        sentence_hits[lexicon][category] += 1
+        return occurrences, sentence_hits
+
+    def __len__(self) -> int:
+        """Number of automaton states."""
+        return len(self._goto)
@@ -0,0 +1,449 @@
+"""
+Local mock LLM provider server for benchmarks and load tests.
+This module serves the OpenAI chat completions, Anthropic messages, Cohere
+generate and custom analyze request shapes with schema-valid brand voice JSON,
+a configurable latency distribution, error rate and 429 injection, so the
+API client and the whole Flask app can be exercised with no network.
+
+Run it with:
+    python -m app.utils.mock_llm_server --port 8001 --latency-ms 800 --rate-limit-rate 0.05
+
+and point the app at it:
+    OPENAI_API_BASE_URL=http://127.0.0.1:8001/v1
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+
+from app.utils.token_estimator import estimate_payload, estimate_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default behaviour (overridable via environment variables or command line flags)
+DEFAULT_LATENCY_MS = float(os.environ.get('MOCK_LLM_LATENCY_MS', 800))
+DEFAULT_LATENCY_SIGMA = float(os.environ.get('MOCK_LLM_LATENCY_SIGMA', 0.5))
+DEFAULT_ERROR_RATE = float(os.environ.get('MOCK_LLM_ERROR_RATE', 0))
+DEFAULT_RATE_LIMIT_RATE = float(os.environ.get('MOCK_LLM_RATE_LIMIT_RATE', 0))
+DEFAULT_RETRY_AFTER = float(os.environ.get('MOCK_LLM_RETRY_AFTER', 1))
+DEFAULT_FIRST_TOKEN_MS = float(os.environ.get('MOCK_LLM_FIRST_TOKEN_MS', 300))
+
+# Characters of completion text sent in each streamed event
+STREAM_CHUNK_CHARS = 16
+
+# Prompt caching emulation: prefixes shorter than this are never cached, longer
+# ones are cached in increments of PROMPT_CACHE_INCREMENT tokens (as OpenAI does)
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_INCREMENT = 128
+PROMPT_CACHE_SIZE = 64
+
+# Vocabulary the mock draws brand voice characteristics from
+TRAITS = ["friendly", "professional", "innovative", "trustworthy", "bold", "playful", "authoritative",
+          "caring", "confident", "authentic", "inspiring", "witty"]
+TONES = ["optimistic", "reassuring", "passionate", "calm", "serious", "enthusiastic", "empathetic"]
+TERMS = ["simple", "together", "honest", "craft", "clear", "everyday", "community", "quality", "real",
+         "effortless", "human", "thoughtful", "open", "fresh", "local"]
+AVOIDED = ["synergy", "leverage", "disrupt", "cheap", "utilize", "paradigm", "robust", "world-class"]
+PHRASES = ["We keep it simple", "Made for real life", "Better together", "Honest by design",
+           "Built to last", "Here when you need us"]
+
+
+class MockConfig:
+    """Latency and failure settings for the mock server."""
+
+    def __init__(self, latency_ms: float = DEFAULT_LATENCY_MS, latency_sigma: float = DEFAULT_LATENCY_SIGMA,
+                 error_rate: float = DEFAULT_ERROR_RATE, rate_limit_rate: float = DEFAULT_RATE_LIMIT_RATE,
+                 retry_after: float = DEFAULT_RETRY_AFTER, seed: Optional[int] = None,
+                 first_token_ms: float = DEFAULT_FIRST_TOKEN_MS):
+        """
+        Initialize the settings.
+
+        Args:
+            latency_ms: Median response latency in milliseconds
+            latency_sigma: Spread of the log-normal latency distribution (0 for a fixed latency)
+            error_rate: Fraction of requests answered with a 500 error
+            rate_limit_rate: Fraction of requests answered with a 429 and a Retry-After header
+            retry_after: Seconds sent in the Retry-After header of 429 responses
+            seed: Optional random seed for reproducible runs
+            first_token_ms: Time to the first event of a streamed response; the rest of
+                the text is spread over the remainder of the sampled latency
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.first_token_ms = first_token_ms
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def sample_latency(self) -> float:
+        """Draw a response latency in seconds from the log-normal distribution."""
+        with self._lock:
+            if self.latency_sigma <= 0:
+                return self.latency_ms / 1000.0
+            return self.random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000.0
+
+    def sample_failure(self) -> Optional[int]:
+        """Decide whether a request fails. Returns 429, 500 or None."""
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 500
+        return None
+
+
+class PromptCache:
+    """Emulates provider prompt caching so benchmarks can show cached-token counts."""
+
+    def __init__(self):
+        """Initialize an empty cache of recent prompts and cache breakpoint prefixes."""
+        self._prompts = deque(maxlen=PROMPT_CACHE_SIZE)
+        self._prefixes = set()
+        self._lock = threading.Lock()
+
+    def openai_cached_tokens(self, prompt: str) -> int:
+        """Automatic prefix caching: tokens of the longest prefix shared with a recent prompt."""
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, seen])) for seen in self._prompts), default=0)
+            self._prompts.append(prompt)
+        tokens = estimate_tokens(prompt[:shared])
+        if tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        return tokens - tokens % PROMPT_CACHE_INCREMENT
+
+    def anthropic_cache_usage(self, payload: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        cache_control caching: the prefix up to the last breakpoint is read from the
+        cache if it was seen before, otherwise written to it.
+
+        Returns:
+            Tuple of (cache read tokens, cache write tokens)
+        """
+        blocks = []
+        system = payload.get('system')
+        if isinstance(system, list):
+            blocks.extend(system)
+        for message in payload.get('messages') or []:
+            if isinstance(message.get('content'), list):
+                blocks.extend(message['content'])
+
+        breakpoint_index = max((i for i, block in enumerate(blocks) if block.get('cache_control')), default=None)
+        if breakpoint_index is None:
+            return 0, 0
+        prefix = ''.join(block.get('text', '') for block in blocks[:breakpoint_index + 1])
+        tokens = estimate_tokens(prefix)
+        if tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0, 0
+        key = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._prefixes:
+                return tokens, 0
+            self._prefixes.add(key)
+        return 0, tokens
+
+
+def _prompt_text(payload: Dict[str, Any]) -> str:
+    """Get the prompt text from any of the supported request shapes."""
+    parts = []
+    for message in payload.get('messages') or []:
+        content = message.get('content', '')
+        if not isinstance(content, str):
+            content = ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+        parts.append(content)
+    for field in ('prompt', 'text'):
+        if isinstance(payload.get(field), str):
+            parts.append(payload[field])
+    return '\n'.join(parts)
+
+
+def brand_voice_analysis(text: str) -> Dict[str, Any]:
+    """
+    Build a brand voice analysis in the format the analysis prompts ask for.
+    The content is derived from a hash of the text, so identical prompts get identical answers.
+    """
+    rng = random.Random(hashlib.sha256(text.encode('utf-8')).hexdigest())
+    traits = rng.sample(TRAITS, 5)
+    tones = rng.sample(TONES, 4)
+    return {
+        "personality_traits": {trait: 9 - i for i, trait in enumerate(traits)},
+        "emotional_tone": {tone: 9 - i for i, tone in enumerate(tones)},
+        "formality": {"level": rng.randint(3, 8)},
+        "vocabulary": {
+            "preferred_terms": rng.sample(TERMS, 10),
+            "avoided_terms": rng.sample(AVOIDED, 5)
+        },
+        "communication_style": {
+            "key_phrases": rng.sample(PHRASES, 4),
+            "sentence_structure": {
+                "length_preference": rng.randint(3, 8),
+                "complexity_preference": rng.randint(3, 8)
+            },
+            "rich_descriptions": [f"We are {traits[0]}, never {rng.choice(AVOIDED)}."]
+        }
+    }
+
+
+def tone_of_voice_assets(text: str) -> Dict[str, Any]:
+    """Build tone of voice assets in the format the assets prompt asks for."""
+    rng = random.Random(hashlib.sha256(text.encode('utf-8')).hexdigest())
+    traits = rng.sample(TRAITS, 3)
+    guide = (f"Write as a {', '.join(traits[:-1])} and {traits[-1]} brand. " +
+             "Keep sentences short and concrete, speak directly to the reader and prefer everyday words. " * 20)
+    return {
+        "tone_of_voice_prompt": guide.strip(),
+        "campaign_taglines": rng.sample(PHRASES, 2)
+    }
+
+
+def build_response(path: str, payload: Dict[str, Any], prompt_cache: Optional[PromptCache] = None) -> Dict[str, Any]:
+    """
+    Build the response body for a request path in that provider's response shape.
+
+    Args:
+        path: The request path (e.g. /v1/chat/completions)
+        payload: The decoded request body
+        prompt_cache: Optional prompt cache emulation used to report cached tokens
+
+    Returns:
+        The response body
+    """
+    prompt_cache = prompt_cache or PromptCache()
+    prompt = _prompt_text(payload)
+    if '"tone_of_voice_assets"' in prompt:
+        # Fused mode: the analysis and the assets in one completion
+        content = brand_voice_analysis(prompt)
+        content["tone_of_voice_assets"] = tone_of_voice_assets(prompt)
+    elif 'tone_of_voice_prompt' in prompt:
+        content = tone_of_voice_assets(prompt)
+    else:
+        content = brand_voice_analysis(prompt)
+    content_text = json.dumps(content)
+    estimate = estimate_payload(payload)
+    prompt_tokens = estimate["prompt_tokens"]
+    completion_tokens = max(1, len(content_text) // 4)
+    response_id = hashlib.sha256(f"{time.time()}{prompt}".encode('utf-8')).hexdigest()[:24]
+
+    if path.endswith('/chat/completions'):
+        return {
+            "id": f"chatcmpl-{response_id}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get('model', 'mock'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content_text},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": prompt_cache.openai_cached_tokens(
+                          ''.join(str(m.get('content', '')) for m in payload.get('messages') or []))}}
+        }
+    if path.endswith('/messages'):
+        cache_read, cache_write = prompt_cache.anthropic_cache_usage(payload)
+        return {
+            "id": f"msg_{response_id}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get('model', 'mock'),
+            "content": [{"type": "text", "text": content_text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": prompt_tokens - cache_read - cache_write, "output_tokens": completion_tokens,
+                      "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_write}
+        }
+    if path.endswith('/generate'):
+        return {
+            "id": response_id,
+            "generations": [{"id": response_id, "text": f"Here is the analysis:\n{content_text}"}],
+            "meta": {"billed_units": {"input_tokens": prompt_tokens, "output_tokens": completion_tokens}}
+        }
+    # Custom providers get the analysis JSON directly
+    return content
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Request handler speaking the supported provider request shapes."""
+
+    protocol_version = 'HTTP/1.1'
+    config: MockConfig = None
+    prompt_cache: PromptCache = None
+
+    def log_message(self, format, *args):
+        """Log requests at debug level instead of writing to stderr."""
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        """Send a JSON response."""
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. its deadline passed) before the response was ready
+            logger.debug("Client disconnected before the response was sent")
+
+    def _send_stream(self, path: str, body: Dict[str, Any], latency: float):
+        """Send a completion as server-sent events in the provider's streaming format."""
+        first_token = min(latency, self.config.first_token_ms / 1000.0)
+        time.sleep(first_token)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        if path.endswith('/chat/completions'):
+            text = body["choices"][0]["message"]["content"]
+            chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+            events = [(None, {"id": body["id"], "object": "chat.completion.chunk", "model": body["model"],
+                              "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]})
+                      for chunk in chunks]
+            events.append((None, {"id": body["id"], "object": "chat.completion.chunk", "model": body["model"],
+                                  "choices": [], "usage": body["usage"]}))
+            events.append((None, "[DONE]"))
+        else:
+            text = body["content"][0]["text"]
+            chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+            usage = dict(body["usage"], output_tokens=1)
+            events = [("message_start", {"type": "message_start", "message": dict(body, content=[], usage=usage)}),
+                      ("content_block_start", {"type": "content_block_start", "index": 0,
+                                               "content_block": {"type": "text", "text": ""}})]
+            events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": chunk}}) for chunk in chunks]
+            events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                       ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                                          "usage": {"output_tokens": body["usage"]["output_tokens"]}}),
+                       ("message_stop", {"type": "message_stop"})]
+
+        interval = max(0.0, latency - first_token) / max(1, len(chunks))
+        try:
+            for index, (event, data) in enumerate(events):
+                if index and index <= len(chunks):
+                    time.sleep(interval)
+                data = data if isinstance(data, str) else json.dumps(data)
+                chunk = ((f"event: {event}\n" if event else "") + f"data: {data}\n\n").encode('utf-8')
+                self.wfile.write(f"{len(chunk):x}\r\n".encode('ascii') + chunk + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client disconnected during the stream")
+
+    def do_GET(self):
+        """Serve the model list (used for key checks; keys starting with "invalid" are rejected) and server stats."""
+        if self.path.rstrip('/').endswith('/models'):
+            api_key = self.headers.get('x-api-key') or self.headers.get('Authorization', '').replace('Bearer ', '')
+            if api_key.startswith('invalid'):
+                self._send_json(401, {"error": {"type": "authentication_error", "message": "Invalid API key"}})
+                return
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        elif self.path.rstrip('/').endswith('/mock/stats'):
+            self._send_json(200, self.config.stats)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+
+    def do_POST(self):
+        """Answer a completion request after the sampled latency, or with an injected failure."""
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        latency = self.config.sample_latency()
+        if not payload.get('stream'):
+            time.sleep(latency)
+
+        failure = self.config.sample_failure()
+        if failure == 429:
+            self._send_json(429, {"error": {"type": "rate_limit_error", "message": "Rate limit exceeded"}},
+                            {'Retry-After': f"{self.config.retry_after:g}"})
+            return
+        if failure == 500:
+            self._send_json(500, {"error": {"type": "server_error", "message": "Injected server error"}})
+            return
+
+        path = self.path.split('?')[0]
+        if payload.get('stream') and (path.endswith('/chat/completions') or path.endswith('/messages')):
+            self._send_stream(path, build_response(path, payload, self.prompt_cache), latency)
+            return
+
+        self._send_json(200, build_response(path, payload, self.prompt_cache), {
+            'x-ratelimit-limit-requests': '10000',
+            'x-ratelimit-remaining-requests': '9999',
+            'x-ratelimit-reset-requests': '6ms'
+        })
+
+
+def start_mock_server(host: str = '127.0.0.1', port: int = 0,
+                      config: Optional[MockConfig] = None) -> ThreadingHTTPServer:
+    """
+    Start the mock server on a background thread.
+
+    Args:
+        host: The interface to bind
+        port: The port to bind (0 picks a free port)
+        config: Latency and failure settings
+
+    Returns:
+        The running server; its address is server.server_address and server.shutdown() stops it
+    """
+    handler = type('ConfiguredMockLLMHandler', (MockLLMHandler,),
+                   {'config': config or MockConfig(), 'prompt_cache': PromptCache()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"Mock LLM server listening on http://{host}:{server.server_address[1]}")
+    return server
+
+
+def main():
+    """Run the mock server from the command line."""
+    parser = argparse.ArgumentParser(description="Local mock LLM provider server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=DEFAULT_LATENCY_MS,
+                        help="Median response latency in milliseconds")
+    parser.add_argument('--latency-sigma', type=float, default=DEFAULT_LATENCY_SIGMA,
+                        help="Spread of the log-normal latency distribution (0 for fixed latency)")
+    parser.add_argument('--error-rate', type=float, default=DEFAULT_ERROR_RATE,
+                        help="Fraction of requests answered with a 500 error")
+    parser.add_argument('--rate-limit-rate', type=float, default=DEFAULT_RATE_LIMIT_RATE,
+                        help="Fraction of requests answered with a 429")
+    parser.add_argument('--retry-after', type=float, default=DEFAULT_RETRY_AFTER,
+                        help="Retry-After seconds sent with 429 responses")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--first-token-ms', type=float, default=DEFAULT_FIRST_TOKEN_MS,
+                        help="Time to the first event of a streamed response in milliseconds")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.latency_sigma, args.error_rate, args.rate_limit_rate,
+                        args.retry_after, args.seed, args.first_token_ms)
+    server = start_mock_server(args.host, args.port, config)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Model tiering for brand voice analyses.
+This module sends an analysis to a small, fast model first and checks the
+result with confidence heuristics (schema completeness, vocabulary size and
+score spread). Only analyses that fail the checks are repeated with the
+provider's large model. Escalations and latencies are tracked per tier.
+"""
+
+import os
+import re
+import math
+import threading
+import logging
+from collections import deque, Counter
+from typing import Dict, Any, List, Optional
+
+from app.utils.analysis_schema import get_analysis, AnalysisValidationError
+from app.utils.token_estimator import estimate_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tiering settings (overridable via environment variables)
+MODEL_TIERING_ENABLED = os.environ.get('MODEL_TIERING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Small model tried first for each provider; providers without one always use their large model
+FAST_MODELS = {
+    'openai': os.environ.get('OPENAI_FAST_MODEL', 'gpt-4o-mini'),
+    'anthropic': os.environ.get('ANTHROPIC_FAST_MODEL', 'claude-3-haiku-20240307')
+}
+# Texts longer than this go straight to the large model
+TIER_MAX_FAST_TOKENS = int(os.environ.get('TIER_MAX_FAST_TOKENS', 8000))
+# Confidence checks a fast model's analysis has to pass
+TIER_MIN_TRAITS = int(os.environ.get('TIER_MIN_TRAITS', 3))
+TIER_MIN_TERMS = int(os.environ.get('TIER_MIN_TERMS', 5))
+TIER_MIN_SCORE_SPREAD = float(os.environ.get('TIER_MIN_SCORE_SPREAD', 2))
+
+# Sections a complete analysis has
+REQUIRED_SECTIONS = ("personality_traits", "emotional_tone", "formality", "vocabulary", "communication_style")
+
+# Number of recent latencies kept per tier
+LATENCY_WINDOW = 200
+
+_WORD = re.compile(r"[a-z][a-z'-]+")
+
+
+class ModelTieringPolicy:
+    """Decides when a fast model's analysis is good enough and tracks escalations."""
+
+    def __init__(self, enabled: bool = MODEL_TIERING_ENABLED, fast_models: Optional[Dict[str, str]] = None,
+                 max_fast_tokens: int = TIER_MAX_FAST_TOKENS):
+        """
+        Initialize the policy.
+
+        Args:
+            enabled: Whether analyses are tiered at all
+            fast_models: Small model per provider (defaults to FAST_MODELS)
+            max_fast_tokens: Estimated text tokens above which the fast tier is skipped
+        """
+        self.enabled = enabled
+        self.fast_models = fast_models if fast_models is not None else dict(FAST_MODELS)
+        self.max_fast_tokens = max_fast_tokens
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {'fast': deque(maxlen=LATENCY_WINDOW),
+                                             'large': deque(maxlen=LATENCY_WINDOW)}
+        self._stats = {"tiered_requests": 0, "accepted_fast": 0, "escalations": 0,
+                       "skipped_fast": 0, "escalation_reasons": Counter()}
+
+    def fast_model(self, api_provider: str, text: str) -> Optional[str]:
+        """
+        Get the fast model to try first for a text, if tiering applies to it.
+
+        Args:
+            api_provider: The API provider
+            text: The text to analyze
+
+        Returns:
+            The fast model name, or None if the text should go to the large model directly
+        """
+        if not self.enabled or not self.fast_models.get(api_provider):
+            return None
+        if estimate_tokens(text) > self.max_fast_tokens:
+            with self._lock:
+                self._stats["skipped_fast"] += 1
+            return None
+        return self.fast_models[api_provider]
+
+    def assess(self, analysis: Dict[str, Any], text: str, include_assets: bool = False) -> Dict[str, str]:
+        """
+        Check a fast model's analysis with the confidence heuristics.
+
+        Args:
+            analysis: The analysis returned by the fast model
+            text: The analyzed text (short texts need fewer vocabulary terms)
+            include_assets: Whether the analysis was asked for tone of voice assets too
+
+        Returns:
+            The failed checks, mapped to a description (empty if the analysis is accepted)
+        """
+        try:
+            result = get_analysis(analysis)
+        except AnalysisValidationError as e:
+            return {"invalid": str(e)}
+
+        reasons = {}
+        missing = [section for section in REQUIRED_SECTIONS if section not in analysis]
+        if missing:
+            reasons["missing_sections"] = f"missing sections: {', '.join(missing)}"
+        if result.errors:
+            reasons["schema_errors"] = f"{len(result.errors)} schema error(s)"
+
+        if len(result.personality_traits) < TIER_MIN_TRAITS:
+            reasons["few_traits"] = (f"{len(result.personality_traits)} personality traits "
+                                     f"(at least {TIER_MIN_TRAITS} expected)")
+
+        # A short text can't supply many terms; expect about one per five distinct words
+        distinct_words = len(set(_WORD.findall(text.lower())))
+        min_terms = min(TIER_MIN_TERMS, max(1, distinct_words // 5))
+        terms = len(result.preferred_terms or [])
+        if terms < min_terms:
+            reasons["few_terms"] = f"{terms} preferred terms (at least {min_terms} expected)"
+
+        # Identical scores everywhere mean the model didn't weigh the traits against each other
+        scores = list(result.personality_traits.values()) + list(result.emotional_tone.values())
+        if len(scores) >= 3 and max(scores) - min(scores) < TIER_MIN_SCORE_SPREAD:
+            reasons["flat_scores"] = (f"score spread {max(scores) - min(scores):g} "
+                                      f"(at least {TIER_MIN_SCORE_SPREAD:g} expected)")
+
+        if include_assets and not (result.assets or {}).get("tone_of_voice_prompt"):
+            reasons["missing_assets"] = "missing tone of voice assets"
+        return reasons
+
+    def record(self, tier: str, latency: float, escalation_reasons: Optional[Dict[str, str]] = None):
+        """
+        Record a request to a tier.
+
+        Args:
+            tier: 'fast' or 'large'
+            latency: Seconds the request took
+            escalation_reasons: For fast tier requests, the failed checks that escalated
+                the result (None or empty if it was accepted)
+        """
+        with self._lock:
+            self._latencies[tier].append(latency)
+            if tier != 'fast':
+                return
+            self._stats["tiered_requests"] += 1
+            if escalation_reasons:
+                self._stats["escalations"] += 1
+                self._stats["escalation_reasons"].update(escalation_reasons.keys())
+            else:
+                self._stats["accepted_fast"] += 1
+
+    @staticmethod
+    def _latency_summary(latencies: List[float]) -> Dict[str, Any]:
+        """Summarize recent latencies in milliseconds."""
+        if not latencies:
+            return {"samples": 0}
+        samples = sorted(latencies)
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, max(0, math.ceil(p / 100.0 * len(samples)) - 1))] * 1000, 1)
+
+        return {"samples": len(samples), "mean_ms": round(sum(samples) / len(samples) * 1000, 1),
+                "p50_ms": percentile(50), "p95_ms": percentile(95)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get tiering statistics.
+
+        Returns:
+            Dictionary with the number of tiered requests, fast results accepted,
+            escalations and their reasons, the escalation rate and latency per tier
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["escalation_reasons"] = dict(stats["escalation_reasons"])
+            latencies = {tier: list(values) for tier, values in self._latencies.items()}
+        stats["enabled"] = self.enabled
+        stats["escalation_rate"] = (round(stats["escalations"] / stats["tiered_requests"], 3)
+                                    if stats["tiered_requests"] else 0.0)
+        stats["latency"] = {tier: self._latency_summary(values) for tier, values in latencies.items()}
+        return stats
+
+
+# Create a process-wide instance for use throughout the application
+model_tiering = ModelTieringPolicy()
@@ -0,0 +1,355 @@
+"""
+Rate limit aware request scheduling for AI API calls.
+This module tracks a token bucket per API key for both requests and tokens,
+learns the provider's limits from response headers and computes jittered
+exponential backoff for retries, so work is queued instead of failed.
+"""
+
+import os
+import re
+import time
+import random
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Mapping
+
+from app.utils.token_estimator import estimate_payload
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default limits and retry settings (overridable via environment variables)
+DEFAULT_REQUESTS_PER_MINUTE = float(os.environ.get('RATE_LIMIT_RPM', 500))
+DEFAULT_TOKENS_PER_MINUTE = float(os.environ.get('RATE_LIMIT_TPM', 30000))
+MAX_RETRIES = int(os.environ.get('API_MAX_RETRIES', 4))
+RETRY_BASE_DELAY = float(os.environ.get('API_RETRY_BASE_DELAY', 1.0))
+RETRY_MAX_DELAY = float(os.environ.get('API_RETRY_MAX_DELAY', 30.0))
+# Per-key state is forgotten after this many idle seconds, and at most this many keys are tracked
+RATE_LIMIT_IDLE_SECONDS = float(os.environ.get('RATE_LIMIT_IDLE_SECONDS', 600))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 1000))
+
+# Status codes worth retrying (rate limited, server errors, Anthropic "overloaded")
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+# Duration format used by OpenAI reset headers, e.g. "1s", "6m0s", "20ms", "1h2m3.5s"
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Parse a reset duration or timestamp header into seconds from now.
+
+    Args:
+        value: A duration like "6m0s", a number of seconds, or an RFC 3339 timestamp
+
+    Returns:
+        Seconds until the reset, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and ''.join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if reset_at.tzinfo is None:
+            reset_at = reset_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+    except ValueError:
+        return None
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """
+    Parse a Retry-After header (seconds or HTTP date) into seconds from now.
+
+    Args:
+        value: The Retry-After header value
+
+    Returns:
+        Seconds to wait, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """A token bucket that lets callers reserve capacity ahead of time and queue for it."""
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Bucket capacity, refilled evenly over one minute
+        """
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        """Add the capacity accumulated since the last update."""
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Reserve capacity, going into debt if needed.
+
+        Args:
+            amount: The amount to take from the bucket
+            now: The current monotonic time
+
+        Returns:
+            Seconds the caller must wait before using the reservation
+        """
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def update(self, now: float, limit: Optional[float] = None, remaining: Optional[float] = None,
+               reset_seconds: Optional[float] = None):
+        """
+        Align the bucket with limits reported by the provider.
+
+        Args:
+            now: The current monotonic time
+            limit: The provider's per-minute limit
+            remaining: Capacity the provider says is left in the current window
+            reset_seconds: Seconds until the provider's window fully resets
+        """
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+            self.rate = limit / 60.0
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+            # If the provider resets sooner than our refill would, refill faster
+            if reset_seconds and remaining < self.capacity:
+                self.rate = max(self.rate, (self.capacity - remaining) / max(reset_seconds, 0.001))
+
+
+class RateLimitScheduler:
+    """Per-key request and token buckets, plus provider backoff hints."""
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+                 max_retries: int = MAX_RETRIES, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, idle_seconds: float = RATE_LIMIT_IDLE_SECONDS,
+                 max_keys: int = RATE_LIMIT_MAX_KEYS):
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Assumed request limit until the provider reports one
+            tokens_per_minute: Assumed token limit until the provider reports one
+            max_retries: Maximum number of retries for a rate limited or failed request
+            base_delay: Base delay in seconds for exponential backoff
+            max_delay: Maximum backoff delay in seconds
+            idle_seconds: Seconds after which an unused key's state is dropped
+            max_keys: Maximum number of keys tracked; the least recently used is dropped first
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_seconds = idle_seconds
+        self.max_keys = max_keys
+        # Key ID -> bucket state, least recently used first
+        self._keys: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests_scheduled": 0,
+            "requests_delayed": 0,
+            "delay_seconds": 0.0,
+            "retries": 0,
+            "rate_limited_responses": 0,
+            "server_error_responses": 0,
+            "keys_evicted": 0
+        }
+
+    @staticmethod
+    def _key_id(api_key: str) -> str:
+        """Identify an API key without keeping the key itself."""
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+    def _state(self, api_key: str, now: float) -> Dict[str, Any]:
+        """
+        Get (or create) the bucket state for an API key. Must be called with the lock held.
+
+        Keys idle for longer than idle_seconds are dropped first; by then their
+        buckets have refilled, so only learned limits are forgotten.
+        """
+        key_id = self._key_id(api_key)
+        state = self._keys.get(key_id)
+        if state is not None:
+            self._keys.move_to_end(key_id)
+        else:
+            state = {
+                "requests": TokenBucket(self.requests_per_minute),
+                "tokens": TokenBucket(self.tokens_per_minute),
+                "blocked_until": 0.0
+            }
+            self._keys[key_id] = state
+            while len(self._keys) > 1:
+                oldest = next(iter(self._keys.values()))
+                if len(self._keys) <= self.max_keys and now - oldest["last_used"] <= self.idle_seconds:
+                    break
+                self._keys.popitem(last=False)
+                self._stats["keys_evicted"] += 1
+        state["last_used"] = now
+        return state
+
+    def reserve(self, api_key: str, tokens: int) -> float:
+        """
+        Reserve one request and an estimated number of tokens for an API key.
+
+        Args:
+            api_key: The API key the request will be made with
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            Seconds the caller should wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(api_key, now)
+            delay = max(
+                state["requests"].reserve(1, now),
+                state["tokens"].reserve(tokens, now),
+                state["blocked_until"] - now
+            )
+            self._stats["requests_scheduled"] += 1
+            if delay > 0:
+                self._stats["requests_delayed"] += 1
+                self._stats["delay_seconds"] += delay
+        if delay > 0:
+            logger.info(f"Rate limit scheduler queuing request for {delay:.2f}s")
+        return max(0.0, delay)
+
+    def update_from_headers(self, api_key: str, headers: Mapping[str, str]):
+        """
+        Learn limits from provider response headers (OpenAI x-ratelimit-* and
+        Anthropic anthropic-ratelimit-* headers, plus Retry-After).
+
+        Args:
+            api_key: The API key the request was made with
+            headers: The response headers
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+
+        def number(name):
+            try:
+                return float(headers[name])
+            except (KeyError, TypeError, ValueError):
+                return None
+
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(api_key, now)
+            for kind in ("requests", "tokens"):
+                for limit_name, remaining_name, reset_name in (
+                    (f"x-ratelimit-limit-{kind}", f"x-ratelimit-remaining-{kind}", f"x-ratelimit-reset-{kind}"),
+                    (f"anthropic-ratelimit-{kind}-limit", f"anthropic-ratelimit-{kind}-remaining",
+                     f"anthropic-ratelimit-{kind}-reset"),
+                ):
+                    limit = number(limit_name)
+                    remaining = number(remaining_name)
+                    if limit is None and remaining is None:
+                        continue
+                    state[kind].update(now, limit=limit, remaining=remaining,
+                                       reset_seconds=parse_duration(headers.get(reset_name, '')))
+
+            retry_after = parse_retry_after(headers.get('retry-after', ''))
+            if retry_after:
+                state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Compute the delay before a retry using full-jitter exponential backoff.
+
+        Args:
+            attempt: The zero-based attempt that just failed
+            retry_after: Seconds the provider asked us to wait, if any
+
+        Returns:
+            Seconds to wait before retrying
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            # Honour the provider's hint, with a little jitter so callers don't retry in lockstep
+            delay = retry_after + random.uniform(0, self.base_delay)
+        return delay
+
+    def should_retry(self, status_code: int, attempt: int) -> bool:
+        """
+        Decide whether a response status is worth retrying, and count it.
+
+        Args:
+            status_code: The response status code
+            attempt: The zero-based attempt that produced the response
+
+        Returns:
+            True if the request should be retried
+        """
+        if status_code not in RETRYABLE_STATUS_CODES:
+            return False
+        with self._lock:
+            if status_code == 429:
+                self._stats["rate_limited_responses"] += 1
+            else:
+                self._stats["server_error_responses"] += 1
+            if attempt >= self.max_retries:
+                return False
+            self._stats["retries"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler counters.
+
+        Returns:
+            Dictionary with scheduled/delayed requests, total queueing delay, retry
+            counts and the number of keys tracked and evicted
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["keys_tracked"] = len(self._keys)
+        stats["delay_seconds"] = round(stats["delay_seconds"], 3)
+        return stats
+
+
+def estimate_payload_tokens(payload: Dict[str, Any]) -> int:
+    """Estimate the tokens a request payload will consume: its prompt plus the most it may generate."""
+    estimate = estimate_payload(payload)
+    return estimate["prompt_tokens"] + int(payload.get("max_tokens", 0) or estimate["completion_tokens"])
+
+
+# Create a process-wide instance for use throughout the application
+rate_limiter = RateLimitScheduler()
@@ -0,0 +1,217 @@
+"""
+Content-addressed cache for AI API responses.
+This module stores parsed provider responses on disk, keyed by a hash of the
+provider, model, prompts and text, so identical requests skip the upstream call.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default cache settings (overridable via environment variables)
+DEFAULT_CACHE_PATH = os.environ.get(
+    'RESPONSE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'cache', 'api_responses.sqlite3')
+)
+DEFAULT_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+DEFAULT_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+DEFAULT_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 7 * 24 * 3600))
+CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+class ResponseCache:
+    """Disk-backed LRU cache with a TTL and size limits."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL, enabled: bool = CACHE_ENABLED):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path of the SQLite file holding cached responses
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached responses in bytes
+            ttl: Seconds a cached response stays valid
+            enabled: Whether the cache is used at all
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "bypasses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "saved_upstream_seconds": 0.0
+        }
+
+    @staticmethod
+    def make_key(provider: str, model: str, system_prompt: str, user_prompt: str, text: str) -> str:
+        """
+        Build a content-addressed cache key.
+
+        Args:
+            provider: The API provider name
+            model: The model name
+            system_prompt: The system prompt sent with the request
+            user_prompt: The user prompt (instructions) sent with the request
+            text: The text being analyzed
+
+        Returns:
+            A hex SHA-256 digest identifying the request
+        """
+        digest = hashlib.sha256()
+        for part in (provider, model, system_prompt, user_prompt, text):
+            encoded = (part or '').encode('utf-8')
+            # Length-prefix each part so different splits can't collide
+            digest.update(str(len(encoded)).encode('ascii') + b':')
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite database on first use."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL, upstream_seconds REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: The cache key from make_key()
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created_at, upstream_seconds FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                now = time.time()
+
+                if row is not None and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                    self._stats["expired"] += 1
+                    row = None
+
+                if row is None:
+                    self._stats["misses"] += 1
+                    return None
+
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self._stats["hits"] += 1
+                self._stats["saved_upstream_seconds"] += row[2]
+            return json.loads(row[0])
+        except Exception as e:
+            logger.error(f"Error reading response cache: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], upstream_seconds: float = 0.0):
+        """
+        Store a response in the cache, evicting least recently used entries if needed.
+
+        Args:
+            key: The cache key from make_key()
+            value: The parsed response to cache
+            upstream_seconds: How long the upstream call took, used for savings stats
+        """
+        if not self.enabled:
+            return
+
+        try:
+            serialized = json.dumps(value)
+            size = len(serialized.encode('utf-8'))
+            if size > self.max_bytes:
+                logger.info(f"Response of {size} bytes is larger than the cache limit; not caching")
+                return
+
+            now = time.time()
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at, upstream_seconds) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, serialized, size, now, now, upstream_seconds)
+                )
+                self._stats["stores"] += 1
+                self._evict(conn)
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error writing response cache: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Remove least recently used entries until the cache is within its limits."""
+        count, total_size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return
+
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total_size <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total_size -= size
+            self._stats["evictions"] += 1
+
+    def record_bypass(self):
+        """Count a lookup that was skipped because the caller asked to bypass the cache."""
+        with self._lock:
+            self._stats["bypasses"] += 1
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hit/miss counts, hit rate and upstream time saved
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["saved_upstream_seconds"] = round(stats["saved_upstream_seconds"], 3)
+        stats["enabled"] = self.enabled
+        return stats
+
+
+# Create a process-wide instance for use throughout the application
+response_cache = ResponseCache()
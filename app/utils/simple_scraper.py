@@ -5,11 +5,18 @@ import urllib3
 import urllib.request
 import traceback
 from app.utils.web_unlocker import fetch_with_web_unlocker, web_unlocker
+from app.utils.deadline import deadline_timeout, get_deadline
 
 def scrape_website(url):
     """Scrape text content from a website using a simplified approach"""
     print(f"Attempting to scrape website: {url}")
 
+    # Don't start fetching if the request's time budget is already used up
+    deadline = get_deadline()
+    if deadline is not None and deadline.expired:
+        print(f"Request deadline exceeded; skipping {url}")
+        return ""
+
     # Add more detailed logging
     import sys
     import traceback
@@ -235,7 +242,7 @@ def scrape_website(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         print(f"Making request to {url} with SSL verification disabled")
-        response = requests.get(url, headers=headers, timeout=15, verify=False)
+        response = requests.get(url, headers=headers, timeout=deadline_timeout(15), verify=False)
         print(f"Response status code: {response.status_code}")
         response.raise_for_status()
         print("Response successful")
@@ -248,7 +255,7 @@ def scrape_website(url):
             print("Trying with urllib and unverified SSL context")
             context = ssl._create_unverified_context()
             req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, context=context, timeout=20) as response_obj:
+            with urllib.request.urlopen(req, context=context, timeout=deadline_timeout(20)) as response_obj:
                 response_text = response_obj.read().decode('utf-8')
 
             # Create a mock response object with the text
@@ -0,0 +1,90 @@
+"""
+In-process coalescing of identical concurrent calls.
+This module lets concurrent callers asking for the same key wait on a single
+execution of the underlying call and share its result.
+"""
+
+import copy
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        """Initialize the in-flight call table and counters."""
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0
+        }
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run fn for a key, or wait for the call already in flight for that key.
+
+        Args:
+            key: Identifies identical calls (e.g. a prompt hash)
+            fn: The call to make if none is in flight
+            timeout: Optional seconds to wait for a call already in flight
+
+        Returns:
+            Tuple containing:
+                - The call result (a private copy for callers that waited)
+                - True if the result was shared from another caller's execution
+
+        Raises:
+            concurrent.futures.TimeoutError: If the call in flight didn't finish within the timeout
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            logger.info("Waiting on identical in-flight request")
+            # Give each waiter its own copy so callers can't mutate each other's result
+            return copy.deepcopy(future.result(timeout)), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return result, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dictionary with total calls, upstream executions and coalesced calls
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+        return stats
+
+
+# Create a process-wide instance for use throughout the application
+singleflight = SingleFlight()
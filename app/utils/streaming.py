@@ -0,0 +1,228 @@
+"""
+Server-sent events and partial JSON.
+This module reads provider completion streams (server-sent events), parses
+the JSON a model has produced so far even though it is cut off mid-value, and
+formats the events the streaming endpoints send to the browser.
+"""
+
+import re
+import json
+import logging
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from app.utils.fast_json import dumps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# JSON number, and the characters a (possibly unfinished) number is made of
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_NUMBER_CHARS = re.compile(r'-?[\d.eE+-]+')
+_LITERALS = {'true': True, 'false': False, 'null': None}
+_WHITESPACE = ' \t\r\n'
+
+
+def iter_sse_events(chunks: Iterable[bytes]) -> Iterator[Tuple[str, str]]:
+    """
+    Split a server-sent event stream into events as the bytes arrive.
+
+    Args:
+        chunks: The response body in chunks of any size
+
+    Yields:
+        Tuples of the event name ('message' unless the event names one) and its data
+    """
+    buffer = b''
+    event, data = 'message', []
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b'\n')
+            if end < 0:
+                break
+            line = buffer[:end].rstrip(b'\r').decode('utf-8')
+            buffer = buffer[end + 1:]
+            if not line:
+                # A blank line dispatches the event
+                if data:
+                    yield event, '\n'.join(data)
+                event, data = 'message', []
+                continue
+            if line.startswith(':'):
+                # Comment (used as a keep-alive)
+                continue
+            field, _, value = line.partition(':')
+            if value.startswith(' '):
+                value = value[1:]
+            if field == 'data':
+                data.append(value)
+            elif field == 'event':
+                event = value
+    if data:
+        yield event, '\n'.join(data)
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Format an event for a text/event-stream response.
+
+    Args:
+        event: The event name
+        data: The event data, sent as JSON
+
+    Returns:
+        The event text, ending with the blank line that dispatches it
+    """
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+class _PartialParser:
+    """Recursive descent JSON parser that accepts a document cut off at any point."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def _skip_whitespace(self):
+        while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+            self.pos += 1
+
+    def _at_end(self) -> bool:
+        self._skip_whitespace()
+        return self.pos >= len(self.text)
+
+    def value(self) -> Tuple[Any, bool]:
+        """
+        Parse the value at the current position.
+
+        Returns:
+            Tuple containing:
+                - The value (or the part of it the text contains)
+                - Boolean indicating whether the value is complete
+
+        Raises:
+            ValueError: If the text is not the start of a JSON value
+        """
+        if self._at_end():
+            return None, False
+        char = self.text[self.pos]
+        if char == '{':
+            return self._object()
+        if char == '[':
+            return self._array()
+        if char == '"':
+            return self._string()
+        match = _NUMBER_CHARS.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group()
+            if self.pos >= len(self.text):
+                # A number running to the end of the text may still get more digits
+                return None, False
+            if not _NUMBER.fullmatch(number):
+                raise ValueError(f"Invalid number {number!r} at position {match.start()}")
+            return (float(number) if any(c in number for c in '.eE') else int(number)), True
+        for literal, value in _LITERALS.items():
+            if self.text.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return value, True
+            if literal.startswith(self.text[self.pos:]):
+                self.pos = len(self.text)
+                return None, False
+        raise ValueError(f"Unexpected character {char!r} at position {self.pos}")
+
+    def _string(self) -> Tuple[str, bool]:
+        start = self.pos
+        self.pos += 1
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char == '\\':
+                self.pos += 2
+            elif char == '"':
+                self.pos += 1
+                return json.loads(self.text[start:self.pos], strict=False), True
+            else:
+                self.pos += 1
+        # Cut off inside the string: drop an unfinished escape sequence and close it
+        partial = self.text[start:]
+        escape = partial.rfind('\\')
+        if escape >= 0:
+            backslashes = len(partial[:escape + 1]) - len(partial[:escape + 1].rstrip('\\'))
+            tail = partial[escape + 1:]
+            if backslashes % 2 == 1 and (not tail or (tail[0] == 'u' and len(tail) < 5)):
+                partial = partial[:escape]
+        self.pos = len(self.text)
+        return json.loads(partial + '"', strict=False), False
+
+    def _object(self) -> Tuple[dict, bool]:
+        result = {}
+        self.pos += 1
+        while True:
+            if self._at_end():
+                return result, False
+            if self.text[self.pos] == '}':
+                self.pos += 1
+                return result, True
+            if self.text[self.pos] == ',':
+                self.pos += 1
+                continue
+            if self.text[self.pos] != '"':
+                raise ValueError(f"Expected a key at position {self.pos}")
+            key, complete = self._string()
+            if not complete or self._at_end():
+                return result, False
+            if self.text[self.pos] != ':':
+                raise ValueError(f"Expected ':' at position {self.pos}")
+            self.pos += 1
+            value, complete = self.value()
+            # Unfinished strings and containers are kept; unfinished numbers and literals aren't
+            if complete or isinstance(value, (str, dict, list)):
+                result[key] = value
+            if not complete:
+                return result, False
+
+    def _array(self) -> Tuple[list, bool]:
+        result = []
+        self.pos += 1
+        while True:
+            if self._at_end():
+                return result, False
+            if self.text[self.pos] == ']':
+                self.pos += 1
+                return result, True
+            if self.text[self.pos] == ',':
+                self.pos += 1
+                continue
+            value, complete = self.value()
+            if complete or isinstance(value, (str, dict, list)):
+                result.append(value)
+            if not complete:
+                return result, False
+
+
+def parse_partial_json(text: str) -> Optional[Any]:
+    """
+    Parse a JSON document that may be cut off, e.g. a completion still being streamed.
+
+    Unfinished strings, objects and arrays are closed, and keys whose values
+    haven't started (or are unfinished numbers or literals) are left out, so a
+    string value only ever grows as more text arrives. Text before the first
+    '{' or '[' (such as a code fence) is skipped.
+
+    Args:
+        text: The document so far
+
+    Returns:
+        The value parsed so far, or None if the document hasn't started yet
+
+    Raises:
+        ValueError: If the text is not the start of a JSON document
+    """
+    starts = [index for index in (text.find('{'), text.find('[')) if index >= 0]
+    if not starts:
+        return None
+    parser = _PartialParser(text)
+    parser.pos = min(starts)
+    value, _ = parser.value()
+    return value
@@ -1,11 +1,16 @@
 import nltk
 import logging
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
 from flask import session
 
-from app.utils.api_client import APIClient
+from app.utils.api_client import get_api_client, FUSED_ANALYSIS_ENABLED
+from app.utils.chunked_analysis import analyze_in_chunks, CHUNKED_ANALYSIS_THRESHOLD
+from app.utils.token_estimator import estimate_tokens
+from app.utils.latency import LatencyBreakdown
+from app.utils.hedging import HEDGING_ENABLED
+from app.utils.analysis_schema import get_analysis
+from app.utils.fast_json import dumps
+from app.utils.lexicon_matcher import LexiconMatcher
+from app.utils.analyzed_document import AnalyzedDocument
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -44,10 +49,33 @@ EMOTIONAL_TONES = {
     "reassuring": ["reassuring", "comforting", "soothing", "consoling", "encouraging", "supportive", "calming"]
 }
 
-def analyze_text(text):
+# Formality indicators dictionary
+FORMALITY_INDICATORS = {
+    "formal": ["therefore", "consequently", "furthermore", "moreover", "thus", "hence", "regarding",
+              "concerning", "accordingly", "subsequently"],
+    "informal": ["anyway", "basically", "actually", "so", "well", "you know", "kind of", "sort of",
+                "like", "stuff", "thing"]
+}
+
+# All three dictionaries compiled into one automaton, so a single pass over a text counts every keyword
+LEXICON_MATCHER = LexiconMatcher({
+    "personality_traits": PERSONALITY_TRAITS,
+    "emotional_tone": EMOTIONAL_TONES,
+    "formality": FORMALITY_INDICATORS
+})
+
+def analyze_text(text, chunked=None):
     """
     Analyze text to extract brand voice parameters using AI API.
     Will only perform analysis if API integration is enabled and a valid API key is provided.
+
+    Long texts are split into chunks that are analyzed concurrently and merged.
+    Pass chunked=True or chunked=False to force a mode; by default chunking is
+    used when the text is larger than CHUNKED_ANALYSIS_THRESHOLD tokens.
+
+    With FUSED_ANALYSIS_ENABLED the tone of voice assets are generated in the
+    same request and returned under "tone_of_voice_assets", so the summary
+    doesn't need a second request for them.
     """
     # Check if API key is set
     if 'api_settings' not in session:
@@ -68,17 +96,31 @@ def analyze_text(text):
 
     logger.info("Using OpenAI API for text analysis")
 
-    # Create API client and analyze text (always use OpenAI)
-    api_client = APIClient('openai', api_key)
-    success, results = api_client.analyze_text(text)
+    # Get the shared API client and analyze text (always use OpenAI)
+    api_client = get_api_client('openai', api_key)
+    breakdown = LatencyBreakdown()
+    if chunked is None:
+        chunked = estimate_tokens(text) > CHUNKED_ANALYSIS_THRESHOLD
+
+    if chunked:
+        logger.info("Using chunked analysis for long text")
+        success, results = analyze_in_chunks(api_client, text, hedged=HEDGING_ENABLED)
+    else:
+        # With hedging, slow requests are hedged to (and fail over to) the secondary providers
+        success, results = api_client.analyze_text(text, include_assets=FUSED_ANALYSIS_ENABLED,
+                                                   hedged=HEDGING_ENABLED)
 
     if success:
         logger.info("API analysis successful")
 
         # Process and standardize the API response
         try:
-            # Extract and standardize the results
-            standardized_results = standardize_api_results(results)
+            # Extract and standardize the results, keeping the API stage timings out of the stored response
+            api_latency = results.pop("latency", {})
+            with breakdown.stage('standardize'):
+                standardized_results = standardize_api_results(results)
+            standardized_results["latency"] = {**api_latency, **breakdown.as_dict()}
+            logger.info(f"Analysis latency: {standardized_results['latency']}")
             return standardized_results
         except Exception as e:
             logger.error(f"Error standardizing API results: {str(e)}")
@@ -91,179 +133,54 @@ def analyze_text(text):
 def standardize_api_results(api_results):
     """
     Standardize API results to match the expected format for brand parameters.
-    Different APIs may return different formats, so we need to standardize them.
+    Different APIs may return different formats, so the results are validated
+    against the analysis schema in one pass (results the API clients already
+    validated are not validated again); values that don't fit are dropped and
+    reported in validation_errors rather than replaced with default scores.
     """
-    # Store the original API results for later use
-    original_api_results = api_results.copy()
-
-    standardized = {
-        "personality_traits": {},
-        "emotional_tone": {},
-        "formality_score": 5,  # Default
-        "common_vocabulary": [],
-        "avg_sentence_length": 0,
-        "sentence_complexity": 5,  # Default
-        "original_api_response": original_api_results,  # Store the original response
-        "rich_descriptions": []  # Store rich descriptions of the brand voice
-    }
+    analysis = get_analysis(api_results)
+    standardized = analysis.to_standardized()
 
-    # Extract rich descriptions if available
-    if "communication_style" in api_results and "rich_descriptions" in api_results["communication_style"]:
-        standardized["rich_descriptions"] = api_results["communication_style"]["rich_descriptions"]
-
-    # Process personality traits
-    if "personality_traits" in api_results:
-        if isinstance(api_results["personality_traits"], dict):
-            # Convert all values to numeric scores
-            for trait, value in api_results["personality_traits"].items():
-                if isinstance(value, bool):
-                    standardized["personality_traits"][trait] = 10 if value else 0
-                elif isinstance(value, (int, float)):
-                    standardized["personality_traits"][trait] = int(value)  # Convert to integer
-                elif isinstance(value, str) and value.isdigit():
-                    standardized["personality_traits"][trait] = int(value)  # Convert string digits to integer
-                else:
-                    standardized["personality_traits"][trait] = 8  # Default to high score for any non-numeric value
-                    print(f"Warning: Non-numeric value '{value}' for trait '{trait}' converted to 8")
-        elif isinstance(api_results["personality_traits"], list):
-            # Convert list to dict with scores
-            for i, trait in enumerate(api_results["personality_traits"]):
-                if isinstance(trait, str):
-                    # Assign decreasing scores based on position
-                    standardized["personality_traits"][trait] = 10 - i if i < 10 else 1
-                elif isinstance(trait, dict) and "trait" in trait and "score" in trait:
-                    standardized["personality_traits"][trait["trait"]] = trait["score"]
-
-    # Process emotional tone
-    if "emotional_tone" in api_results:
-        if isinstance(api_results["emotional_tone"], dict):
-            # Convert all values to numeric scores
-            for emotion, value in api_results["emotional_tone"].items():
-                if isinstance(value, bool):
-                    standardized["emotional_tone"][emotion] = 10 if value else 0
-                elif isinstance(value, (int, float)):
-                    standardized["emotional_tone"][emotion] = int(value)  # Convert to integer
-                elif isinstance(value, str) and value.isdigit():
-                    standardized["emotional_tone"][emotion] = int(value)  # Convert string digits to integer
-                else:
-                    standardized["emotional_tone"][emotion] = 8  # Default to high score for any non-numeric value
-                    print(f"Warning: Non-numeric value '{value}' for emotion '{emotion}' converted to 8")
-        elif isinstance(api_results["emotional_tone"], list):
-            # Convert list to dict with scores
-            for i, emotion in enumerate(api_results["emotional_tone"]):
-                if isinstance(emotion, str):
-                    # Assign decreasing scores based on position
-                    standardized["emotional_tone"][emotion] = 10 - i if i < 10 else 1
-                elif isinstance(emotion, dict) and "emotion" in emotion and "score" in emotion:
-                    standardized["emotional_tone"][emotion["emotion"]] = emotion["score"]
-
-    # Process formality score
-    if "formality" in api_results:
-        if isinstance(api_results["formality"], dict) and "level" in api_results["formality"]:
-            standardized["formality_score"] = api_results["formality"]["level"]
-        elif isinstance(api_results["formality"], (int, float)):
-            standardized["formality_score"] = api_results["formality"]
-    elif "formality_score" in api_results:
-        standardized["formality_score"] = api_results["formality_score"]
-
-    # Process vocabulary
-    if "vocabulary" in api_results:
-        # Process preferred terms
-        if "preferred_terms" in api_results["vocabulary"]:
-            terms = api_results["vocabulary"]["preferred_terms"]
-            if isinstance(terms, list):
-                # Convert to format [(term, frequency)] for compatibility
-                # Assign decreasing frequency values to emphasize the first terms
-                standardized["common_vocabulary"] = []
-                for i, term in enumerate(terms):
-                    # Assign frequency value from 10 down to 1, with a minimum of 1
-                    freq = max(1, 10 - i) if i < 10 else 1
-                    standardized["common_vocabulary"].append((term, freq))
-
-        # Process avoided terms if available
-        if "avoided_terms" in api_results["vocabulary"]:
-            avoided_terms = api_results["vocabulary"]["avoided_terms"]
-            if isinstance(avoided_terms, list):
-                standardized["avoided_terms"] = avoided_terms
-
-    elif "common_vocabulary" in api_results:
-        standardized["common_vocabulary"] = api_results["common_vocabulary"]
-
-    # Print vocabulary for debugging
-    print("\nExtracted vocabulary:")
-    print(f"Preferred terms: {[term for term, _ in standardized['common_vocabulary'][:10] if standardized['common_vocabulary']]}")
-    if "avoided_terms" in standardized:
-        print(f"Avoided terms: {standardized['avoided_terms'][:10]}")
-
-    # Process sentence structure
-    if "communication_style" in api_results and "sentence_structure" in api_results["communication_style"]:
-        sentence_structure = api_results["communication_style"]["sentence_structure"]
-        if "length_preference" in sentence_structure:
-            standardized["avg_sentence_length"] = sentence_structure["length_preference"] * 3  # Scale to match basic analysis
-        if "complexity_preference" in sentence_structure:
-            standardized["sentence_complexity"] = sentence_structure["complexity_preference"]
-    elif "avg_sentence_length" in api_results:
-        standardized["avg_sentence_length"] = api_results["avg_sentence_length"]
-    if "sentence_complexity" in api_results:
-        standardized["sentence_complexity"] = api_results["sentence_complexity"]
-
-    # Print the standardized results for debugging
-    print("\nStandardized API results:")
-    import json
-    print(json.dumps(standardized, indent=2))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Preferred terms: {[term for term, _ in standardized['common_vocabulary'][:10]]}")
+        logger.debug(f"Avoided terms: {standardized.get('avoided_terms', [])[:10]}")
+        logger.debug(f"Standardized API results: {dumps(standardized)}")
 
     return standardized
 
 def basic_analyze_text(text):
     """Basic text analysis using NLTK (fallback method)"""
-    # Tokenize text
-    sentences = sent_tokenize(text)
-    words = word_tokenize(text.lower())
-
-    # Remove stopwords
-    stop_words = set(stopwords.words('english'))
-    filtered_words = [word for word in words if word.isalnum() and word not in stop_words]
+    # Tokenize text once; every metric below reads from the same document
+    document = AnalyzedDocument(text)
 
     # Calculate basic metrics
-    avg_sentence_length = sum(len(word_tokenize(sentence)) for sentence in sentences) / len(sentences) if sentences else 0
+    avg_sentence_length = document.avg_sentence_length()
 
-    # Analyze personality traits
-    personality_matches = {}
-    for trait, keywords in PERSONALITY_TRAITS.items():
-        matches = sum(1 for word in filtered_words if word in keywords)
-        for keyword in keywords:
-            matches += sum(1 for sentence in sentences if keyword in sentence.lower())
-        personality_matches[trait] = matches
+    # Count trait, tone and formality keywords (whole words only) in one pass
+    occurrences, sentence_hits = LEXICON_MATCHER.count(document.sentences())
+
+    # Analyze personality traits: each occurrence counts, plus each sentence a keyword appears in
+    personality_matches = {trait: occurrences["personality_traits"][trait] + sentence_hits["personality_traits"][trait]
+                           for trait in PERSONALITY_TRAITS}
 
     # Analyze emotional tone
-    emotion_matches = {}
-    for emotion, keywords in EMOTIONAL_TONES.items():
-        matches = sum(1 for word in filtered_words if word in keywords)
-        for keyword in keywords:
-            matches += sum(1 for sentence in sentences if keyword in sentence.lower())
-        emotion_matches[emotion] = matches
+    emotion_matches = {emotion: occurrences["emotional_tone"][emotion] + sentence_hits["emotional_tone"][emotion]
+                       for emotion in EMOTIONAL_TONES}
 
     # Analyze formality
-    formality_indicators = {
-        "formal": ["therefore", "consequently", "furthermore", "moreover", "thus", "hence", "regarding",
-                  "concerning", "accordingly", "subsequently"],
-        "informal": ["anyway", "basically", "actually", "so", "well", "you know", "kind of", "sort of",
-                    "like", "stuff", "thing"]
-    }
-
-    formal_count = sum(text.lower().count(word) for word in formality_indicators["formal"])
-    informal_count = sum(text.lower().count(word) for word in formality_indicators["informal"])
+    formal_count = occurrences["formality"]["formal"]
+    informal_count = occurrences["formality"]["informal"]
 
     formality_score = 5  # Default middle value
     if formal_count + informal_count > 0:
         formality_score = min(10, max(1, int(10 * formal_count / (formal_count + informal_count))))
 
-    # Get most common words for vocabulary analysis
-    word_freq = FreqDist(filtered_words)
+    # Get most common words for vocabulary analysis (counted in fixed memory)
+    word_freq = document.vocabulary()
     common_words = word_freq.most_common(50)
 
     # Analyze sentence structure
-    sentence_lengths = [len(word_tokenize(sentence)) for sentence in sentences]
+    sentence_lengths = document.sentence_lengths()
     short_sentences = sum(1 for length in sentence_lengths if length < 10)
     medium_sentences = sum(1 for length in sentence_lengths if 10 <= length < 20)
     long_sentences = sum(1 for length in sentence_lengths if length >= 20)
@@ -364,7 +281,7 @@ def update_brand_parameters(brand_parameters, analysis_results):
 
     return brand_parameters
 
-def generate_brand_voice_summary(brand_parameters, analysis_results=None, input_methods=None):
+def generate_brand_voice_summary(brand_parameters, analysis_results=None, input_methods=None, generate_assets=True):
     """
     Generate a comprehensive brand voice summary with:
     1. Tone description in prose
@@ -374,6 +291,10 @@ def generate_brand_voice_summary(brand_parameters, analysis_results=None, input_
 
     Each section is supported by specific examples from the brand's material
     or derived from analysis data if no formal brand guide was provided.
+
+    With generate_assets=False the tone of voice prompt and campaign taglines
+    are left empty and the summary is marked "assets_pending", for pages that
+    stream them from /api/assets/stream instead of waiting for them.
     """
     summary = {}
 
@@ -854,6 +775,22 @@ def generate_brand_voice_summary(brand_parameters, analysis_results=None, input_
     else:
         summary["source_info"] = "This summary is based on the provided brand parameters."
 
+    # Reuse the assets generated together with the analysis (fused mode), unless
+    # other input methods have since contributed to the brand parameters
+    fused_assets = (analysis_results or {}).get("tone_of_voice_assets")
+    used_method_count = sum(1 for data in (input_methods or {}).values() if data.get('used', False))
+    if fused_assets and used_method_count <= 1:
+        summary["tone_of_voice_prompt"] = fused_assets.get("tone_of_voice_prompt", "")
+        summary["campaign_taglines"] = fused_assets.get("campaign_taglines", [])
+        logger.info("Using the tone of voice assets generated with the analysis")
+        return summary
+
+    if not generate_assets:
+        summary["tone_of_voice_prompt"] = ""
+        summary["campaign_taglines"] = []
+        summary["assets_pending"] = True
+        return summary
+
     # Generate tone of voice prompt and campaign taglines using API
     try:
         # Check if API key is set
@@ -861,8 +798,8 @@ def generate_brand_voice_summary(brand_parameters, analysis_results=None, input_
             api_key = session['api_settings'].get('api_key', '')
 
             if api_key:
-                # Create API client
-                api_client = APIClient('openai', api_key)
+                # Get the shared API client
+                api_client = get_api_client('openai', api_key)
 
                 # Generate tone of voice assets
                 success, assets = api_client.generate_tone_of_voice_assets(summary)
@@ -885,3 +822,32 @@ def generate_brand_voice_summary(brand_parameters, analysis_results=None, input_
         summary["campaign_taglines"] = example_phrases[:2]
 
     return summary
+
+
+def complete_tone_of_voice_assets(summary):
+    """
+    Fill in the tone of voice prompt and campaign taglines of a summary built with
+    generate_assets=False. The assets streamed to the results page are in the
+    response cache by then, so this normally doesn't call the API again.
+
+    Args:
+        summary: The brand voice summary (updated in place)
+
+    Returns:
+        The summary
+    """
+    if not summary.get("assets_pending"):
+        return summary
+
+    api_key = session.get('api_settings', {}).get('api_key', '')
+    if not api_key:
+        return summary
+
+    success, assets = get_api_client('openai', api_key).generate_tone_of_voice_assets(summary)
+    if success:
+        summary["tone_of_voice_prompt"] = assets.get("tone_of_voice_prompt", "")
+        summary["campaign_taglines"] = assets.get("campaign_taglines", [])
+        summary.pop("assets_pending", None)
+    else:
+        logger.error(f"Failed to generate tone of voice assets: {assets.get('error', 'Unknown error')}")
+    return summary
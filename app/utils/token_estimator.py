@@ -0,0 +1,297 @@
+"""
+Local token estimation and prompt budgeting.
+This module estimates prompt and completion tokens without any network call,
+using the same pre-tokenization rules as the GPT BPE tokenizers, trims
+low-value text to fit a budget, and records estimated versus actual usage.
+"""
+
+import os
+import re
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Budget settings (overridable via environment variables)
+PROMPT_TOKEN_BUDGET = int(os.environ.get('API_PROMPT_TOKEN_BUDGET', 60000))
+EXPECTED_COMPLETION_TOKENS = int(os.environ.get('API_EXPECTED_COMPLETION_TOKENS', 1500))
+# What to do with over-budget text: 'chunk' (analyze in chunks) or 'trim' (drop low-value text)
+BUDGET_POLICY = os.environ.get('API_BUDGET_POLICY', 'chunk').lower()
+
+# Pre-tokenizer pattern modelled on the cl100k/o200k split: contractions, words with an
+# optional leading space, 1-3 digit number groups, punctuation runs and whitespace
+_PRETOKEN_PATTERN = re.compile(
+    r"""'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+""",
+    re.IGNORECASE
+)
+
+# Per-message overhead of the chat formats (role markers and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+REQUEST_OVERHEAD_TOKENS = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many tokens a BPE tokenizer will produce for a piece of text.
+
+    Common short words are a single token; longer words split into roughly one
+    token per five characters; non-ASCII text costs about a token per character.
+
+    Args:
+        text: The text to estimate
+
+    Returns:
+        The estimated token count
+    """
+    if not text:
+        return 0
+
+    tokens = 0
+    for piece in _PRETOKEN_PATTERN.findall(text):
+        word = piece.lstrip(' ')
+        if not word:
+            tokens += 1
+        elif word[0].isalpha():
+            if word.isascii():
+                tokens += 1 + (len(word) - 1) // 5
+            else:
+                tokens += max(1, len(word))
+        elif word.isspace():
+            tokens += 1
+        elif word.isdigit():
+            tokens += 1
+        else:
+            tokens += (len(word) + 1) // 2
+    return tokens
+
+
+def estimate_request(system_prompt: str, user_prompt: str,
+                     completion_tokens: int = EXPECTED_COMPLETION_TOKENS) -> Dict[str, int]:
+    """
+    Estimate the prompt and completion tokens of a chat request.
+
+    Args:
+        system_prompt: The system prompt (may be empty)
+        user_prompt: The full user prompt, including the document text
+        completion_tokens: The expected completion size
+
+    Returns:
+        Dictionary with prompt_tokens, completion_tokens and total_tokens
+    """
+    prompt_tokens = REQUEST_OVERHEAD_TOKENS
+    for content in (system_prompt, user_prompt):
+        if content:
+            prompt_tokens += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def estimate_payload(payload: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Estimate the tokens of a provider request payload.
+
+    Handles chat payloads (messages plus an optional system prompt), prompt
+    payloads (Cohere) and plain text payloads (custom providers).
+
+    Args:
+        payload: The JSON request payload
+
+    Returns:
+        Dictionary with prompt_tokens, completion_tokens and total_tokens
+    """
+    system_prompt = payload.get('system') or ''
+    if not isinstance(system_prompt, str):
+        system_prompt = ' '.join(block.get('text', '') for block in system_prompt if isinstance(block, dict))
+
+    prompt_tokens = REQUEST_OVERHEAD_TOKENS
+    if system_prompt:
+        prompt_tokens += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(system_prompt)
+    for message in payload.get('messages') or []:
+        content = message.get('content', '')
+        if not isinstance(content, str):
+            content = ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+        prompt_tokens += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content)
+    for field in ('prompt', 'text'):
+        if isinstance(payload.get(field), str):
+            prompt_tokens += estimate_tokens(payload[field])
+
+    max_tokens = int(payload.get('max_tokens', 0) or 0)
+    completion_tokens = min(max_tokens, EXPECTED_COMPLETION_TOKENS) if max_tokens else EXPECTED_COMPLETION_TOKENS
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def trim_to_budget(text: str, max_tokens: int) -> str:
+    """
+    Trim low-value text until it fits a token budget.
+
+    Repeated lines (navigation, footers and boilerplate repeated across scraped
+    pages) and runs of blank space are removed first; if that isn't enough the
+    text is cut at the last line or sentence boundary within the budget.
+
+    Args:
+        text: The text to trim
+        max_tokens: The token budget for the text
+
+    Returns:
+        The trimmed text
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # Drop repeated lines and collapse blank space
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        stripped = ' '.join(line.split())
+        if not stripped:
+            continue
+        key = stripped.lower()
+        if key in seen and len(stripped.split()) > 2:
+            continue
+        seen.add(key)
+        lines.append(stripped)
+    text = '\n'.join(lines)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # Keep whole lines (or sentences of a very long line) up to the budget
+    kept = []
+    used = 0
+    for line in lines:
+        line_tokens = estimate_tokens(line) + 1
+        if used + line_tokens > max_tokens:
+            for sentence in re.split(r'(?<=[.!?])\s+', line):
+                sentence_tokens = estimate_tokens(sentence) + 1
+                if used + sentence_tokens > max_tokens:
+                    break
+                kept.append(sentence)
+                used += sentence_tokens
+            break
+        kept.append(line)
+        used += line_tokens
+    return '\n'.join(kept)
+
+
+def extract_usage(api_provider: str, result: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """
+    Extract token usage from a provider response.
+
+    Args:
+        api_provider: The API provider name
+        result: The decoded response body
+
+    Returns:
+        Dictionary with prompt_tokens (including cached tokens), completion_tokens,
+        cached_tokens (prompt tokens read from the provider's prompt cache) and
+        cache_write_tokens (prompt tokens written to it), or None if the response has no usage
+    """
+    if not isinstance(result, dict):
+        return None
+    if api_provider == 'cohere':
+        usage = (result.get('meta') or {}).get('billed_units') or {}
+    else:
+        usage = result.get('usage') or {}
+    if not isinstance(usage, dict) or not usage:
+        return None
+
+    prompt_tokens = usage.get('prompt_tokens', usage.get('input_tokens'))
+    completion_tokens = usage.get('completion_tokens', usage.get('output_tokens'))
+    if prompt_tokens is None and completion_tokens is None:
+        return None
+
+    # OpenAI counts cached tokens inside prompt_tokens; Anthropic reports them separately
+    cached_tokens = int((usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0)
+    cache_write_tokens = int(usage.get('cache_creation_input_tokens') or 0)
+    if 'cache_read_input_tokens' in usage or cache_write_tokens:
+        cached_tokens = int(usage.get('cache_read_input_tokens') or 0)
+        prompt_tokens = int(prompt_tokens or 0) + cached_tokens + cache_write_tokens
+    return {
+        "prompt_tokens": int(prompt_tokens or 0),
+        "completion_tokens": int(completion_tokens or 0),
+        "cached_tokens": cached_tokens,
+        "cache_write_tokens": cache_write_tokens
+    }
+
+
+class UsageTracker:
+    """Records estimated versus actual token usage to show how accurate the estimates are."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "requests_with_usage": 0,
+            "estimated_prompt_tokens": 0,
+            "actual_prompt_tokens": 0,
+            "estimated_completion_tokens": 0,
+            "actual_completion_tokens": 0,
+            "trimmed_requests": 0,
+            "chunked_requests": 0,
+            "cached_prompt_tokens": 0,
+            "cache_write_tokens": 0,
+            "requests_with_cache_hits": 0
+        }
+
+    def record(self, estimate: Dict[str, int], actual: Optional[Dict[str, int]]):
+        """
+        Record a request's estimate and (if the provider reported it) actual usage.
+
+        Args:
+            estimate: The estimate from estimate_request()
+            actual: The usage from extract_usage(), or None
+        """
+        with self._lock:
+            self._stats["requests"] += 1
+            if actual is None:
+                return
+            self._stats["requests_with_usage"] += 1
+            self._stats["estimated_prompt_tokens"] += estimate["prompt_tokens"]
+            self._stats["actual_prompt_tokens"] += actual["prompt_tokens"]
+            self._stats["estimated_completion_tokens"] += estimate["completion_tokens"]
+            self._stats["actual_completion_tokens"] += actual["completion_tokens"]
+            self._stats["cached_prompt_tokens"] += actual.get("cached_tokens", 0)
+            self._stats["cache_write_tokens"] += actual.get("cache_write_tokens", 0)
+            if actual.get("cached_tokens"):
+                self._stats["requests_with_cache_hits"] += 1
+        logger.info(f"Token usage: estimated {estimate['prompt_tokens']} prompt / "
+                    f"{estimate['completion_tokens']} completion, actual {actual['prompt_tokens']} prompt "
+                    f"({actual.get('cached_tokens', 0)} cached) / {actual['completion_tokens']} completion")
+
+    def record_budget_action(self, action: str):
+        """Count a request that was trimmed or chunked to fit the budget."""
+        with self._lock:
+            self._stats[f"{action}_requests"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get usage counters.
+
+        Returns:
+            Dictionary with estimated and actual token totals, their ratios, and the
+            share of actual prompt tokens served from the provider's prompt cache
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        for kind in ("prompt", "completion"):
+            estimated = stats[f"estimated_{kind}_tokens"]
+            stats[f"{kind}_actual_to_estimate_ratio"] = (
+                round(stats[f"actual_{kind}_tokens"] / estimated, 4) if estimated else None
+            )
+        actual_prompt = stats["actual_prompt_tokens"]
+        stats["prompt_cache_hit_ratio"] = round(stats["cached_prompt_tokens"] / actual_prompt, 4) if actual_prompt else None
+        return stats
+
+
+# Create a process-wide instance for use throughout the application
+usage_tracker = UsageTracker()
@@ -0,0 +1,286 @@
+"""
+Opt-in capture of API request/response traces.
+This module keeps provider request/response pairs in a bounded in-memory ring
+buffer that a background thread flushes to rotating, gzip-compressed JSONL
+files, so traces can be inspected by request ID without adding file I/O to
+the analysis path.
+"""
+
+import os
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import time
+import uuid
+import threading
+import contextvars
+import logging
+from collections import deque, OrderedDict
+from typing import Dict, Any, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Trace settings (overridable via environment variables)
+TRACE_STORE_ENABLED = os.environ.get('TRACE_STORE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+TRACE_DIR = os.environ.get('TRACE_DIR', os.path.join('cache', 'traces'))
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', 1000))
+TRACE_FLUSH_INTERVAL = float(os.environ.get('TRACE_FLUSH_INTERVAL', 2))
+TRACE_MAX_FILE_BYTES = int(os.environ.get('TRACE_MAX_FILE_BYTES', 10 * 1024 * 1024))
+TRACE_MAX_FILES = int(os.environ.get('TRACE_MAX_FILES', 5))
+
+# Number of flushed request IDs remembered with the file they were written to
+TRACE_INDEX_SIZE = 10000
+
+# ID of the request currently being handled
+_current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+
+# Hashed session ID of the client that made the current request
+_current_owner: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('trace_owner', default=None)
+
+
+def get_request_id() -> Optional[str]:
+    """Get the ID of the request currently being handled, if any."""
+    return _current_request_id.get()
+
+
+def set_request_id(request_id: Optional[str] = None) -> str:
+    """
+    Set the ID of the request currently being handled.
+
+    Args:
+        request_id: The ID to use; a new one is generated if not given
+
+    Returns:
+        The request ID
+    """
+    request_id = request_id or uuid.uuid4().hex
+    _current_request_id.set(request_id)
+    return request_id
+
+
+def owner_id(session_id: Optional[str]) -> Optional[str]:
+    """Hash a session ID so traces never store the session ID itself."""
+    return hashlib.sha256(session_id.encode('utf-8')).hexdigest() if session_id else None
+
+
+def set_trace_owner(session_id: Optional[str] = None):
+    """
+    Set the session the current request's traces belong to.
+
+    Args:
+        session_id: The session ID (stored hashed); traces without one can't be fetched
+    """
+    _current_owner.set(owner_id(session_id))
+
+
+class TraceStore:
+    """Bounded in-memory trace buffer with a background, rotating, compressed on-disk log."""
+
+    def __init__(self, directory: str = TRACE_DIR, buffer_size: int = TRACE_BUFFER_SIZE,
+                 flush_interval: float = TRACE_FLUSH_INTERVAL, max_file_bytes: int = TRACE_MAX_FILE_BYTES,
+                 max_files: int = TRACE_MAX_FILES, enabled: bool = TRACE_STORE_ENABLED):
+        """
+        Initialize the trace store.
+
+        Args:
+            directory: Directory for the trace log files
+            buffer_size: Maximum traces held in memory before the oldest unflushed ones are dropped
+            flush_interval: Seconds between background flushes
+            max_file_bytes: Size at which the current log file is rotated
+            max_files: Number of log files kept; older ones are deleted
+            enabled: Whether traces are captured at all
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.enabled = enabled
+        self._buffer = deque(maxlen=buffer_size)
+        self._recent = deque(maxlen=buffer_size)
+        self._index: "OrderedDict[str, str]" = OrderedDict()
+        self._index_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._current_file: Optional[str] = None
+        self._stats = {"captured": 0, "dropped": 0, "flushed": 0}
+
+    def record(self, kind: str, provider: str, request: Any, response: Any,
+               status_code: Optional[int] = None, latency: Optional[Dict[str, float]] = None):
+        """
+        Capture a request/response pair. Never blocks on I/O; if the buffer is
+        full the oldest unflushed trace is dropped.
+
+        Args:
+            kind: What the request was for (e.g. 'analysis', 'assets')
+            provider: The API provider
+            request: The request payload
+            response: The decoded response body (or response text)
+            status_code: The response status code
+            latency: Optional latency breakdown of the request
+        """
+        if not self.enabled:
+            return
+        trace = {
+            "request_id": get_request_id() or uuid.uuid4().hex,
+            "owner": _current_owner.get(),
+            "timestamp": time.time(),
+            "kind": kind,
+            "provider": provider,
+            "status_code": status_code,
+            "request": request,
+            "response": response,
+            "latency": latency
+        }
+        if len(self._buffer) == self._buffer.maxlen:
+            self._stats["dropped"] += 1
+        self._buffer.append(trace)
+        self._recent.append(trace)
+        self._stats["captured"] += 1
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        """Start the background flush thread on first use."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    # Write whatever is still buffered when the process exits
+                    atexit.register(self.flush)
+                self._thread = threading.Thread(target=self._run, name='trace-store-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Flush the buffer periodically."""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing traces: {str(e)}")
+
+    def flush(self):
+        """Write buffered traces to the current log file, rotating it when it gets too large."""
+        with self._flush_lock:
+            traces = []
+            while self._buffer:
+                try:
+                    traces.append(self._buffer.popleft())
+                except IndexError:
+                    break
+            if not traces:
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            if self._current_file is None or not os.path.exists(self._current_file) or \
+                    os.path.getsize(self._current_file) >= self.max_file_bytes:
+                self._rotate()
+
+            lines = ''.join(json.dumps(trace, default=str) + '\n' for trace in traces)
+            # Each flush appends a gzip member; concatenated members read back as one stream
+            with gzip.open(self._current_file, 'at', encoding='utf-8') as f:
+                f.write(lines)
+
+            with self._index_lock:
+                for trace in traces:
+                    self._index[trace["request_id"]] = self._current_file
+                    self._index.move_to_end(trace["request_id"])
+                while len(self._index) > TRACE_INDEX_SIZE:
+                    self._index.popitem(last=False)
+            self._stats["flushed"] += len(traces)
+
+    def _rotate(self):
+        """Start a new log file and delete the oldest files beyond max_files."""
+        self._current_file = os.path.join(self.directory, f"traces-{time.strftime('%Y%m%d-%H%M%S')}-"
+                                                          f"{uuid.uuid4().hex[:8]}.jsonl.gz")
+        files = self._log_files()
+        for old_file in files[:max(0, len(files) - self.max_files + 1)]:
+            try:
+                os.remove(old_file)
+            except OSError as e:
+                logger.error(f"Error removing old trace file {old_file}: {str(e)}")
+
+    def _log_files(self) -> List[str]:
+        """Trace log files, oldest first."""
+        return sorted(glob.glob(os.path.join(self.directory, 'traces-*.jsonl.gz')), key=os.path.getmtime)
+
+    def get(self, request_id: str, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the traces captured for a request ID, from memory or the on-disk log.
+
+        Args:
+            request_id: The request ID
+            session_id: The session asking; only traces recorded for this session are returned
+
+        Returns:
+            List of traces, oldest first (empty if none were found)
+        """
+        owner = owner_id(session_id)
+        if owner is None:
+            return []
+
+        traces = [trace for trace in list(self._recent) if trace["request_id"] == request_id]
+        if traces:
+            return [trace for trace in traces if trace.get("owner") == owner]
+
+        with self._index_lock:
+            indexed_file = self._index.get(request_id)
+        files = [indexed_file] if indexed_file else list(reversed(self._log_files()))
+        for path in files:
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    traces = [trace for trace in map(json.loads, f) if trace.get("request_id") == request_id]
+            except (OSError, EOFError, ValueError) as e:
+                logger.error(f"Error reading trace file {path}: {str(e)}")
+                continue
+            if traces:
+                return [trace for trace in traces if trace.get("owner") == owner]
+        return []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get trace capture counters.
+
+        Returns:
+            Dictionary with captured, dropped and flushed trace counts and the buffered count
+        """
+        stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["buffered"] = len(self._buffer)
+        return stats
+
+
+# Create a process-wide instance for use throughout the application
+trace_store = TraceStore()
+
+
+def init_app(app):
+    """
+    Give every request of a Flask app a server-generated ID, tie its traces to
+    the caller's session, and return the ID in the X-Request-ID response header.
+    Client-supplied X-Request-ID headers are ignored so one client can't file
+    traces under, or guess, another client's request ID.
+
+    Args:
+        app: The Flask application
+    """
+    from flask import session
+
+    @app.before_request
+    def _assign_request_id():
+        set_request_id()
+        set_trace_owner(getattr(session, 'sid', None))
+
+    @app.after_request
+    def _add_request_id_header(response):
+        request_id = get_request_id()
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response
@@ -0,0 +1,343 @@
+"""
+Opt-in usage and latency ledger for AI API calls.
+This module appends one row per provider call (and per response cache hit)
+to a local SQLite ledger: provider, model, token usage, latency, retries and
+whether the cache answered, attributed to the session, input method and API
+key that caused it. Rows are buffered in memory and written by a background
+thread, so recording a call adds no database I/O to the request path.
+Aggregate reports are available from the /api/usage endpoint and from the
+command line:
+
+    python -m app.utils.usage_ledger --group-by input_method,model --since-hours 24
+"""
+
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import json
+import argparse
+import threading
+import contextvars
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from app.utils.trace_store import get_request_id
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Ledger settings (overridable via environment variables)
+USAGE_LEDGER_ENABLED = os.environ.get('USAGE_LEDGER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+USAGE_LEDGER_PATH = os.environ.get(
+    'USAGE_LEDGER_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'cache', 'usage_ledger.sqlite3')
+)
+USAGE_LEDGER_BUFFER_SIZE = int(os.environ.get('USAGE_LEDGER_BUFFER_SIZE', 10000))
+USAGE_LEDGER_FLUSH_INTERVAL = float(os.environ.get('USAGE_LEDGER_FLUSH_INTERVAL', 2))
+
+# Columns a report can be grouped by ('day' is derived from the timestamp)
+GROUP_COLUMNS = {
+    'session_id': 'session_id',
+    'input_method': 'input_method',
+    'api_key_id': 'api_key_id',
+    'provider': 'provider',
+    'model': 'model',
+    'kind': 'kind',
+    'day': "date(ts, 'unixepoch')"
+}
+
+# Flask endpoints (or blueprints) and the input method their API calls are attributed to
+INPUT_METHOD_ENDPOINTS = {
+    'document_upload': 'document_upload',
+    'brand_interview': 'brand_interview',
+    'web_scraper_bp': 'web_scraper',
+    'web_scraper': 'web_scraper'
+}
+
+# Session and input method the current request's API calls are attributed to
+_current_attribution: contextvars.ContextVar[Tuple[Optional[str], Optional[str]]] = contextvars.ContextVar(
+    'usage_attribution', default=(None, None))
+
+
+def key_id(secret: str) -> str:
+    """Hash an API key or session ID so the ledger never stores the secret itself."""
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()[:16]
+
+
+def set_attribution(session_id: Optional[str] = None, input_method: Optional[str] = None):
+    """
+    Set the session and input method the current request's API calls are attributed to.
+
+    Args:
+        session_id: The session ID (stored hashed)
+        input_method: The input method or page that made the calls
+    """
+    _current_attribution.set((key_id(session_id) if session_id else None, input_method))
+
+
+class UsageLedger:
+    """Append-only SQLite ledger of API calls, written in the background."""
+
+    def __init__(self, path: str = USAGE_LEDGER_PATH, enabled: bool = USAGE_LEDGER_ENABLED,
+                 buffer_size: int = USAGE_LEDGER_BUFFER_SIZE, flush_interval: float = USAGE_LEDGER_FLUSH_INTERVAL):
+        """
+        Initialize the ledger.
+
+        Args:
+            path: Path of the SQLite file holding the ledger
+            enabled: Whether calls are recorded at all
+            buffer_size: Maximum rows held in memory before the oldest unwritten ones are dropped
+            flush_interval: Seconds between background writes
+        """
+        self.path = path
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self._conn = None
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=buffer_size)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stats = {"buffered": 0, "dropped": 0, "written": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite database on first use."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            # Appends from the request path shouldn't wait for a full fsync
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS calls ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, request_id TEXT, session_id TEXT, "
+                "input_method TEXT, api_key_id TEXT, kind TEXT NOT NULL, provider TEXT NOT NULL, model TEXT, "
+                "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, cached_tokens INTEGER NOT NULL, "
+                "cache_write_tokens INTEGER NOT NULL, latency_ms REAL NOT NULL, retries INTEGER NOT NULL, "
+                "cache_hit INTEGER NOT NULL, success INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS calls_ts ON calls (ts)")
+            self._conn.commit()
+        return self._conn
+
+    def record(self, kind: str, provider: str, model: Optional[str], api_key: str,
+               usage: Optional[Dict[str, int]] = None, latency: float = 0.0, retries: int = 0,
+               cache_hit: bool = False, success: bool = True):
+        """
+        Append a call to the ledger, attributed to the current request. Never
+        blocks on I/O; if the buffer is full the oldest unwritten row is dropped.
+
+        Args:
+            kind: What the call was for (e.g. 'analysis', 'assets')
+            provider: The API provider
+            model: The model the call was sent to
+            api_key: The API key used (stored hashed)
+            usage: Token usage from extract_usage(), or None if the provider didn't report it
+            latency: Seconds the call took
+            retries: Number of retried attempts
+            cache_hit: Whether the response cache answered instead of the provider
+            success: Whether the call succeeded
+        """
+        if not self.enabled:
+            return
+        usage = usage or {}
+        session_id, input_method = _current_attribution.get()
+        row = (time.time(), get_request_id(), session_id, input_method, key_id(api_key) if api_key else None,
+               kind, provider, model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+               usage.get("cached_tokens", 0), usage.get("cache_write_tokens", 0), round(latency * 1000, 1),
+               retries, int(cache_hit), int(success))
+        if len(self._buffer) == self._buffer.maxlen:
+            self._stats["dropped"] += 1
+        self._buffer.append(row)
+        self._stats["buffered"] += 1
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        """Start the background flush thread on first use."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    # Write whatever is still buffered when the process exits
+                    atexit.register(self.flush)
+                self._thread = threading.Thread(target=self._run, name='usage-ledger-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Flush the buffer periodically."""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing the usage ledger: {str(e)}")
+
+    def flush(self):
+        """Write the buffered rows to the ledger in one transaction."""
+        with self._lock:
+            rows = []
+            while self._buffer:
+                try:
+                    rows.append(self._buffer.popleft())
+                except IndexError:
+                    break
+            if not rows:
+                return
+            try:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT INTO calls (ts, request_id, session_id, input_method, api_key_id, kind, provider, model, "
+                    "prompt_tokens, completion_tokens, cached_tokens, cache_write_tokens, latency_ms, retries, "
+                    "cache_hit, success) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.commit()
+                self._stats["written"] += len(rows)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to record {len(rows)} API usage row(s): {str(e)}")
+
+    def report(self, group_by: Sequence[str] = ('provider', 'model'), since: Optional[float] = None,
+               session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregate the ledger, including the rows still buffered.
+
+        Args:
+            group_by: Columns to group by (see GROUP_COLUMNS)
+            since: Only include calls after this Unix timestamp
+            session_id: Only include calls of this session (the raw session ID; it is hashed)
+
+        Returns:
+            One dictionary per group with call, cache hit, error and retry counts,
+            token totals, per-call averages and latency statistics
+
+        Raises:
+            ValueError: If a group column is unknown
+        """
+        unknown = [column for column in group_by if column not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown group column(s): {', '.join(unknown)}. "
+                             f"Choose from: {', '.join(GROUP_COLUMNS)}")
+
+        columns = [f"{GROUP_COLUMNS[column]} AS {column}" for column in group_by]
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since)
+        if session_id:
+            conditions.append("session_id = ?")
+            params.append(key_id(session_id))
+        query = (
+            "SELECT " + ", ".join(columns + [
+                "COUNT(*) AS calls", "SUM(cache_hit) AS cache_hits", "SUM(1 - success) AS errors",
+                "SUM(retries) AS retries", "SUM(prompt_tokens) AS prompt_tokens",
+                "SUM(completion_tokens) AS completion_tokens", "SUM(cached_tokens) AS cached_tokens",
+                "SUM(cache_write_tokens) AS cache_write_tokens",
+                "SUM(CASE WHEN cache_hit = 0 THEN latency_ms ELSE 0 END) AS upstream_ms",
+                "AVG(CASE WHEN cache_hit = 0 THEN latency_ms END) AS avg_upstream_ms",
+                "MAX(latency_ms) AS max_latency_ms", "MIN(ts) AS first_call", "MAX(ts) AS last_call"]) +
+            " FROM calls" + (" WHERE " + " AND ".join(conditions) if conditions else "") +
+            (" GROUP BY " + ", ".join(group_by) + " ORDER BY " + ", ".join(group_by) if group_by else "")
+        )
+        self.flush()
+        with self._lock:
+            cursor = self._connect().execute(query, params)
+            names = [description[0] for description in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+
+        report = []
+        for row in rows:
+            if not row["calls"]:
+                continue
+            upstream_calls = row["calls"] - row["cache_hits"]
+            row["avg_upstream_ms"] = round(row["avg_upstream_ms"] or 0.0, 1)
+            row["upstream_ms"] = round(row["upstream_ms"] or 0.0, 1)
+            row["avg_prompt_tokens"] = round(row["prompt_tokens"] / upstream_calls, 1) if upstream_calls else 0.0
+            row["avg_completion_tokens"] = (round(row["completion_tokens"] / upstream_calls, 1)
+                                            if upstream_calls else 0.0)
+            row["cache_hit_ratio"] = round(row["cache_hits"] / row["calls"], 3)
+            hours = max((row.pop("last_call") - row.pop("first_call")) / 3600.0, 1 / 60.0)
+            row["calls_per_hour"] = round(row["calls"] / hours, 1)
+            report.append(row)
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get ledger totals.
+
+        Returns:
+            Dictionary with whether the ledger is enabled, the all-time totals and
+            the buffered, dropped and written row counts
+        """
+        if not self.enabled:
+            return {"enabled": False}
+        totals = self.report(group_by=())
+        return dict(totals[0] if totals else {"calls": 0}, enabled=True, **self._stats)
+
+    def close(self):
+        """Write the buffered rows and close the database connection."""
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Create a process-wide instance for use throughout the application
+usage_ledger = UsageLedger()
+
+
+def init_app(app):
+    """
+    Attribute the API calls of every request of a Flask app to its session and input method.
+
+    Args:
+        app: The Flask application
+    """
+    from flask import request, session
+
+    @app.before_request
+    def _assign_attribution():
+        endpoint = request.endpoint or ''
+        input_method = INPUT_METHOD_ENDPOINTS.get(request.blueprint or endpoint, endpoint or None)
+        # Server-side sessions (Flask-Session) have an ID; cookie sessions don't
+        set_attribution(getattr(session, 'sid', None), input_method)
+
+
+def main():
+    """Print a usage report from the command line."""
+    parser = argparse.ArgumentParser(description="Aggregate the API usage ledger for capacity planning")
+    parser.add_argument('--path', default=USAGE_LEDGER_PATH, help="Path of the ledger database")
+    parser.add_argument('--group-by', default='provider,model',
+                        help=f"Comma-separated columns to group by ({', '.join(GROUP_COLUMNS)})")
+    parser.add_argument('--since-hours', type=float, default=None, help="Only include calls from the last N hours")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    group_by = [column.strip() for column in args.group_by.split(',') if column.strip()]
+    since = time.time() - args.since_hours * 3600 if args.since_hours is not None else None
+    try:
+        report = UsageLedger(args.path).report(group_by, since)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    headers = group_by + ['calls', 'cache_hit_ratio', 'errors', 'retries', 'prompt_tokens', 'completion_tokens',
+                          'cached_tokens', 'avg_upstream_ms', 'calls_per_hour']
+    table = [[str(row.get(header) if row.get(header) is not None else '-') for header in headers] for row in report]
+    widths = [max([len(header)] + [len(cells[i]) for cells in table]) for i, header in enumerate(headers)]
+    print('  '.join(header.ljust(width) for header, width in zip(headers, widths)))
+    for cells in table:
+        print('  '.join(cell.ljust(width) for cell, width in zip(cells, widths)))
+    if not table:
+        print("No API calls recorded")
+
+
+if __name__ == '__main__':
+    main()
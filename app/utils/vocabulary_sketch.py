@@ -0,0 +1,173 @@
+"""
+Heavy-hitter vocabulary sketch.
+This module tracks the most frequent words of a stream in fixed memory with
+the Space-Saving algorithm: at most `capacity` words are counted, and a new
+word replaces the least frequent one, inheriting its count as the error.
+Every reported count overestimates the true count by at most `error_bound`,
+and every word occurring more than total/capacity times is guaranteed to be
+tracked. Sketches built over separate parts of a corpus can be merged.
+"""
+
+import os
+import heapq
+import logging
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, List, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Number of words a sketch counts (overridable via environment variables)
+VOCABULARY_SKETCH_SIZE = int(os.environ.get('VOCABULARY_SKETCH_SIZE', 2000))
+
+# Number of words update() aggregates at a time, which bounds its memory use
+UPDATE_BLOCK_SIZE = 4096
+
+
+class SpaceSavingSketch:
+    """Approximate word counts for the most frequent words of a stream, in fixed memory."""
+
+    def __init__(self, capacity: int = VOCABULARY_SKETCH_SIZE):
+        """
+        Initialize the sketch.
+
+        Args:
+            capacity: Maximum number of words counted at once
+        """
+        if capacity < 1:
+            raise ValueError("Sketch capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        # Word -> [count, error, sequence]; dict order is insertion order, which breaks count ties
+        self._entries: Dict[str, List[int]] = {}
+        # Min-heap of (count, sequence, word); counts are only raised, so stale entries are fixed up lazily
+        self._heap: List[Tuple[int, int, str]] = []
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._entries
+
+    def _insert(self, word: str, count: int, error: int):
+        self._sequence += 1
+        self._entries[word] = [count, error, self._sequence]
+        heapq.heappush(self._heap, (count, self._sequence, word))
+
+    def _pop_minimum(self) -> int:
+        """Remove the least frequent word and return its count."""
+        while True:
+            count, sequence, word = heapq.heappop(self._heap)
+            entry = self._entries.get(word)
+            if entry is None or entry[2] != sequence:
+                continue
+            if entry[0] == count:
+                del self._entries[word]
+                return count
+            heapq.heappush(self._heap, (entry[0], sequence, word))
+
+    def add(self, word: str, count: int = 1):
+        """
+        Count occurrences of a word.
+
+        Args:
+            word: The word
+            count: Number of occurrences
+        """
+        self.total += count
+        entry = self._entries.get(word)
+        if entry is not None:
+            entry[0] += count
+        elif len(self._entries) < self.capacity:
+            self._insert(word, count, 0)
+        else:
+            minimum = self._pop_minimum()
+            self._insert(word, minimum + count, minimum)
+
+    def update(self, words: Iterable[str]):
+        """
+        Count a sequence of words. The words are read in blocks of
+        UPDATE_BLOCK_SIZE, and each block is aggregated and added in order of
+        first occurrence, so memory stays fixed however long the sequence is.
+
+        Args:
+            words: The words (any iterable, e.g. a generator over a stream)
+        """
+        words = iter(words)
+        while True:
+            block = Counter(islice(words, UPDATE_BLOCK_SIZE))
+            if not block:
+                return
+            for word, count in block.items():
+                self.add(word, count)
+
+    @property
+    def error_bound(self) -> int:
+        """Largest amount any reported count can exceed the true count by."""
+        if len(self._entries) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self._entries.values())
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """
+        Get the most frequent words, ordered like FreqDist.most_common
+        (by count, ties in order of first occurrence).
+
+        Args:
+            n: Number of words
+
+        Returns:
+            List of (word, estimated count) tuples
+        """
+        top = heapq.nlargest(n, self._entries.items(), key=lambda item: item[1][0])
+        return [(word, entry[0]) for word, entry in top]
+
+    def guaranteed(self, n: int) -> List[Tuple[str, int]]:
+        """
+        Get the most frequent words whose count is certain to place them above
+        every word not tracked by the sketch.
+
+        Args:
+            n: Number of words to consider
+
+        Returns:
+            List of (word, minimum true count) tuples
+        """
+        bound = self.error_bound
+        return [(word, self._entries[word][0] - self._entries[word][1]) for word, _ in self.most_common(n)
+                if self._entries[word][0] - self._entries[word][1] > bound]
+
+    def merge(self, other: 'SpaceSavingSketch') -> 'SpaceSavingSketch':
+        """
+        Add the counts of another sketch (e.g. built by a parallel worker) to this one.
+
+        Words missing from a full sketch may have occurred up to its error bound
+        times there, so they are credited with that bound, which keeps the merged
+        counts upper bounds of the true counts.
+
+        Args:
+            other: The sketch to merge in
+
+        Returns:
+            This sketch
+        """
+        own_minimum, other_minimum = self.error_bound, other.error_bound
+        merged = {}
+        for word, (count, error, _) in self._entries.items():
+            other_count, other_error, _ = other._entries.get(word, (other_minimum, other_minimum, 0))
+            merged[word] = (count + other_count, error + other_error)
+        for word, (count, error, _) in other._entries.items():
+            if word not in merged:
+                merged[word] = (count + own_minimum, error + own_minimum)
+
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        kept_words = {word for word, _ in kept}
+        self._entries, self._heap, self._sequence = {}, [], 0
+        for word, (count, error) in merged.items():
+            if word in kept_words:
+                self._insert(word, count, error)
+        self.total += other.total
+        return self
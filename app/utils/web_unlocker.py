@@ -9,6 +9,8 @@ import logging
 import os
 from flask import current_app, session
 
+from app.utils.deadline import deadline_timeout
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -70,7 +72,7 @@ class WebUnlocker:
                 self.api_endpoint,
                 headers=headers,
                 json=payload,
-                timeout=60  # Longer timeout for complex pages
+                timeout=deadline_timeout(60)  # Longer timeout for complex pages, within the request's deadline
             )
 
             logger.info(f"Web Unlocker API response status code: {response.status_code}")
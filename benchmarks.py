@@ -0,0 +1,326 @@
+"""
+Microbenchmarks for the analysis pipeline.
+
+Run a benchmark with:
+    python benchmarks.py json-decode --iterations 2000
+    python benchmarks.py fused-analysis --documents 10 --latency-ms 500
+    python benchmarks.py assets-stream --requests 5 --latency-ms 8000
+    python benchmarks.py lexicon-match --chars 100000
+    python benchmarks.py batch-features --documents 200
+    python benchmarks.py vocabulary-sketch --sizes 50,100,200,2000
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from contextlib import redirect_stdout
+
+from app.utils.fast_json import loads, JSON_BACKEND
+from app.utils.analysis_schema import validate_analysis
+from app.utils.mock_llm_server import build_response, brand_voice_analysis, start_mock_server, MockConfig
+
+
+def _time(func, iterations):
+    """Run func the given number of times and return the mean time per call in microseconds."""
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _report(name, timings, unit='us/op'):
+    """Print benchmark timings, relative to the first (baseline) entry."""
+    baseline = next(iter(timings.values()))
+    print(name)
+    for label, value in timings.items():
+        print(f"  {label:<40} {value:10.1f} {unit}  {baseline / value:5.2f}x")
+
+
+def _legacy_standardize(api_results):
+    """The previous standardize_api_results: isinstance walk, default scores and printed output."""
+    standardized = {"personality_traits": {}, "emotional_tone": {}, "formality_score": 5, "common_vocabulary": [],
+                    "avg_sentence_length": 0, "sentence_complexity": 5,
+                    "original_api_response": api_results.copy(), "rich_descriptions": []}
+    style = api_results.get("communication_style", {})
+    if "rich_descriptions" in style:
+        standardized["rich_descriptions"] = style["rich_descriptions"]
+    for section in ("personality_traits", "emotional_tone"):
+        if isinstance(api_results.get(section), dict):
+            for name, value in api_results[section].items():
+                if isinstance(value, bool):
+                    standardized[section][name] = 10 if value else 0
+                elif isinstance(value, (int, float)):
+                    standardized[section][name] = int(value)
+                elif isinstance(value, str) and value.isdigit():
+                    standardized[section][name] = int(value)
+                else:
+                    standardized[section][name] = 8
+                    print(f"Warning: Non-numeric value '{value}' for '{name}' converted to 8")
+    if isinstance(api_results.get("formality"), dict) and "level" in api_results["formality"]:
+        standardized["formality_score"] = api_results["formality"]["level"]
+    vocabulary = api_results.get("vocabulary", {})
+    if isinstance(vocabulary.get("preferred_terms"), list):
+        standardized["common_vocabulary"] = [(term, max(1, 10 - i)) for i, term in
+                                             enumerate(vocabulary["preferred_terms"])]
+    if isinstance(vocabulary.get("avoided_terms"), list):
+        standardized["avoided_terms"] = vocabulary["avoided_terms"]
+    print("\nExtracted vocabulary:")
+    print(f"Preferred terms: {[term for term, _ in standardized['common_vocabulary'][:10]]}")
+    print(f"Avoided terms: {standardized.get('avoided_terms', [])[:10]}")
+    structure = style.get("sentence_structure", {})
+    if "length_preference" in structure:
+        standardized["avg_sentence_length"] = structure["length_preference"] * 3
+    if "complexity_preference" in structure:
+        standardized["sentence_complexity"] = structure["complexity_preference"]
+    print("\nStandardized API results:")
+    print(json.dumps(standardized, indent=2))
+    return standardized
+
+
+def bench_json_decode(args):
+    """Decode and standardize an OpenAI analysis response: previous path versus fast decode and schema validation."""
+    analysis = brand_voice_analysis("benchmark")
+    analysis["communication_style"]["rich_descriptions"] *= args.descriptions
+    body = build_response('/v1/chat/completions', {"messages": [{"role": "user", "content": "benchmark"}]})
+    body["choices"][0]["message"]["content"] = json.dumps(analysis)
+    content = json.dumps(body).encode('utf-8')
+    sink = io.StringIO()
+
+    def legacy():
+        envelope = json.loads(content.decode('utf-8'))
+        results = json.loads(envelope['choices'][0]['message']['content'])
+        with redirect_stdout(sink):
+            _legacy_standardize(results)
+        sink.seek(0)
+        sink.truncate()
+
+    def fast():
+        envelope = loads(content)
+        validate_analysis(loads(envelope['choices'][0]['message']['content'])).to_standardized()
+
+    _report(f"json-decode ({len(content)} byte response, JSON backend: {JSON_BACKEND})", {
+        "previous (json.loads x2, print)": _time(legacy, args.iterations),
+        "fast decode + compiled validator": _time(fast, args.iterations)
+    })
+
+
+def bench_fused_analysis(args):
+    """Analysis followed by a separate assets request versus one fused request, against the mock provider."""
+    server = start_mock_server(config=MockConfig(latency_ms=args.latency_ms, latency_sigma=0))
+    os.environ['OPENAI_API_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    # Measure round trips, not the client-side rate limit scheduler
+    os.environ.setdefault('RATE_LIMIT_RPM', '1000000')
+    os.environ.setdefault('RATE_LIMIT_TPM', '1000000000')
+    from app.utils.api_client import APIClient
+    client = APIClient('openai', 'benchmark')
+    documents = [f"We are bold, warm and direct. Document {i}." for i in range(args.documents)]
+
+    def separate():
+        for document in documents:
+            client.analyze_text(document, bypass_cache=True)
+            client.generate_tone_of_voice_assets({"tone_description": document}, bypass_cache=True)
+
+    def fused():
+        for document in documents:
+            client.analyze_text(document, bypass_cache=True, include_assets=True)
+
+    timings = {}
+    for label, func in (("analysis, then assets", separate), ("fused analysis + assets", fused)):
+        start = time.perf_counter()
+        func()
+        timings[label] = (time.perf_counter() - start) / len(documents) * 1000
+    server.shutdown()
+    _report(f"fused-analysis ({args.documents} documents, {args.latency_ms:g}ms mock latency)", timings, 'ms/doc')
+
+
+def bench_assets_stream(args):
+    """Time until the first tone of voice prompt text is available: blocking request versus streaming."""
+    server = start_mock_server(config=MockConfig(latency_ms=args.latency_ms, latency_sigma=0,
+                                                 first_token_ms=args.first_token_ms))
+    os.environ['OPENAI_API_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault('RATE_LIMIT_RPM', '1000000')
+    os.environ.setdefault('RATE_LIMIT_TPM', '1000000000')
+    from app.utils.api_client import APIClient
+    client = APIClient('openai', 'benchmark')
+    summaries = [{"tone_description": f"We are bold, warm and direct. Summary {i}."} for i in range(args.requests)]
+
+    first_text = {"blocking": [], "streaming": []}
+    complete = {"blocking": [], "streaming": []}
+    for summary in summaries:
+        start = time.perf_counter()
+        client.generate_tone_of_voice_assets(summary, bypass_cache=True)
+        first_text["blocking"].append(time.perf_counter() - start)
+        complete["blocking"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        first = None
+        for event, _ in client.stream_tone_of_voice_assets(summary, bypass_cache=True):
+            if first is None and event in ("delta", "assets"):
+                first = time.perf_counter() - start
+        first_text["streaming"].append(first)
+        complete["streaming"].append(time.perf_counter() - start)
+    server.shutdown()
+
+    title = f"assets-stream ({args.requests} requests, {args.latency_ms:g}ms mock latency, {args.first_token_ms:g}ms to first token)"
+    _report(f"{title}: time to first prompt text", {
+        label: sum(values) / len(values) * 1000 for label, values in first_text.items()}, 'ms')
+    _report(f"{title}: time to complete assets", {
+        label: sum(values) / len(values) * 1000 for label, values in complete.items()}, 'ms')
+
+
+def _scrape_text(chars, seed=0):
+    """Build scraped-page-like text of about the given length, sprinkled with lexicon keywords."""
+    from app.utils.text_analyzer import PERSONALITY_TRAITS, EMOTIONAL_TONES, FORMALITY_INDICATORS
+    keywords = [keyword for lexicon in (PERSONALITY_TRAITS, EMOTIONAL_TONES, FORMALITY_INDICATORS)
+                for keywords in lexicon.values() for keyword in keywords]
+    filler = ("our team product customers service quality design every day work people new help make "
+              "world home learn more about shop find best time support order delivery free").split()
+    rng = random.Random(seed)
+    sentences, length = [], 0
+    while length < chars:
+        words = [rng.choice(keywords) if rng.random() < 0.08 else rng.choice(filler)
+                 for _ in range(rng.randint(6, 24))]
+        sentence = " ".join(words).capitalize() + rng.choice(".!?")
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def bench_lexicon_match(args):
+    """Trait, tone and formality keyword counting in basic_analyze_text: per-keyword rescans versus one automaton pass."""
+    from app.utils.text_analyzer import PERSONALITY_TRAITS, EMOTIONAL_TONES, FORMALITY_INDICATORS, LEXICON_MATCHER
+    text = _scrape_text(args.chars)
+    # Sentence and word tokenization are shared by both versions, so they are done once up front
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    filtered_words = [word for word in re.findall(r'\w+', text.lower()) if word.isalnum()]
+
+    def previous():
+        scores = {}
+        for lexicon in (PERSONALITY_TRAITS, EMOTIONAL_TONES):
+            for category, keywords in lexicon.items():
+                matches = sum(1 for word in filtered_words if word in keywords)
+                for keyword in keywords:
+                    matches += sum(1 for sentence in sentences if keyword in sentence.lower())
+                scores[category] = matches
+        for category, keywords in FORMALITY_INDICATORS.items():
+            scores[category] = sum(text.lower().count(word) for word in keywords)
+        return scores
+
+    def automaton():
+        return LEXICON_MATCHER.count(sentences)
+
+    _report(f"lexicon-match ({len(text)} characters, {len(sentences)} sentences)", {
+        "previous (rescan per keyword)": _time(previous, args.iterations) / 1000,
+        "Aho-Corasick, one pass": _time(automaton, args.iterations) / 1000
+    }, 'ms/op')
+
+
+def bench_batch_features(args):
+    """Local analysis of a corpus: basic_analyze_text per document versus the vectorized batch entry point."""
+    from app.utils.text_analyzer import basic_analyze_text
+    from app.utils.batch_features import basic_analyze_texts
+    rng = random.Random(0)
+    texts = [_scrape_text(rng.randint(500, args.max_chars), seed) for seed in range(args.documents)]
+
+    def scalar():
+        return [basic_analyze_text(text) for text in texts]
+
+    def batch():
+        return basic_analyze_texts(texts)
+
+    if scalar() != batch():
+        print("batch results differ from basic_analyze_text")
+        return
+    total_chars = sum(len(text) for text in texts)
+    _report(f"batch-features ({args.documents} documents, {total_chars} characters)", {
+        "basic_analyze_text per document": _time(scalar, args.iterations) / 1000,
+        "basic_analyze_texts (sparse matrices)": _time(batch, args.iterations) / 1000
+    }, 'ms/op')
+
+
+def bench_vocabulary_sketch(args):
+    """Top-50 vocabulary of the fixed-memory sketch versus an exact FreqDist, on the repository's brand documents."""
+    from nltk.probability import FreqDist
+    from app.utils.analyzed_document import AnalyzedDocument
+    from app.utils.vocabulary_sketch import SpaceSavingSketch
+    texts = []
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            texts.append(f.read())
+    # The documents on their own, and all of them as one corpus (as the web scraper combines pages)
+    corpora = [(os.path.basename(path), text) for path, text in zip(args.files, texts)]
+    corpora.append(("all documents", " ".join(texts)))
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    print(f"vocabulary-sketch: top-{args.top} terms of the sketch versus FreqDist.most_common({args.top})")
+    print(f"  {'corpus':<26} {'words':>7} {'distinct':>8} {'size':>5} {'overlap':>8} {'same order':>10} "
+          f"{'max error':>9} {'bound':>6} {'certain':>7}")
+    for name, text in corpora:
+        words = AnalyzedDocument(text).content_words()
+        exact = FreqDist(words)
+        expected = exact.most_common(args.top)
+        for size in sizes:
+            sketch = SpaceSavingSketch(size)
+            sketch.update(words)
+            top = sketch.most_common(args.top)
+            overlap = len({word for word, _ in top} & {word for word, _ in expected})
+            max_error = max((count - exact[word] for word, count in top), default=0)
+            print(f"  {name:<26} {len(words):>7} {len(exact):>8} {size:>5} {overlap:>5}/{len(expected):<2} "
+                  f"{str(top == expected):>10} {max_error:>9} {sketch.error_bound:>6} "
+                  f"{len(sketch.guaranteed(args.top)):>7}")
+
+
+def main():
+    """Run the benchmark selected on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    json_decode = subparsers.add_parser('json-decode', help=bench_json_decode.__doc__)
+    json_decode.add_argument('--iterations', type=int, default=2000)
+    json_decode.add_argument('--descriptions', type=int, default=20,
+                             help='Repeat the rich descriptions to make the response larger')
+    json_decode.set_defaults(func=bench_json_decode)
+
+    fused_analysis = subparsers.add_parser('fused-analysis', help=bench_fused_analysis.__doc__)
+    fused_analysis.add_argument('--documents', type=int, default=10)
+    fused_analysis.add_argument('--latency-ms', type=float, default=500)
+    fused_analysis.set_defaults(func=bench_fused_analysis)
+
+    assets_stream = subparsers.add_parser('assets-stream', help=bench_assets_stream.__doc__)
+    assets_stream.add_argument('--requests', type=int, default=5)
+    assets_stream.add_argument('--latency-ms', type=float, default=8000)
+    assets_stream.add_argument('--first-token-ms', type=float, default=300)
+    assets_stream.set_defaults(func=bench_assets_stream)
+
+    lexicon_match = subparsers.add_parser('lexicon-match', help=bench_lexicon_match.__doc__)
+    lexicon_match.add_argument('--chars', type=int, default=100000)
+    lexicon_match.add_argument('--iterations', type=int, default=5)
+    lexicon_match.set_defaults(func=bench_lexicon_match)
+
+    batch_features = subparsers.add_parser('batch-features', help=bench_batch_features.__doc__)
+    batch_features.add_argument('--documents', type=int, default=200)
+    batch_features.add_argument('--max-chars', type=int, default=5000)
+    batch_features.add_argument('--iterations', type=int, default=3)
+    batch_features.set_defaults(func=bench_batch_features)
+
+    vocabulary_sketch = subparsers.add_parser('vocabulary-sketch', help=bench_vocabulary_sketch.__doc__)
+    vocabulary_sketch.add_argument('--files', nargs='+',
+                                   default=['sample_brand_text.txt', 'test_document.txt', 'debug_extracted_text.txt'])
+    vocabulary_sketch.add_argument('--sizes', default='50,100,200,2000',
+                                   help='Comma-separated sketch capacities to compare')
+    vocabulary_sketch.add_argument('--top', type=int, default=50)
+    vocabulary_sketch.set_defaults(func=bench_vocabulary_sketch)
+
+    args = parser.parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,11 @@
 import os
 import json
+import time
 import nltk
 import PyPDF2
 import requests
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response, Response, stream_with_context
 from flask_session import Session
 from flask_wtf.csrf import CSRFProtect
 from bs4 import BeautifulSoup
@@ -37,6 +38,22 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 # Initialize Flask-Session
 Session(app)
 
+# Time request stages (reported in a Server-Timing header when SERVER_TIMING_ENABLED is set)
+from app.utils.latency import init_app as init_latency
+init_latency(app)
+
+# Give every request an ID so captured API traces can be looked up
+from app.utils.trace_store import init_app as init_trace_store
+init_trace_store(app)
+
+# Per-request time budget for routes that call out to websites and API providers
+from app.utils.deadline import start_deadline, init_app as init_deadline
+init_deadline(app)
+
+# Attribute API usage to the session and input method that caused it
+from app.utils.usage_ledger import init_app as init_usage_ledger
+init_usage_ledger(app)
+
 # Register blueprints
 from app.routes.web_scraper import web_scraper_bp
 app.register_blueprint(web_scraper_bp, url_prefix='/web-scraper')
@@ -310,6 +327,8 @@ def restart():
 
 @app.route('/document-upload', methods=['GET', 'POST'])
 def document_upload():
+    # Outbound analysis calls take their timeouts from this request's time budget
+    start_deadline()
     initialize_session()
 
     if request.method == 'POST':
@@ -582,6 +601,8 @@ def web_scraper_redirect():
 
 @app.route('/results')
 def results():
+    # The tone of voice assets call takes its timeout from this request's time budget
+    start_deadline()
     initialize_session()
 
     # Check if any input method has been used
@@ -614,6 +635,7 @@ def results():
 
     # Generate brand voice summary
     from app.utils.text_analyzer import generate_brand_voice_summary
+    from app.utils.api_client import ASSETS_STREAMING_ENABLED
 
     # Get analysis results from the most recently used method
     analysis_results = None
@@ -622,11 +644,13 @@ def results():
             analysis_results = data['data']
             break
 
-    # Generate the brand voice summary
+    # Generate the brand voice summary (with streaming enabled, the page fetches the
+    # tone of voice assets from /api/assets/stream instead of waiting for them here)
     brand_voice_summary = generate_brand_voice_summary(
         session['brand_parameters'],
         analysis_results=analysis_results,
-        input_methods=session['input_methods']
+        input_methods=session['input_methods'],
+        generate_assets=not ASSETS_STREAMING_ENABLED
     )
 
     # Store the summary in the session for later use
@@ -697,8 +721,10 @@ def export():
     file_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     css_version = datetime.now().strftime("%Y%m%d%H%M%S")  # Add a version for cache busting
 
-    # Get the brand voice summary
-    brand_voice_summary = session.get('brand_voice_summary', {})
+    # Get the brand voice summary, with any assets that were streamed to the results page
+    from app.utils.text_analyzer import complete_tone_of_voice_assets
+    brand_voice_summary = complete_tone_of_voice_assets(session.get('brand_voice_summary', {}))
+    session.modified = True
 
     if export_format == 'json':
         # Generate JSON with brand parameters and summary
@@ -805,6 +831,84 @@ def api_sync():
     else:
         return jsonify({'success': False, 'error': message})
 
+@app.route('/api/assets/stream')
+def api_assets_stream():
+    """Stream the tone of voice prompt of the current summary as server-sent events, then the finished assets"""
+    initialize_session()
+    from app.utils.api_client import get_api_client
+    from app.utils.streaming import format_sse
+
+    summary = session.get('brand_voice_summary')
+    api_key = session['api_settings'].get('api_key', '')
+    if not summary:
+        events = iter([('error', {'error': 'There is no brand voice summary yet'})])
+    elif not api_key:
+        events = iter([('error', {'error': 'API key is missing'})])
+    else:
+        # The stream is limited by the request's time budget like the other provider calls
+        start_deadline()
+        events = get_api_client('openai', api_key).stream_tone_of_voice_assets(summary)
+
+    def generate():
+        for event, data in events:
+            yield format_sse(event, data)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stats')
+def api_stats():
+    """Report API client counters (response cache, rate limit scheduler, request coalescing, token usage)"""
+    from app.utils.response_cache import response_cache
+    from app.utils.rate_limiter import rate_limiter
+    from app.utils.singleflight import singleflight
+    from app.utils.token_estimator import usage_tracker
+    from app.utils.trace_store import trace_store
+    from app.utils.hedging import hedging_policy
+    from app.utils.key_probe import key_probe
+    from app.utils.model_tiering import model_tiering
+    from app.utils.usage_ledger import usage_ledger
+    return jsonify({
+        'response_cache': response_cache.get_stats(),
+        'rate_limiter': rate_limiter.get_stats(),
+        'singleflight': singleflight.get_stats(),
+        'token_usage': usage_tracker.get_stats(),
+        'traces': trace_store.get_stats(),
+        'hedging': hedging_policy.get_stats(),
+        'key_probe': key_probe.get_stats(),
+        'model_tiering': model_tiering.get_stats(),
+        'usage_ledger': usage_ledger.get_stats()
+    })
+
+@app.route('/api/usage')
+def api_usage():
+    """Aggregate the API usage ledger (?group_by=input_method,model&since_hours=24&session=current)"""
+    from app.utils.usage_ledger import usage_ledger
+    if not usage_ledger.enabled:
+        return jsonify({'error': 'The usage ledger is disabled. Set USAGE_LEDGER_ENABLED=true to enable it.'}), 404
+    group_by = [column.strip() for column in request.args.get('group_by', 'provider,model').split(',')
+                if column.strip()]
+    try:
+        since_hours = request.args.get('since_hours', type=float)
+        since = time.time() - since_hours * 3600 if since_hours is not None else None
+        session_id = getattr(session, 'sid', None) if request.args.get('session') == 'current' else None
+        report = usage_ledger.report(group_by, since, session_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'group_by': group_by, 'since_hours': since_hours, 'groups': report})
+
+@app.route('/api/traces/<request_id>')
+def api_trace(request_id):
+    """Return the API request/response traces captured for a request ID (requires TRACE_STORE_ENABLED)"""
+    from app.utils.trace_store import trace_store
+    if not trace_store.enabled:
+        return jsonify({'error': 'Trace capture is disabled. Set TRACE_STORE_ENABLED=true to enable it.'}), 404
+    # Only the session that made the request can read its traces
+    traces = trace_store.get(request_id, getattr(session, 'sid', None))
+    if not traces:
+        return jsonify({'error': f'No traces found for request {request_id}'}), 404
+    return jsonify({'request_id': request_id, 'traces': traces})
+
 def sync_with_api():
     """Verify API connection for intelligent text analysis"""
     try:
@@ -813,17 +917,11 @@ def sync_with_api():
         if not api_key:
             return False, "API key is missing. Please enter your API key."
 
-        # Import the API client
-        from app.utils.api_client import APIClient
-
-        # Create a test message to verify API connectivity
-        test_message = "This is a test message to verify API connectivity."
-
-        # Create API client and test connection (always use OpenAI)
-        api_client = APIClient('openai', api_key)
+        # Check the key with a cheap request to the provider (the verdict is cached per key)
+        from app.utils.key_probe import key_probe
 
-        # Test the API with a small sample text
-        success, result = api_client.analyze_text(test_message)
+        # Always use OpenAI
+        success, message = key_probe.check('openai', api_key)
 
         # Update last sync time
         if success:
@@ -831,8 +929,7 @@ def sync_with_api():
             session.modified = True
             return True, "API connection verified successfully."
         else:
-            error_message = result.get('error', 'Unknown error')
-            return False, f"API connection test failed: {error_message}"
+            return False, f"API connection test failed: {message}"
 
     except Exception as e:
         return False, f"API connection error: {str(e)}"
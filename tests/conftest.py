@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Keep the process-wide caches and ledgers the tests import out of the repository's cache directory
+_state_dir = tempfile.mkdtemp(prefix='brandvoice-tests-')
+os.environ.setdefault('RESPONSE_CACHE_PATH', os.path.join(_state_dir, 'api_responses.sqlite3'))
+os.environ.setdefault('USAGE_LEDGER_PATH', os.path.join(_state_dir, 'usage_ledger.sqlite3'))
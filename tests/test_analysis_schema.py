@@ -0,0 +1,80 @@
+import copy
+import json
+
+import pytest
+
+from app.utils import analysis_schema
+from app.utils.analysis_schema import (validate_analysis, decode_analysis, get_analysis, ValidatedResult,
+                                       AnalysisValidationError)
+from app.utils.api_client import APIClient
+from app.utils.latency import LatencyBreakdown
+
+
+def test_valid_analysis_has_no_errors():
+    analysis = validate_analysis({
+        "personality_traits": {"bold": 8, "warm": "6"},
+        "emotional_tone": [{"emotion": "confident", "score": 7}],
+        "formality": {"level": 4},
+        "vocabulary": {"preferred_terms": ["craft", "bold"], "avoided_terms": ["cheap"]},
+        "communication_style": {"key_phrases": ["Made to last"],
+                                "sentence_structure": {"length_preference": 5, "complexity_preference": 6}}
+    })
+    assert analysis.errors == []
+    assert analysis.personality_traits == {"bold": 8, "warm": 6}
+    assert analysis.emotional_tone == {"confident": 7}
+    assert analysis.formality == 4
+    standardized = analysis.to_standardized()
+    assert standardized["common_vocabulary"] == [("craft", 10), ("bold", 9)]
+    assert standardized["avoided_terms"] == ["cheap"]
+    assert standardized["avg_sentence_length"] == 15
+    assert standardized["sentence_complexity"] == 6
+    assert "validation_errors" not in standardized
+
+
+def test_ranked_trait_lists_are_scored_from_ten_down():
+    assert validate_analysis({"personality_traits": ["bold", "warm"]}).personality_traits == {"bold": 10, "warm": 9}
+
+
+def test_out_of_range_scores_are_clamped_not_dropped():
+    analysis = validate_analysis({"personality_traits": {"bold": 15, "shy": -3, "warm": 7.9}})
+    assert analysis.personality_traits == {"bold": 10, "shy": 0, "warm": 7}
+    assert analysis.errors == []
+
+
+def test_invalid_values_are_dropped_and_reported():
+    analysis = validate_analysis({"personality_traits": {"bold": "very", "warm": 6, "odd": float('nan')},
+                                  "vocabulary": {"preferred_terms": ["craft", 3]}})
+    assert analysis.personality_traits == {"warm": 6}
+    assert analysis.preferred_terms == ["craft"]
+    paths = {error.path for error in analysis.errors}
+    assert paths == {"$.personality_traits.bold", "$.personality_traits.odd", "$.vocabulary.preferred_terms[1]"}
+    standardized = analysis.to_standardized()
+    assert {error["path"] for error in standardized["validation_errors"]} == paths
+
+
+@pytest.mark.parametrize("data", [[], "text", {"unrelated": 1}])
+def test_output_that_is_not_an_analysis_is_rejected(data):
+    with pytest.raises(AnalysisValidationError) as excinfo:
+        validate_analysis(data)
+    assert excinfo.value.errors[0].path == "$"
+
+
+def test_decode_analysis_rejects_invalid_json():
+    assert decode_analysis(b'{"personality_traits": {"bold": 9}}').personality_traits == {"bold": 9}
+    with pytest.raises(ValueError):
+        decode_analysis(b'{"personality_traits":')
+
+
+def test_validated_results_are_not_validated_again(monkeypatch):
+    result = ValidatedResult(validate_analysis({"personality_traits": {"bold": 8}}))
+    assert result == {"personality_traits": {"bold": 8}}
+    assert json.loads(json.dumps(result)) == result
+
+    def fail(data):
+        raise AssertionError("validated twice")
+
+    monkeypatch.setattr(analysis_schema, 'validate_analysis', fail)
+    # Copies made when latency is attached or results are shared keep the analysis
+    with_latency = APIClient._with_latency(result, LatencyBreakdown(), "Test analysis")
+    for copied in (result, copy.copy(result), copy.deepcopy(result), with_latency):
+        assert get_analysis(copied).personality_traits == {"bold": 8}
@@ -0,0 +1,70 @@
+import nltk
+import pytest
+from nltk.corpus import stopwords
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+try:
+    nltk.data.find('tokenizers/punkt')
+    nltk.data.find('corpora/stopwords')
+except LookupError:
+    pytest.skip("NLTK punkt and stopwords data are not installed", allow_module_level=True)
+
+from app.utils import analyzed_document
+from app.utils.analyzed_document import AnalyzedDocument, _token_spans
+
+TEXTS = [
+    "",
+    "no sentence breaks here just one long run of words without any punctuation at all",
+    "We build tools for teams. They're fast, reliable and friendly! Why wait? Try it today.",
+    'She said "it\'s fine" and left... Really? Dr. Smith wasn\'t convinced: the U.S. office\'s '
+    "numbers (Q3, 2023) were 15% lower.",
+]
+
+
+def old_metrics(text):
+    """The metrics as text_analyzer computed them before AnalyzedDocument."""
+    sentences = sent_tokenize(text)
+    stop_words = set(stopwords.words('english'))
+    content_words = [word for word in word_tokenize(text.lower()) if word.isalnum() and word not in stop_words]
+    sentence_lengths = [len(word_tokenize(sentence)) for sentence in sentences]
+    avg_sentence_length = sum(sentence_lengths) / len(sentences) if sentences else 0
+    return sentence_lengths, avg_sentence_length, content_words
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_metrics_match_the_nltk_tokenizers(text):
+    document = AnalyzedDocument(text)
+    sentence_lengths, avg_sentence_length, content_words = old_metrics(text)
+
+    assert document.sentence_lengths() == sentence_lengths
+    assert document.avg_sentence_length() == pytest.approx(avg_sentence_length)
+    assert document.content_words() == content_words
+    assert list(document.sentences()) == sent_tokenize(text)
+
+
+def test_content_words_of_a_sentence_range():
+    document = AnalyzedDocument(TEXTS[2])
+    assert document.content_words(1, 3) == ["fast", "reliable", "friendly", "wait"]
+    assert document.content_words(10) == []
+
+
+def test_token_spans_fall_back_when_span_tokenize_fails(monkeypatch):
+    sentence = 'She said "it\'s fine" and left... Really?'
+    expected = _token_spans(sentence)
+
+    def fail(text):
+        raise ValueError("can't align tokens")
+
+    monkeypatch.setattr(analyzed_document._word_tokenizer, 'span_tokenize', fail)
+    spans = _token_spans(sentence)
+
+    # One span per token, in order and within the sentence; only the rewritten quotes may be misaligned
+    assert len(spans) == len(expected)
+    assert all(0 <= start <= end <= len(sentence) for start, end in spans)
+    assert [start for start, _ in spans] == sorted(start for start, _ in spans)
+    quotes = {2, 6}
+    assert [span for i, span in enumerate(spans) if i not in quotes] == \
+           [span for i, span in enumerate(expected) if i not in quotes]
+
+    text = TEXTS[3]
+    assert AnalyzedDocument(text).content_words() == old_metrics(text)[2]
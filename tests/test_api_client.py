@@ -0,0 +1,32 @@
+import hashlib
+
+from app.utils import api_client
+from app.utils.api_client import get_api_client
+
+
+def test_get_api_client_reuses_client_per_provider_and_key():
+    client = get_api_client('openai', 'sk-reuse')
+    assert get_api_client('openai', 'sk-reuse') is client
+    assert get_api_client('anthropic', 'sk-reuse') is not client
+
+
+def test_client_cache_is_keyed_by_key_hash():
+    get_api_client('openai', 'sk-secret-value')
+    keys = list(api_client._client_cache)
+    assert all('sk-secret-value' not in key for key in keys)
+    assert ('openai', hashlib.sha256(b'sk-secret-value').hexdigest()) in keys
+
+
+def test_client_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(api_client, 'CLIENT_CACHE_SIZE', 3)
+    monkeypatch.setattr(api_client, '_client_cache', type(api_client._client_cache)())
+    first = get_api_client('openai', 'key-1')
+    get_api_client('openai', 'key-2')
+    get_api_client('openai', 'key-3')
+    # Using key-1 again makes key-2 the least recently used
+    assert get_api_client('openai', 'key-1') is first
+    get_api_client('openai', 'key-4')
+    assert len(api_client._client_cache) == 3
+    remaining = {key for _, key in api_client._client_cache}
+    assert hashlib.sha256(b'key-2').hexdigest() not in remaining
+    assert hashlib.sha256(b'key-1').hexdigest() in remaining
@@ -0,0 +1,30 @@
+import asyncio
+import inspect
+
+from app.utils.api_client import APIClient, BaseAPIClient
+from app.utils.async_api_client import AsyncAPIClient
+
+
+def test_async_client_inherits_no_sync_io():
+    sync_io = set(vars(APIClient)) - set(vars(BaseAPIClient)) - {'__init__', '__doc__', '__module__'}
+    assert {'analyze_text', '_post', 'analyze_batch', 'stream_tone_of_voice_assets'} <= sync_io
+    client = AsyncAPIClient('openai', 'sk-async')
+    assert not isinstance(client, APIClient)
+    for name in sync_io:
+        method = getattr(client, name, None)
+        # Either the async client has its own coroutine version, or the method doesn't exist at all
+        assert method is None or inspect.iscoroutinefunction(method), name
+
+
+def test_async_client_shares_the_request_building():
+    client = AsyncAPIClient('openai', 'sk-async')
+    sync_client = APIClient('openai', 'sk-async')
+    config = client.endpoints['openai']
+    assert client._build_analysis_payload("We are bold.", config) == \
+        sync_client._build_analysis_payload("We are bold.", config)
+    assert client._analysis_prompts() == sync_client._analysis_prompts()
+
+
+def test_async_client_reports_a_missing_key_without_io():
+    success, results = asyncio.run(AsyncAPIClient('openai', '').analyze_text("We are bold."))
+    assert not success and results == {"error": "API provider or API key is missing"}
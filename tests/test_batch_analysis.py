@@ -0,0 +1,39 @@
+import json
+
+from app.utils import batch_analysis
+from app.utils.api_client import APIClient
+from app.utils.batch_analysis import LocalBatchRunner, run_batch
+from app.utils.response_cache import response_cache
+
+ANALYSIS = {"personality_traits": {"bold": 8}, "emotional_tone": {"confident": 7}}
+
+
+def _responder(bodies):
+    def respond(body):
+        bodies.append(body)
+        return {"choices": [{"message": {"content": json.dumps(ANALYSIS)}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+    return respond
+
+
+def test_run_batch_caches_over_budget_documents_under_the_trimmed_text(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch_analysis, 'BATCH_DIR', str(tmp_path))
+    client = APIClient('openai', 'sk-batch-test')
+    monkeypatch.setattr(client, '_text_token_budget', lambda: 40)
+    document = " ".join(f"Sentence {i} about our bold brand." for i in range(100))
+    trimmed = batch_analysis.fit_batch_documents(client, [document])[0]
+    assert trimmed != document
+
+    bodies = []
+    [(success, results)] = run_batch(client, [document], runner=LocalBatchRunner(client, _responder(bodies)),
+                                     bypass_cache=True)
+    assert success and results["personality_traits"] == {"bold": 8}
+    assert trimmed in bodies[0]["messages"][-1]["content"]
+
+    # The result is cached under the text that was sent, so a rerun submits nothing
+    system_prompt, user_prompt = client._analysis_prompts()
+    key = response_cache.make_key('openai', client.endpoints['openai']['model'], system_prompt, user_prompt, trimmed)
+    assert response_cache.get(key) == results
+    [(success, cached)] = run_batch(client, [document], runner=LocalBatchRunner(client, _responder(bodies)))
+    assert success and cached == results
+    assert len(bodies) == 1
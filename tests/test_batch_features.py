@@ -0,0 +1,67 @@
+import os
+
+import nltk
+import pytest
+
+try:
+    nltk.data.find('tokenizers/punkt')
+    nltk.data.find('corpora/stopwords')
+except LookupError:
+    pytest.skip("NLTK punkt and stopwords data are not installed", allow_module_level=True)
+
+from app.utils.analyzed_document import AnalyzedDocument
+from app.utils.batch_features import basic_analyze_texts
+from app.utils.text_analyzer import basic_analyze_text
+from app.utils.vocabulary_sketch import VOCABULARY_SKETCH_SIZE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read(name):
+    with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def many_words_text(distinct):
+    """A text with more distinct content words than the sketch counts, plus a few frequent ones."""
+    sentences = []
+    for start in range(0, distinct, 12):
+        words = [f"term{n}" for n in range(start, min(start + 12, distinct))]
+        sentences.append(f"Innovative teams {' '.join(words)} therefore deliver. We're excited!")
+    return ' '.join(sentences)
+
+
+DOCUMENTS = [
+    "",
+    "no sentence breaks here just one long run of innovative friendly words without any punctuation",
+    "We build tools for teams. They're fast, reliable and friendly! Why wait? Try it today.",
+    read('sample_brand_text.txt'),
+    read('test_document.txt'),
+]
+
+
+def test_batch_results_match_basic_analyze_text():
+    assert basic_analyze_texts(DOCUMENTS) == [basic_analyze_text(text) for text in DOCUMENTS]
+
+
+def test_batch_of_one_and_empty_batch():
+    assert basic_analyze_texts([DOCUMENTS[2]]) == [basic_analyze_text(DOCUMENTS[2])]
+    assert basic_analyze_texts([]) == []
+
+
+def test_documents_larger_than_the_sketch_use_the_sketch_vocabulary():
+    text = many_words_text(VOCABULARY_SKETCH_SIZE + 500)
+    assert len(set(AnalyzedDocument(text).content_words())) > VOCABULARY_SKETCH_SIZE
+
+    results = basic_analyze_texts([DOCUMENTS[2], text])
+    assert results == [basic_analyze_text(DOCUMENTS[2]), basic_analyze_text(text)]
+
+
+def test_small_sketch_size_falls_back_per_document():
+    small, large = DOCUMENTS[2], many_words_text(40)
+    results = basic_analyze_texts([small, large], top_k=10, sketch_size=20)
+
+    # The small document fits in the sketch, so its exact counts are used
+    assert results[0]["common_vocabulary"] == AnalyzedDocument(small).vocabulary().most_common(10)
+    assert results[1]["common_vocabulary"] == AnalyzedDocument(large).vocabulary(20).most_common(10)
+    assert results[1]["common_vocabulary"][:2] == [("innovative", 4), ("teams", 4)]
@@ -0,0 +1,39 @@
+from app.utils import api_client as api_client_module
+from app.utils import chunked_analysis
+from app.utils.api_client import APIClient
+from app.utils.chunked_analysis import analyze_in_chunks
+
+
+class RecordingClient:
+    """Records the options each chunk is analyzed with."""
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_text(self, text, bypass_cache=False, include_assets=False, hedged=False):
+        self.calls.append((text, bypass_cache, hedged))
+        return True, {"personality_traits": {"bold": 8}, "latency": {"network_ms": 5.0, "total_ms": 6.0}}
+
+
+def test_chunks_are_analyzed_with_the_callers_options(monkeypatch):
+    monkeypatch.setattr(chunked_analysis, 'split_into_chunks', lambda text, max_tokens: text.split(' | '))
+    client = RecordingClient()
+    success, merged = analyze_in_chunks(client, "first | second", bypass_cache=True, hedged=True)
+    assert success
+    assert sorted(client.calls) == [("first", True, True), ("second", True, True)]
+    assert merged["chunking"]["chunks_analyzed"] == 2
+    assert merged["latency"]["network_ms"] == 10.0
+
+
+def test_analyze_text_passes_bypass_cache_and_hedged_to_chunked_analysis(monkeypatch):
+    calls = []
+
+    def fake_analyze_in_chunks(client, text, **options):
+        calls.append(options)
+        return True, {}
+
+    monkeypatch.setattr(api_client_module, 'analyze_in_chunks', fake_analyze_in_chunks)
+    client = APIClient('openai', 'sk-chunk-options')
+    monkeypatch.setattr(client, '_fit_prompt_budget', lambda text: (text, True))
+    client.analyze_text("A very long document.", bypass_cache=True, hedged=True)
+    assert calls == [{"bypass_cache": True, "hedged": True}]
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import hashlib
+
+from app.utils import hedging
+from app.utils.api_client import get_api_client
+from app.utils.deadline import get_deadline, use_deadline, Deadline
+from app.utils.hedging import HedgingPolicy
+from app.utils.latency import LatencyBreakdown
+from app.utils.trace_store import get_request_id, set_request_id
+
+
+class FakeClient:
+    """Stands in for an AsyncAPIClient in the race."""
+
+    def __init__(self, api_provider, delay=0.0, success=True):
+        self.api_provider = api_provider
+        self.delay = delay
+        self.success = success
+        self.seen = None
+
+    async def request_analysis(self, text, breakdown, include_assets=False):
+        with breakdown.stage('network'):
+            await asyncio.sleep(self.delay)
+        self.seen = (get_request_id(), get_deadline())
+        if not self.success:
+            return False, {"error": f"{self.api_provider} failed"}
+        return True, {"personality_traits": {"bold": 8}, "provider": self.api_provider}
+
+
+def _policy(monkeypatch, clients):
+    policy = HedgingPolicy(secondary_providers=[])
+    monkeypatch.setattr(policy, '_candidates', lambda provider, key: list(clients))
+    return policy
+
+
+def test_race_runs_in_the_request_context(monkeypatch):
+    client = FakeClient('openai')
+    policy = _policy(monkeypatch, [client])
+
+    def request():
+        request_id = set_request_id()
+        deadline = Deadline(10)
+        with use_deadline(deadline):
+            success, results = policy.request_analysis('openai', 'sk-test', 'We are bold.', LatencyBreakdown())
+        assert success and results["provider"] == 'openai'
+        assert client.seen == (request_id, deadline)
+
+    contextvars.copy_context().run(request)
+
+
+def test_failover_reports_the_winner_and_its_timings(monkeypatch):
+    policy = _policy(monkeypatch, [FakeClient('openai', success=False), FakeClient('anthropic', delay=0.01)])
+    breakdown = LatencyBreakdown()
+    success, results = policy.request_analysis('openai', 'sk-test', 'We are bold.', breakdown)
+    assert success and results["provider"] == 'anthropic'
+    assert breakdown.as_dict()["network_ms"] >= 10
+    stats = policy.get_stats()
+    assert stats["failovers"] == 1 and stats["wins_by_provider"] == {"anthropic": 1}
+
+
+def test_hedged_analysis_uses_the_response_cache(monkeypatch):
+    calls = []
+
+    def request_analysis(api_provider, api_key, text, breakdown, include_assets=False):
+        calls.append(text)
+        return True, {"personality_traits": {"bold": 8}}
+
+    monkeypatch.setattr(hedging.hedging_policy, 'request_analysis', request_analysis)
+    client = get_api_client('openai', 'sk-hedged-cache')
+    text = "We are bold, warm and hedged."
+    for _ in range(2):
+        success, results = hedging.hedging_policy.analyze_text('openai', 'sk-hedged-cache', text)
+        assert success and results["personality_traits"] == {"bold": 8}
+    assert calls == [text]
+    # The unhedged path shares the cached result
+    assert client.analyze_text(text)[1]["personality_traits"] == {"bold": 8}
+    assert calls == [text]
+
+
+def test_client_cache_is_bounded_and_does_not_hold_plaintext_keys(monkeypatch):
+    monkeypatch.setattr(hedging, 'CLIENT_CACHE_SIZE', 2)
+    policy = HedgingPolicy(secondary_providers=[])
+
+    first = policy._client('openai', 'sk-one')
+    policy._client('openai', 'sk-two')
+    assert policy._client('openai', 'sk-one') is first
+    policy._client('openai', 'sk-three')
+
+    # sk-two was least recently used, so it was evicted
+    hashed = {key: hashlib.sha256(key.encode('utf-8')).hexdigest() for key in ('sk-one', 'sk-two', 'sk-three')}
+    assert list(policy._clients) == [('openai', hashed['sk-one']), ('openai', hashed['sk-three'])]
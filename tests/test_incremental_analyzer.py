@@ -0,0 +1,70 @@
+import os
+
+import nltk
+import pytest
+
+try:
+    nltk.data.find('tokenizers/punkt')
+    nltk.data.find('corpora/stopwords')
+except LookupError:
+    pytest.skip("NLTK punkt and stopwords data are not installed", allow_module_level=True)
+
+from app.utils.incremental_analyzer import IncrementalAnalyzer
+from app.utils.text_analyzer import basic_analyze_text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = [
+    "Welcome to our innovative studio. We're thrilled to help friendly teams grow",
+    "faster than ever before. Therefore, our experts deliver reliable results! Questions? "
+    "Contact us today and we'll get back to you within one business day.",
+    "Our story began in a small garage. Today we serve happy customers worldwide.",
+]
+
+
+def sample_text():
+    with open(os.path.join(ROOT, 'sample_brand_text.txt'), encoding='utf-8') as f:
+        return f.read()
+
+
+def feed_all(texts, sketch_size=2000):
+    analyzer = IncrementalAnalyzer(sketch_size)
+    for text in texts:
+        analyzer.feed(text)
+    return analyzer
+
+
+def test_chunks_with_a_split_sentence_match_the_whole_text():
+    # The first page ends mid-sentence; the second page finishes it
+    analyzer = feed_all(PAGES)
+    assert analyzer.snapshot() == basic_analyze_text(' '.join(PAGES))
+    assert analyzer.chunks == 3
+
+
+def test_snapshot_does_not_consume_the_pending_sentence():
+    analyzer = feed_all(PAGES[:1])
+    assert analyzer.snapshot() == basic_analyze_text(PAGES[0])
+    analyzer.feed(PAGES[1])
+    assert analyzer.snapshot() == basic_analyze_text(' '.join(PAGES[:2]))
+
+
+def test_sample_text_fed_in_arbitrary_chunks():
+    text = sample_text()
+    words = text.split(' ')
+    chunks = [' '.join(words[i:i + 17]) for i in range(0, len(words), 17)]
+    assert feed_all(chunks).snapshot() == basic_analyze_text(text)
+
+
+def test_merge_matches_the_concatenated_text():
+    first, second = feed_all(PAGES[:2]), feed_all(PAGES[2:])
+    merged = first.merge(second)
+    assert merged.snapshot() == basic_analyze_text(' '.join(PAGES))
+    assert merged.chunks == 3
+    # The merged-in analyzer is left unchanged
+    assert second.snapshot() == basic_analyze_text(PAGES[2])
+
+
+def test_empty_analyzer_matches_empty_text():
+    analyzer = IncrementalAnalyzer()
+    analyzer.feed('')
+    assert analyzer.snapshot() == basic_analyze_text('')
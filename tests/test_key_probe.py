@@ -0,0 +1,52 @@
+from app.utils import key_probe as key_probe_module
+from app.utils.key_probe import KeyProbe
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_probe(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(key_probe_module.time, 'monotonic', clock)
+    probe = KeyProbe(**kwargs)
+    monkeypatch.setattr(probe, '_probe', lambda provider, key: (not key.startswith('bad'), 'checked', True))
+    return probe, clock
+
+
+def test_verdicts_are_cached_until_they_expire(monkeypatch):
+    probe, clock = make_probe(monkeypatch, ttl=60, failure_ttl=10)
+    assert probe.check('openai', 'sk-one') == (True, 'checked')
+    assert probe.check('openai', 'sk-one') == (True, 'checked')
+    assert probe.hits == 1
+
+    clock.now += 61
+    probe.check('openai', 'sk-one')
+    assert probe.hits == 1
+
+
+def test_expired_verdicts_are_dropped_on_insert(monkeypatch):
+    probe, clock = make_probe(monkeypatch, ttl=60, failure_ttl=10)
+    probe.check('openai', 'bad-one')
+    probe.check('openai', 'sk-one')
+    assert probe.get_stats()["cached_keys"] == 2
+
+    # The rejected key's verdict has expired, the accepted one's hasn't
+    clock.now += 30
+    probe.check('openai', 'sk-two')
+    assert probe.get_stats()["cached_keys"] == 2
+    assert ('openai', KeyProbe._key_id('bad-one')) not in probe._results
+
+
+def test_verdicts_are_capped_least_recently_used_first(monkeypatch):
+    probe, _ = make_probe(monkeypatch, ttl=60, max_keys=2)
+    probe.check('openai', 'sk-one')
+    probe.check('openai', 'sk-two')
+    probe.check('openai', 'sk-one')
+    probe.check('openai', 'sk-three')
+
+    assert list(probe._results) == [('openai', KeyProbe._key_id('sk-one')), ('openai', KeyProbe._key_id('sk-three'))]
@@ -0,0 +1,62 @@
+from app.utils.lexicon_matcher import LexiconMatcher, tokenize_words
+
+LEXICONS = {
+    "tone": {
+        "calm": ["calm", "at ease", "peace"],
+        "excited": ["thrilled", "cutting-edge", "at ease now"]
+    },
+    "formality": {
+        "informal": ["kind of", "gonna"],
+        "formal": ["therefore", "kind"]
+    }
+}
+
+
+def test_tokenize_words_keeps_hyphens_and_apostrophes():
+    assert tokenize_words("We're CUTTING-EDGE, kind-of; don't_stop") == ["we're", "cutting-edge", "kind-of", "don't",
+                                                                         "stop"]
+
+
+def test_keywords_only_match_whole_words():
+    matcher = LexiconMatcher(LEXICONS)
+    assert list(matcher.scan("Calmness and peaceful thrills")) == []
+    assert list(matcher.scan("Calm, at peace.")) == [("tone", "calm", "calm"), ("tone", "calm", "peace")]
+
+
+def test_multi_word_and_overlapping_keywords():
+    matcher = LexiconMatcher(LEXICONS)
+    # "at ease now" contains "at ease"; "kind of" contains "kind"
+    assert list(matcher.scan("Feel at ease now, kind of.")) == [
+        ("tone", "calm", "at ease"), ("tone", "excited", "at ease now"),
+        ("formality", "formal", "kind"), ("formality", "informal", "kind of")]
+    # Hyphenated keywords don't match their parts split by spaces
+    assert list(matcher.scan("cutting edge")) == []
+    assert list(matcher.scan("Cutting-edge")) == [("tone", "excited", "cutting-edge")]
+
+
+def test_count_occurrences_and_sentence_hits():
+    matcher = LexiconMatcher(LEXICONS)
+    occurrences, sentence_hits = matcher.count(["Calm, calm and at ease.", "Peace.", "Gonna be thrilled."])
+    assert occurrences["tone"] == {"calm": 4, "excited": 1}
+    # Each sentence counts once per keyword: calm and at ease in the first, peace in the second
+    assert sentence_hits["tone"] == {"calm": 3, "excited": 1}
+    assert occurrences["formality"] == {"informal": 1, "formal": 0}
+    assert sentence_hits["formality"] == {"informal": 1, "formal": 0}
+
+
+def test_count_matches_a_naive_scan():
+    matcher = LexiconMatcher(LEXICONS)
+    sentences = ["We are kind of thrilled, therefore calm.", "Kind words bring peace and peace.", "Nothing here."]
+    occurrences, sentence_hits = matcher.count(sentences)
+    for lexicon, categories in LEXICONS.items():
+        for category, keywords in categories.items():
+            expected_occurrences = expected_hits = 0
+            for sentence in sentences:
+                words = tokenize_words(sentence)
+                for keyword in keywords:
+                    pattern = tokenize_words(keyword)
+                    found = sum(words[i:i + len(pattern)] == pattern for i in range(len(words)))
+                    expected_occurrences += found
+                    expected_hits += found > 0
+            assert occurrences[lexicon][category] == expected_occurrences
+            assert sentence_hits[lexicon][category] == expected_hits
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from app.utils import rate_limiter as rate_limiter_module
+from app.utils.rate_limiter import RateLimitScheduler, TokenBucket, parse_duration, parse_retry_after
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2", 2.0),
+    ("1.5", 1.5),
+    ("-3", 0.0),
+    ("", None),
+    ("soon", None),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    past = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("6m0s", 360.0),
+    ("1h2m3.5s", 3723.5),
+    ("20ms", 0.02),
+    ("12", 12.0),
+])
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == pytest.approx(expected)
+
+
+def test_parse_duration_rejects_garbage():
+    assert parse_duration("6m0sx") is None
+    assert parse_duration("") is None
+
+
+def test_backoff_is_bounded_full_jitter():
+    scheduler = RateLimitScheduler(base_delay=1.0, max_delay=8.0)
+    for attempt in range(6):
+        limit = min(8.0, 2 ** attempt)
+        delays = [scheduler.backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= limit for delay in delays)
+    # A Retry-After hint is honoured, plus at most one base delay of jitter
+    assert all(5.0 <= scheduler.backoff_delay(0, retry_after=5.0) <= 6.0 for _ in range(100))
+
+
+def test_should_retry_only_retryable_statuses_up_to_max_retries():
+    scheduler = RateLimitScheduler(max_retries=2)
+    assert scheduler.should_retry(429, 0)
+    assert scheduler.should_retry(503, 1)
+    assert not scheduler.should_retry(503, 2)
+    assert not scheduler.should_retry(400, 0)
+    stats = scheduler.get_stats()
+    assert stats["retries"] == 2
+    assert stats["rate_limited_responses"] == 1
+    assert stats["server_error_responses"] == 2
+
+
+def test_token_bucket_queues_once_empty():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60, now=bucket.updated_at) == 0.0
+    # The bucket refills one unit per second, so the next unit is a second away
+    assert bucket.reserve(1, now=bucket.updated_at) == pytest.approx(1.0)
+
+
+def test_headers_tighten_the_bucket_and_retry_after_blocks():
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_minute=1000000)
+    assert scheduler.reserve('key', 10) == 0.0
+    scheduler.update_from_headers('key', {'x-ratelimit-limit-requests': '60',
+                                          'x-ratelimit-remaining-requests': '0',
+                                          'Retry-After': '3'})
+    assert scheduler.reserve('key', 10) >= 2.9
+
+
+def test_idle_keys_are_forgotten(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, 'monotonic', lambda: clock[0])
+    scheduler = RateLimitScheduler(idle_seconds=60, max_keys=100)
+    scheduler.reserve('old-key', 10)
+    clock[0] += 30
+    scheduler.reserve('recent-key', 10)
+    clock[0] += 45
+    # old-key has been idle for 75 seconds, recent-key for 45
+    scheduler.reserve('new-key', 10)
+    assert scheduler.get_stats()["keys_tracked"] == 2
+    assert scheduler._key_id('old-key') not in scheduler._keys
+    assert scheduler._key_id('recent-key') in scheduler._keys
+
+
+def test_tracked_keys_are_capped_least_recently_used_first():
+    scheduler = RateLimitScheduler(max_keys=3)
+    for key in ('a', 'b', 'c'):
+        scheduler.reserve(key, 10)
+    scheduler.reserve('a', 10)
+    scheduler.reserve('d', 10)
+    stats = scheduler.get_stats()
+    assert stats["keys_tracked"] == 3 and stats["keys_evicted"] == 1
+    assert scheduler._key_id('b') not in scheduler._keys
+    assert scheduler._key_id('a') in scheduler._keys
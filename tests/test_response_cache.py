@@ -0,0 +1,86 @@
+import pytest
+
+from app.utils import response_cache as response_cache_module
+from app.utils.response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(response_cache_module.time, 'time', fake)
+    return fake
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(path=str(tmp_path / 'cache.sqlite3'), enabled=True, **kwargs)
+
+
+def test_make_key_depends_on_every_part():
+    base = ResponseCache.make_key('openai', 'gpt-4o', 'system', 'user', 'text')
+    assert base == ResponseCache.make_key('openai', 'gpt-4o', 'system', 'user', 'text')
+    assert base != ResponseCache.make_key('anthropic', 'gpt-4o', 'system', 'user', 'text')
+    assert base != ResponseCache.make_key('openai', 'gpt-4o', 'system', 'user', 'text2')
+    # Length prefixes keep different splits of the same characters apart
+    assert (ResponseCache.make_key('openai', 'm', 'ab', 'c', 't') !=
+            ResponseCache.make_key('openai', 'm', 'a', 'bc', 't'))
+
+
+def test_get_returns_stored_value(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    assert cache.get('key') is None
+    cache.set('key', {"personality_traits": {"bold": 8}}, upstream_seconds=1.5)
+    assert cache.get('key') == {"personality_traits": {"bold": 8}}
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["saved_upstream_seconds"] == 1.5
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.set('key', {"value": 1})
+    clock.now += 59
+    assert cache.get('key') == {"value": 1}
+    clock.now += 2
+    assert cache.get('key') is None
+    assert cache.get_stats()["expired"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set('a', {"value": 'a'})
+    clock.now += 1
+    cache.set('b', {"value": 'b'})
+    clock.now += 1
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('a') is not None
+    clock.now += 1
+    cache.set('c', {"value": 'c'})
+    assert cache.get('b') is None
+    assert cache.get('a') == {"value": 'a'}
+    assert cache.get('c') == {"value": 'c'}
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized_values(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=40)
+    cache.set('big', {"value": 'x' * 100})
+    assert cache.get('big') is None
+    cache.set('a', {"value": 'a' * 10})
+    clock.now += 1
+    cache.set('b', {"value": 'b' * 10})
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite3'), enabled=False)
+    cache.set('key', {"value": 1})
+    assert cache.get('key') is None
@@ -0,0 +1,59 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    executions = []
+
+    def slow_call():
+        executions.append(1)
+        started.set()
+        release.wait(5)
+        return {"traits": ["bold"]}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, 'key', slow_call)
+        assert started.wait(5)
+        followers = [pool.submit(flight.do, 'key', slow_call) for _ in range(3)]
+        # Wait until every follower is queued on the leader's call before releasing it
+        limit = time.monotonic() + 5
+        while flight.get_stats()["coalesced"] < 3:
+            if time.monotonic() > limit:
+                release.set()
+                pytest.fail("Followers were not coalesced onto the in-flight call")
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result(5)] + [future.result(5) for future in followers]
+
+    assert len(executions) == 1
+    assert results[0] == ({"traits": ["bold"]}, False)
+    assert all(result == ({"traits": ["bold"]}, True) for result in results[1:])
+    # Followers get private copies
+    results[1][0]["traits"].append("warm")
+    assert results[0][0]["traits"] == ["bold"]
+    assert flight.get_stats() == {"calls": 4, "executions": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_sequential_calls_each_execute():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == (1, False)
+    assert flight.do('key', lambda: 2) == (2, False)
+
+
+def test_leader_exception_propagates_and_clears_the_key():
+    flight = SingleFlight()
+
+    def failing():
+        raise RuntimeError("upstream failed")
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', failing)
+    assert flight.get_stats()["in_flight"] == 0
+    assert flight.do('key', lambda: 'ok') == ('ok', False)
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from app.utils.streaming import iter_sse_events, format_sse, parse_partial_json
+
+DOCUMENT = json.dumps({
+    "tone_of_voice_prompt": "Write like a \"friendly\" expert\nwith a café feel.",
+    "campaign_taglines": ["Made to last", "Bold by design"],
+    "scores": {"bold": 8, "ratio": -1.5e2, "live": True, "missing": None}
+}, ensure_ascii=True)
+
+
+def test_every_prefix_parses_and_strings_only_grow():
+    previous = None
+    for end in range(len(DOCUMENT) + 1):
+        value = parse_partial_json(DOCUMENT[:end])
+        prompt = (value or {}).get("tone_of_voice_prompt")
+        if previous is not None:
+            assert prompt.startswith(previous)
+        previous = prompt
+    assert parse_partial_json(DOCUMENT) == json.loads(DOCUMENT)
+
+
+def test_unfinished_numbers_and_literals_are_left_out():
+    assert parse_partial_json('{"bold": 8') == {}
+    assert parse_partial_json('{"bold": 8,') == {"bold": 8}
+    assert parse_partial_json('{"live": tr') == {}
+    assert parse_partial_json('{"items": [1, 2') == {"items": [1]}
+    assert parse_partial_json('{"prompt": "Hello wor') == {"prompt": "Hello wor"}
+
+
+def test_unfinished_escapes_are_dropped():
+    assert parse_partial_json('{"prompt": "Say \\') == {"prompt": "Say "}
+    assert parse_partial_json('{"prompt": "caf\\u00') == {"prompt": "caf"}
+    assert parse_partial_json('{"prompt": "caf\\u00e9') == {"prompt": "café"}
+
+
+def test_text_before_the_document_is_skipped():
+    assert parse_partial_json('') is None
+    assert parse_partial_json('```json\n') is None
+    assert parse_partial_json('```json\n{"a": [') == {"a": []}
+
+
+def test_invalid_documents_raise():
+    with pytest.raises(ValueError):
+        parse_partial_json('{"a": nope}')
+    with pytest.raises(ValueError):
+        parse_partial_json('{"a": 01}')
+
+
+def test_sse_events_split_across_chunks():
+    stream = b'event: delta\ndata: {"text": "Hel"}\n\n: keep-alive\n\ndata: line one\r\ndata: line two\n\ndata: last\n'
+    chunks = [stream[i:i + 3] for i in range(0, len(stream), 3)]
+    assert list(iter_sse_events(chunks)) == [("delta", '{"text": "Hel"}'), ("message", "line one\nline two"),
+                                             ("message", "last")]
+
+
+def test_format_sse_round_trips():
+    text = format_sse("assets", {"tagline": "Bold by design"})
+    assert text.endswith("\n\n")
+    [(event, data)] = iter_sse_events([text.encode('utf-8')])
+    assert event == "assets" and json.loads(data) == {"tagline": "Bold by design"}
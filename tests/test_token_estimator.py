@@ -0,0 +1,61 @@
+from app.utils.token_estimator import (estimate_tokens, estimate_payload, trim_to_budget, extract_usage,
+                                       EXPECTED_COMPLETION_TOKENS)
+
+
+def test_estimate_tokens_grows_with_text():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('We are bold.') >= 3
+    assert estimate_tokens('word ' * 200) > estimate_tokens('word ' * 100)
+
+
+def test_estimate_payload_counts_system_and_messages():
+    chat = estimate_payload({"system": "You are an expert.",
+                             "messages": [{"role": "user", "content": "Analyze this text."}],
+                             "max_tokens": 500})
+    assert chat["prompt_tokens"] > estimate_tokens("You are an expert.") + estimate_tokens("Analyze this text.")
+    assert chat["completion_tokens"] == min(500, EXPECTED_COMPLETION_TOKENS)
+    assert chat["total_tokens"] == chat["prompt_tokens"] + chat["completion_tokens"]
+    # Anthropic-style system blocks are counted like a plain system prompt
+    blocks = estimate_payload({"system": [{"type": "text", "text": "You are an expert."}],
+                               "messages": [{"role": "user", "content": "Analyze this text."}],
+                               "max_tokens": 500})
+    assert blocks == chat
+
+
+def test_trim_to_budget_drops_repeated_lines_first():
+    text = "\n".join(["Home | Shop | About us | Contact"] * 50 + ["We are bold and warm."])
+    trimmed = trim_to_budget(text, 30)
+    assert trimmed.count("Home | Shop") == 1
+    assert "We are bold and warm." in trimmed
+    assert estimate_tokens(trimmed) <= 30
+
+
+def test_trim_to_budget_cuts_at_sentence_boundary():
+    text = " ".join(f"Sentence number {i} is here." for i in range(200))
+    trimmed = trim_to_budget(text, 50)
+    assert trimmed.endswith("is here.")
+    assert estimate_tokens(trimmed) <= 50
+    assert trim_to_budget("short text", 50) == "short text"
+
+
+def test_extract_usage_openai_with_cached_tokens():
+    usage = extract_usage('openai', {"usage": {"prompt_tokens": 1200, "completion_tokens": 300,
+                                               "prompt_tokens_details": {"cached_tokens": 1024}}})
+    assert usage == {"prompt_tokens": 1200, "completion_tokens": 300, "cached_tokens": 1024,
+                     "cache_write_tokens": 0}
+
+
+def test_extract_usage_anthropic_adds_cache_reads_and_writes_to_prompt():
+    usage = extract_usage('anthropic', {"usage": {"input_tokens": 50, "output_tokens": 200,
+                                                  "cache_read_input_tokens": 1000,
+                                                  "cache_creation_input_tokens": 200}})
+    assert usage == {"prompt_tokens": 1250, "completion_tokens": 200, "cached_tokens": 1000,
+                     "cache_write_tokens": 200}
+
+
+def test_extract_usage_cohere_and_missing_usage():
+    assert extract_usage('cohere', {"meta": {"billed_units": {"input_tokens": 10, "output_tokens": 5}}}) == {
+        "prompt_tokens": 10, "completion_tokens": 5, "cached_tokens": 0, "cache_write_tokens": 0}
+    assert extract_usage('openai', {"choices": []}) is None
+    assert extract_usage('openai', {"usage": {}}) is None
+    assert extract_usage('openai', "not a dict") is None
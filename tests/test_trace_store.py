@@ -0,0 +1,60 @@
+import contextvars
+
+from flask import Flask, session
+
+from app.utils.trace_store import TraceStore, get_request_id, init_app, set_request_id, set_trace_owner
+
+
+def make_store(tmp_path):
+    return TraceStore(str(tmp_path / 'traces'), buffer_size=10, flush_interval=3600, enabled=True)
+
+
+def record_as(store, request_id, session_id):
+    def request():
+        set_request_id(request_id)
+        set_trace_owner(session_id)
+        store.record('analysis', 'openai', {"text": "hi"}, {"ok": True}, status_code=200)
+
+    contextvars.copy_context().run(request)
+
+
+def test_traces_are_only_returned_to_their_session(tmp_path):
+    store = make_store(tmp_path)
+    record_as(store, 'req-1', 'session-a')
+
+    assert len(store.get('req-1', 'session-a')) == 1
+    assert store.get('req-1', 'session-b') == []
+    assert store.get('req-1') == []
+    # The raw session ID is never stored
+    assert 'session-a' not in str(store.get('req-1', 'session-a'))
+
+
+def test_session_check_applies_to_flushed_traces(tmp_path):
+    store = make_store(tmp_path)
+    record_as(store, 'req-1', 'session-a')
+    store.flush()
+    store._recent.clear()
+
+    assert len(store.get('req-1', 'session-a')) == 1
+    assert store.get('req-1', 'session-b') == []
+
+
+def test_request_ids_are_generated_on_the_server():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+
+    @app.before_request
+    def _fake_session_id():
+        session.sid = 'session-a'
+
+    init_app(app)
+    seen = []
+
+    @app.route('/')
+    def index():
+        seen.append(get_request_id())
+        return 'ok'
+
+    response = app.test_client().get('/', headers={'X-Request-ID': 'chosen-by-client'})
+    assert seen[0] != 'chosen-by-client'
+    assert response.headers['X-Request-ID'] == seen[0]
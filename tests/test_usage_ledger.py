@@ -0,0 +1,62 @@
+import contextvars
+
+import pytest
+
+from app.utils.trace_store import set_request_id
+from app.utils.usage_ledger import UsageLedger, set_attribution
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    # A long flush interval keeps the background thread out of the way; the tests flush explicitly
+    ledger = UsageLedger(str(tmp_path / 'ledger.sqlite3'), enabled=True, buffer_size=3, flush_interval=3600)
+    yield ledger
+    ledger.close()
+
+
+def test_record_buffers_without_touching_the_database(ledger, tmp_path):
+    ledger.record('analysis', 'openai', 'gpt-4o', 'sk-test', {"prompt_tokens": 100, "completion_tokens": 20})
+    assert ledger._conn is None
+    assert not (tmp_path / 'ledger.sqlite3').exists()
+    ledger.flush()
+    assert ledger.get_stats()["written"] == 1
+
+
+def test_report_includes_buffered_rows_and_attribution(ledger):
+    def request():
+        set_request_id('req-1')
+        set_attribution('session-1', 'document_upload')
+        ledger.record('analysis', 'openai', 'gpt-4o', 'sk-test',
+                      {"prompt_tokens": 100, "completion_tokens": 20, "cached_tokens": 64}, latency=0.5, retries=1)
+        ledger.record('analysis', 'openai', 'gpt-4o', 'sk-test', cache_hit=True)
+
+    contextvars.copy_context().run(request)
+    ledger.record('assets', 'anthropic', 'claude', 'sk-other', success=False)
+
+    report = {row["input_method"]: row for row in ledger.report(group_by=('input_method',))}
+    upload = report["document_upload"]
+    assert upload["calls"] == 2 and upload["cache_hits"] == 1 and upload["cache_hit_ratio"] == 0.5
+    assert upload["prompt_tokens"] == 100 and upload["cached_tokens"] == 64 and upload["retries"] == 1
+    assert upload["avg_upstream_ms"] == 500.0 and upload["avg_prompt_tokens"] == 100.0
+    assert report[None]["errors"] == 1
+    assert [row["calls"] for row in ledger.report(group_by=(), session_id='session-1')] == [2]
+
+
+def test_full_buffer_drops_the_oldest_rows(ledger):
+    for model in ('a', 'b', 'c', 'd'):
+        ledger.record('analysis', 'openai', model, 'sk-test')
+    assert [row["model"] for row in ledger.report(group_by=('model',))] == ['b', 'c', 'd']
+    stats = ledger.get_stats()
+    assert stats["dropped"] == 1 and stats["written"] == 3
+
+
+def test_disabled_ledger_records_nothing(tmp_path):
+    ledger = UsageLedger(str(tmp_path / 'ledger.sqlite3'), enabled=False)
+    ledger.record('analysis', 'openai', 'gpt-4o', 'sk-test')
+    assert ledger.get_stats() == {"enabled": False}
+    assert ledger.report() == []
+
+
+def test_unknown_group_columns_are_rejected(ledger):
+    with pytest.raises(ValueError):
+        ledger.report(group_by=('api_key',))
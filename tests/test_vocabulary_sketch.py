@@ -0,0 +1,161 @@
+import os
+import random
+from collections import Counter
+
+import nltk
+import pytest
+from nltk.probability import FreqDist
+
+from app.utils import vocabulary_sketch
+from app.utils.vocabulary_sketch import SpaceSavingSketch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _nltk_data_installed():
+    try:
+        nltk.data.find('tokenizers/punkt')
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        return False
+    return True
+
+
+requires_nltk_data = pytest.mark.skipif(not _nltk_data_installed(),
+                                        reason="NLTK punkt and stopwords data are not installed")
+
+
+def _sample_document():
+    from app.utils.analyzed_document import AnalyzedDocument
+    with open(os.path.join(ROOT, 'sample_brand_text.txt'), encoding='utf-8') as f:
+        return AnalyzedDocument(f.read())
+
+
+def _zipf_words(count, vocabulary, seed):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    weights = [1 / (i + 1) for i in range(vocabulary)]
+    return rng.choices(words, weights, k=count)
+
+
+def _sketch(words, capacity):
+    sketch = SpaceSavingSketch(capacity)
+    for word in words:
+        sketch.add(word)
+    return sketch
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SpaceSavingSketch(0)
+
+
+def test_merge_of_sketches_that_fit_is_exact():
+    first, second = "a b c a".split(), "c d a".split()
+    merged = _sketch(first, 10).merge(_sketch(second, 10))
+    assert merged.most_common(10) == [("a", 3), ("c", 2), ("b", 1), ("d", 1)]
+    assert merged.total == 7 and merged.error_bound == 0
+
+
+@pytest.mark.parametrize("capacity", [5, 20, 50])
+def test_merged_counts_bound_the_true_counts(capacity):
+    first, second = _zipf_words(3000, 200, seed=1), _zipf_words(2000, 300, seed=2)
+    merged = _sketch(first, capacity).merge(_sketch(second, capacity))
+    truth = Counter(first) + Counter(second)
+    assert len(merged) <= capacity
+    assert merged.total == sum(truth.values())
+    for word, (count, error, _) in merged._entries.items():
+        assert count - error <= truth[word] <= count
+
+
+def test_merge_leaves_the_other_sketch_unchanged():
+    other = _sketch("x y x".split(), 2)
+    before = dict(other._entries)
+    _sketch("a b".split(), 2).merge(other)
+    assert other._entries == before and other.total == 3
+
+
+def _assert_bounds(sketch, truth):
+    """Every count overestimates by at most its error, and untracked words are rarer than the error bound."""
+    for word, (count, error, _) in sketch._entries.items():
+        assert count - error <= truth[word] <= count
+        assert count - truth[word] <= sketch.error_bound
+    for word, true_count in truth.items():
+        if word not in sketch:
+            assert true_count <= sketch.error_bound
+
+
+def test_update_matches_freqdist_when_the_words_fit():
+    words = "the bold brand makes bold things brand new bold".split() + _zipf_words(5000, 300, seed=3)
+    expected = FreqDist(words).most_common(50)
+    exactly_full = SpaceSavingSketch(capacity=len(set(words)))
+    exactly_full.update(words)
+    assert exactly_full.most_common(50) == expected
+    # With room to spare, nothing can have been missed
+    roomy = SpaceSavingSketch(capacity=len(set(words)) + 1)
+    roomy.update(words)
+    assert roomy.most_common(50) == expected
+    assert roomy.error_bound == 0
+    assert roomy.guaranteed(50) == expected
+
+
+def test_update_reads_words_in_bounded_blocks(monkeypatch):
+    monkeypatch.setattr(vocabulary_sketch, 'UPDATE_BLOCK_SIZE', 7)
+    words = _zipf_words(1000, 40, seed=4)
+    blocked = SpaceSavingSketch(capacity=40)
+    blocked.update(iter(words))
+    assert blocked.most_common(40) == FreqDist(words).most_common(40)
+
+
+@pytest.mark.parametrize("capacity", [10, 50, 150])
+def test_update_bounds_hold_over_capacity(capacity):
+    words = _zipf_words(20000, 1000, seed=5)
+    truth = Counter(words)
+    sketch = SpaceSavingSketch(capacity)
+    sketch.update(words)
+    assert len(sketch) == capacity and sketch.total == len(words)
+    _assert_bounds(sketch, truth)
+    # Every word occurring more than total/capacity times is tracked
+    assert all(word in sketch for word, count in truth.items() if count > len(words) / capacity)
+
+
+@pytest.mark.parametrize("capacity", [10, 50, 150])
+def test_guaranteed_words_are_certain(capacity):
+    words = _zipf_words(20000, 1000, seed=6)
+    truth = Counter(words)
+    sketch = SpaceSavingSketch(capacity)
+    sketch.update(words)
+    guaranteed = sketch.guaranteed(capacity)
+    assert guaranteed
+    untracked = max((count for word, count in truth.items() if word not in sketch), default=0)
+    for word, minimum in guaranteed:
+        assert minimum <= truth[word]
+        assert truth[word] > untracked
+
+
+@requires_nltk_data
+def test_document_vocabulary_matches_freqdist_on_real_text():
+    document = _sample_document()
+    words = document.content_words()
+    assert document.vocabulary().most_common(50) == FreqDist(words).most_common(50)
+
+
+@requires_nltk_data
+def test_document_vocabulary_below_capacity_stays_within_bounds():
+    document = _sample_document()
+    words = document.content_words()
+    true_counts = Counter(words)
+    capacity = len(true_counts) // 2
+    sketch = document.vocabulary(capacity)
+
+    assert len(sketch) == capacity and sketch.error_bound > 0
+    for word, estimate in sketch.most_common(capacity):
+        assert true_counts[word] <= estimate <= true_counts[word] + sketch.error_bound
+    # Every word occurring more than total/capacity times is tracked
+    for word, count in true_counts.items():
+        if count > len(words) / capacity:
+            assert word in sketch
+    # Guaranteed words really do outnumber every word the sketch dropped
+    untracked = max(count for word, count in true_counts.items() if word not in sketch)
+    for word, minimum in sketch.guaranteed(50):
+        assert untracked < minimum <= true_counts[word]